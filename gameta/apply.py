@@ -1,10 +1,14 @@
-import subprocess
-from typing import List, Tuple
+import json
+import os
+from typing import List, Tuple, Dict, Optional, Iterator, FrozenSet
 
 import click
 
+from .cache import ResultCache, CACHE_FILE
 from .cli import gameta_cli
 from .context import gameta_context, GametaContext
+from .engines import Job, Result, Engine, engines
+from .events import EventWriter
 
 
 __all__ = ['apply']
@@ -12,24 +16,55 @@ __all__ = ['apply']
 
 @gameta_cli.command()
 @click.option('--command', '-c', 'commands', type=str, required=True, multiple=True, help='CLI Commands to be executed')
-@click.option('--tags', '-t', type=str, multiple=True, default=(), help='Repository tags to apply CLI commands to')
+@click.option('--tags', '-t', type=str, multiple=True, default=(),
+              help="Repository tags or tag queries e.g. 'a & !b | c' to apply CLI commands to")
 @click.option('--repositories', '-r', type=str, multiple=True, default=(), help='Repositories to apply CLI commands to')
+@click.option('--where', '-w', type=str, multiple=True, default=(),
+              help="Only apply CLI commands to repositories whose parameters match e.g. 'team in (a, b)'")
 @click.option('--verbose', '-v', is_flag=True, default=False,
               help='Display execution output when CLI commands are applied')
 @click.option('--shell', '-s', is_flag=True, default=False, help='Execute CLI commands in a separate shell')
 @click.option('--python', '-p', is_flag=True, default=False, help='Execute Python scripts using Python 3 interpreter')
 @click.option('--raise-errors', '-e', is_flag=True, default=False,
               help='Raise errors that occur when executing CLI commands and terminate execution')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1,
+              help='Maximum number of repositories to apply CLI commands to concurrently')
+@click.option('--engine', type=click.Choice(list(engines.keys())), default='thread',
+              help='Engine used to execute CLI commands')
+@click.option('--cache', is_flag=True, default=False,
+              help='Skip repositories that are unchanged since the CLI commands last succeeded in them')
+@click.option('--profile', type=click.IntRange(min=1), default=None,
+              help='Print the resource usage of the N repositories with the longest wall times')
+@click.option('--report', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Write the outcome and resource usage of all repositories to a JSON file')
+@click.option('--output', type=click.Choice(['text', 'jsonl']), default='text',
+              help='Format of the execution output, jsonl writes events to stdout and messages to stderr')
+@click.option('--log-dir', type=click.Path(file_okay=False, writable=True), default=None,
+              help='Write the output of each repository to <repository>.log in this directory')
+@click.option('--log-tail', type=click.IntRange(min=0), default=4,
+              help='Kilobytes at the end of the output of each failed repository printed when output is logged')
+@click.option('--preload', type=str, multiple=True, default=(),
+              help='Python modules imported once by the python-pool engine before its interpreters are started')
 @gameta_context
 def apply(
         context: GametaContext,
         commands: Tuple[str],
         tags: Tuple[str],
         repositories: Tuple[str],
+        where: Tuple[str],
         verbose: bool,
         shell: bool,
         python: bool,
-        raise_errors: bool
+        raise_errors: bool,
+        jobs: int,
+        engine: str,
+        cache: bool,
+        profile: Optional[int],
+        report: Optional[str],
+        output: str,
+        log_dir: Optional[str],
+        log_tail: int,
+        preload: Tuple[str]
 ) -> None:
     """
     Applies a CLI command to all repositories (by default) or a specific set of repositories
@@ -37,13 +72,27 @@ def apply(
     Args:
         context (GametaContext): Gameta Context
         commands (Tuple[str]): CLI command to be applied
-        tags (Tuple[str]): Repository tags to apply command to
+        tags (Tuple[str]): Repository tags or tag queries to apply command to
         repositories (Tuple[str]): Repositories to apply command to
+        where (Tuple[str]): Parameter predicates that the repositories applied to must all match
         verbose (bool): Flag to indicate that output should be displayed as the command is applied
         python (bool): Flag to indicate that command should be executed with the Python 3 interpreter
         shell (bool): Flag to indicate that command should be executed in a separate shell
         raise_errors (bool): Flag to indicate that errors should be raised if they occur during execution and the
                              overall execution should be terminated
+        jobs (int): Maximum number of repositories to apply the command to concurrently
+        engine (str): Name of the engine used to execute the command
+        cache (bool): Flag to indicate that repositories whose HEAD commit and uncommitted changes are unchanged since
+                      the command last succeeded in them should be skipped
+        profile (Optional[int]): Number of repositories with the longest wall times to print the resource usage of
+        report (Optional[str]): Path of the JSON file to write the outcome and resource usage of all repositories to
+        output (str): Format of the execution output, either text or jsonl. With jsonl, a JSON object is written to
+                      stdout for each event of each repository and all other messages are printed to stderr
+        log_dir (Optional[str]): Directory the output of each repository is written to instead of the terminal, only
+                                 the last log_tail kilobytes of output of each repository are retained in memory
+        log_tail (int): Number of kilobytes at the end of the output of each failed repository printed once all
+                        repositories have been processed, if output is logged
+        preload (Tuple[str]): Python modules imported by the python-pool engine before its interpreters are forked
 
     Returns:
         None
@@ -51,19 +100,47 @@ def apply(
     Examples:
         $ gameta apply -c "git fetch --all --tags --prune" -c "git checkout {branch}"  # Multiple commands
         $ gameta apply -c "git fetch --all --tags --prune" -t tag1 -t tag2 -t tag3 -r repo_a  # Apply to tags and repos
+        $ gameta apply -c "git fetch --all --tags --prune" -t "backend & !legacy | infra"  # Apply to a tag query
+        $ gameta apply -c "git fetch --all --tags --prune" -w "language == python"  # Apply to matching parameters
         $ gameta apply -c "git fetch --all --tags --prune" -e  # Raise errors and terminate
         $ gameta apply -c "git fetch --all --tags --prune" -s  # Executed in a separate shell
         $ gameta apply -c "git fetch --all --tags --prune" -v  # Verbose
+        $ gameta apply -c "git fetch --all --tags --prune" -j 8  # Applied to 8 repositories at a time
+        $ gameta apply -c "git fetch --all --tags --prune" -j 200 --engine asyncio -v  # Streamed from an event loop
+        $ gameta apply -c "flake8" --cache  # Skips repositories that are unchanged since flake8 last succeeded
+        $ gameta apply -c "python setup.py bdist_wheel" --profile 10 --report usage.json  # Resource usage
+        $ gameta apply -c "python setup.py bdist_wheel" --output jsonl  # Machine-readable events
+        $ gameta apply -c "python setup.py bdist_wheel" -j 8 --log-dir logs  # Output written to logs/<repo>.log
+        $ gameta apply -p -c "import yaml; ..." --engine python-pool --preload yaml  # Python without interpreter starts
 
     Raises:
         click.ClickException: If errors occur during processing
     """
-    repos: List[str] = sorted(
-        list(
-            set([repo for tag in tags for repo in context.tags.get(tag, [])]) |
-            set([repo for repo in repositories if repo in context.repositories])
-        )
-    )
+    def echo(message: str) -> None:
+        """
+        Prints a message, messages are printed to stderr to keep them out of the event stream
+
+        Args:
+            message (str): Message to be printed
+
+        Returns:
+            None
+        """
+        click.echo(message, err=output == 'jsonl')
+
+    try:
+        selected: FrozenSet[str] = context.select(tags)
+        matched: Optional[FrozenSet[str]] = context.where(where) if where else None
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    names: FrozenSet[str] = context.names()
+    repos: List[str] = sorted(selected | {repo for repo in repositories if repo in names})
+    if matched is not None:
+        # Predicates narrow down the selected repositories, or all repositories if none were selected
+        repos = sorted(matched.intersection(repos or context.repositories))
+        if not repos:
+            echo(f"No repositories match {list(where)}")
+            return
 
     if python:
         try:
@@ -75,48 +152,154 @@ def apply(
     # Python subprocess does not handle multiple commands
     # hence we need to handle it in a separate shell
     if len(commands) > 1:
-        click.echo("Multiple commands detected, executing in a separate shell")
+        echo("Multiple commands detected, executing in a separate shell")
         shell = True
 
     if shell:
-        click.echo(
+        echo(
             f"Applying {list(commands)} to repos {repos if repos else list(context.repositories.keys())} "
             f"in a separate shell"
         )
     elif python:
-        click.echo(
+        echo(
             f"Applying Python commands {list(commands)} to repos "
             f"{repos if repos else list(context.repositories.keys())} in a separate shell"
         )
     else:
-        click.echo(
+        echo(
             f"Applying {list(commands)} to repos {repos if repos else list(context.repositories.keys())}"
         )
 
+    def format_usage(results: List[Result], top: int) -> str:
+        """
+        Formats the resource usage of the repositories with the longest wall times as a table
+
+        Args:
+            results (List[Result]): Results of all repositories
+            top (int): Number of repositories to be printed
+
+        Returns:
+            str: Formatted resource usage table
+        """
+        def format_value(value: Optional[float], scale: float = 1) -> str:
+            return '-' if value is None else f'{value / scale:.2f}'
+
+        executed: List[Result] = sorted(
+            [result for result in results if result.usage is not None], key=lambda r: r.usage.wall_time, reverse=True
+        )[:top]
+        rows: List[Tuple[str, ...]] = [('Repository', 'Wall (s)', 'User (s)', 'System (s)', 'Max RSS (MiB)')] + [
+            (
+                result.repo,
+                format_value(result.usage.wall_time),
+                format_value(result.usage.user_time),
+                format_value(result.usage.system_time),
+                format_value(result.usage.max_rss, 1024)
+            )
+            for result in executed
+        ]
+        widths: List[int] = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return f"Resource usage of the {len(executed)} repositories with the longest wall times:\n" + '\n'.join(
+            '\t' + '  '.join(
+                [row[0].ljust(widths[0])] + [value.rjust(width) for value, width in zip(row[1:], widths[1:])]
+            )
+            for row in rows
+        )
+
+    if preload and engine != 'python-pool':
+        raise click.ClickException("Modules can only be preloaded by the python-pool engine")
+
     try:
-        for repo, c in context.apply(list(commands), repos=repos, shell=shell, python=python):
-            click.echo(f"Executing {' '.join(c)} in {repo}")
-            try:
-                if verbose:
-                    with subprocess.Popen(c, stdout=subprocess.PIPE, stderr=subprocess.STDOUT) as cmd:
-                        for line in iter(cmd.stdout.readline, b''):
-                            click.echo(line.rstrip())
-                        return_code: int = cmd.poll()
-                        if return_code:
-                            raise subprocess.CalledProcessError(return_code, cmd.args)
-                else:
-                    subprocess.run(c, stderr=subprocess.STDOUT, check=True)
-            except subprocess.CalledProcessError as e:
-                if raise_errors:
-                    exception: click.ClickException = click.ClickException(
-                        f'{e.__class__.__name__}.{str(e)} occurred when executing command {e.cmd} in {repo}'
+        if python:
+            # Rendered Python scripts are retained so that they can be executed without a new interpreter
+            plan: List[Job] = [
+                Job(
+                    repo,
+                    context.python(scripts),
+                    cwd,
+                    context.repository(repo).get('depends_on', []),
+                    script=scripts,
+                    # Only the python-pool engine executes the scripts with the parameters as globals
+                    parameters=context.namespace(parameters) if engine == 'python-pool' else None
+                )
+                for repo, scripts, parameters, cwd in context.render(list(commands), repos=repos, python=True)
+            ]
+        else:
+            plan: List[Job] = [
+                Job(repo, c, cwd, context.repository(repo).get('depends_on', []))
+                for repo, c, cwd in context.apply(list(commands), repos=repos, shell=shell, python=python)
+            ]
+
+        # Repositories with cached results are left out of the plan, which satisfies the dependencies on them
+        result_cache: Optional[ResultCache] = None
+        cached: Dict[str, Result] = {}
+        if cache:
+            result_cache = ResultCache(context.resolve(CACHE_FILE, check=False))
+            result_cache.load()
+            keys: Dict[str, Optional[str]] = result_cache.keys(plan, jobs)
+            for job in plan:
+                if result_cache.hit(keys[job.repo]):
+                    echo(
+                        f"Skipping {job.repo} as it is unchanged since {' '.join(job.command)} last succeeded in it"
                     )
-                    exception.exit_code = e.returncode
-                    raise exception
-                click.echo(
-                    f'Error {e.__class__.__name__}.{str(e)} occurred when executing command {e.cmd} in {repo}, '
-                    f'continuing execution'
+                    cached[job.repo] = Result(job.repo, job.command, Result.CACHED)
+
+        events: Optional[EventWriter] = EventWriter(click.get_binary_stream('stdout')) if output == 'jsonl' else None
+        if log_dir is not None:
+            os.makedirs(log_dir, exist_ok=True)
+        executor: Engine = engines[engine](
+            jobs=jobs,
+            verbose=verbose,
+            raise_errors=raise_errors,
+            events=events,
+            log_dir=log_dir,
+            tail_size=log_tail * 1024,
+            **({'preload': list(preload)} if preload else {})
+        )
+        executed: Iterator[Result] = iter(executor.run([job for job in plan if job.repo not in cached]))
+        results: List[Result] = [cached[job.repo] if job.repo in cached else next(executed) for job in plan]
+        if events is not None:
+            # The engine only writes finish events of repositories it has executed
+            for result in results:
+                if result.status in [Result.SKIPPED, Result.CACHED]:
+                    executor.report(result)
+            events.flush()
+
+        if result_cache is not None:
+            # Repository states both before and after a successful execution are recorded
+            succeeded: List[Job] = [job for job, result in zip(plan, results) if result.status == Result.SUCCEEDED]
+            for job in succeeded:
+                result_cache.add(keys[job.repo], job.repo)
+            for repo, key in result_cache.keys(succeeded, jobs).items():
+                result_cache.add(key, repo)
+            result_cache.save()
+
+        if executor.concurrent and events is None:
+            echo("Execution summary:")
+            for result in results:
+                echo(f"\t{result.describe()}")
+
+        for result in results:
+            if result.tail:
+                echo(f"Last output of {result.repo}, full output in {result.log}:\n{result.tail}")
+
+        if profile:
+            echo(format_usage(results, profile))
+
+        if report:
+            with open(report, 'w') as r:
+                json.dump(
+                    {'commands': list(commands), 'results': [result.to_dict() for result in results]}, r, indent=2
                 )
+            echo(f"Resource usage report written to {report}")
+
+        failures: List[Result] = [result for result in results if result.failed]
+        if raise_errors and failures:
+            e = failures[0].error
+            exception: click.ClickException = click.ClickException(
+                f'{e.__class__.__name__}.{str(e)} occurred when executing command {e.cmd} in {failures[0].repo}'
+            )
+            exception.exit_code = e.returncode
+            raise exception
     except click.ClickException:
         raise
     except Exception as e:
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join, dirname, exists, isfile
+from typing import Dict, List, Optional, Tuple
+
+import click
+
+from git import Repo, GitError
+
+from .cli import gameta_cli
+from .context import gameta_context, GametaContext, GAMETA_DIR, make_dirs
+from .engines import Job
+
+
+__all__ = [
+    # Result cache
+    'CACHE_DIR', 'CACHE_FILE', 'ResultCache',
+
+    # Cache CLI
+    'cache_cli'
+]
+
+
+CACHE_DIR: str = GAMETA_DIR
+CACHE_FILE: str = join(CACHE_DIR, 'cache')
+
+
+class ResultCache(object):
+    """
+    Records successful executions of commands in repositories so that they can be skipped if neither the command nor
+    the repository has changed. An execution is keyed on the rendered command, the HEAD commit of the repository and a
+    fingerprint of its uncommitted changes, repositories that are not git repositories are never cached.
+
+    Attributes:
+        file (str): Absolute path of the cache file
+        max_entries (int): Maximum number of entries retained, the oldest entries are evicted first
+        max_age (float): Maximum age of an entry in seconds, older entries are evicted
+        entries (Dict[str, Dict]): Cache entries keyed on the cache key, each containing the repository and the time
+                                   it was recorded
+    """
+    MAX_ENTRIES: int = 10000
+    MAX_AGE: float = 7 * 24 * 60 * 60
+
+    def __init__(self, file: str, max_entries: int = MAX_ENTRIES, max_age: float = MAX_AGE):
+        self.file = file
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.entries: Dict[str, Dict] = {}
+
+    def load(self) -> None:
+        """
+        Loads the cache entries from the cache file, a missing or corrupted cache file results in an empty cache
+
+        Returns:
+            None
+        """
+        try:
+            with open(self.file) as f:
+                entries = json.load(f)
+            self.entries = entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self) -> None:
+        """
+        Evicts expired entries and the oldest entries beyond the size limit, then writes the cache file atomically
+
+        Returns:
+            None
+        """
+        expiry: float = time.time() - self.max_age
+        entries: List[Tuple[str, Dict]] = sorted(
+            [(key, entry) for key, entry in self.entries.items() if entry.get('timestamp', 0) >= expiry],
+            key=lambda e: e[1]['timestamp'],
+            reverse=True
+        )
+        self.entries = dict(entries[:self.max_entries])
+
+        make_dirs(dirname(self.file))
+        temp: str = f'{self.file}.{os.getpid()}.tmp'
+        with open(temp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(temp, self.file)
+
+    def clear(self, repositories: Optional[List[str]] = None) -> int:
+        """
+        Removes the cache entries of the repositories specified, or all entries if no repositories are specified
+
+        Args:
+            repositories (Optional[List[str]]): Repositories whose entries are to be removed
+
+        Returns:
+            int: Number of entries removed
+        """
+        count: int = len(self.entries)
+        if repositories:
+            self.entries = {k: e for k, e in self.entries.items() if e.get('repo') not in repositories}
+        else:
+            self.entries = {}
+        return count - len(self.entries)
+
+    @staticmethod
+    def fingerprint(path: str) -> Optional[str]:
+        """
+        Generates a fingerprint of the state of a git repository from its HEAD commit, the changes to its tracked
+        files and the contents of its untracked files, the cache directory is excluded
+
+        Args:
+            path (str): Absolute path of the repository
+
+        Returns:
+            Optional[str]: Fingerprint of the repository, None if it is not a git repository with a HEAD commit
+        """
+        try:
+            repo: Repo = Repo(path)
+            digest = hashlib.sha256(repo.head.commit.hexsha.encode())
+            pathspec: List[str] = ['--', '.', f':(exclude){CACHE_DIR}']
+            digest.update(repo.git.diff('HEAD', '--binary', *pathspec).encode(errors='surrogateescape'))
+            for untracked in repo.git.ls_files('--others', '--exclude-standard', '-z', *pathspec).split('\0'):
+                if untracked and isfile(join(path, untracked)):
+                    digest.update(untracked.encode(errors='surrogateescape'))
+                    with open(join(path, untracked), 'rb') as f:
+                        digest.update(hashlib.sha256(f.read()).digest())
+            return digest.hexdigest()
+        except (GitError, ValueError, OSError):
+            return None
+
+    def key(self, job: Job) -> Optional[str]:
+        """
+        Generates the cache key of a Job
+
+        Args:
+            job (Job): Job to be keyed
+
+        Returns:
+            Optional[str]: Cache key, None if the repository cannot be fingerprinted
+        """
+        fingerprint: Optional[str] = self.fingerprint(job.cwd)
+        if fingerprint is None:
+            return None
+        return hashlib.sha256(json.dumps([job.repo, job.command, fingerprint]).encode()).hexdigest()
+
+    def keys(self, plan: List[Job], jobs: int = 1) -> Dict[str, Optional[str]]:
+        """
+        Generates the cache keys of all Jobs in the plan, repositories are fingerprinted concurrently
+
+        Args:
+            plan (List[Job]): Jobs to be keyed
+            jobs (int): Maximum number of repositories to be fingerprinted concurrently
+
+        Returns:
+            Dict[str, Optional[str]]: Cache keys of each repository
+        """
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+            return dict(zip([job.repo for job in plan], pool.map(self.key, plan)))
+
+    def hit(self, key: Optional[str]) -> bool:
+        """
+        Returns a flag indicating if a cache key has an unexpired entry
+
+        Args:
+            key (Optional[str]): Cache key
+
+        Returns:
+            bool: Flag to indicate if the key is cached
+        """
+        return key in self.entries and self.entries[key].get('timestamp', 0) >= time.time() - self.max_age
+
+    def add(self, key: Optional[str], repo: str) -> None:
+        """
+        Records a successful execution
+
+        Args:
+            key (Optional[str]): Cache key, ignored if None
+            repo (str): Repository the command was executed in
+
+        Returns:
+            None
+        """
+        if key is not None:
+            self.entries[key] = {'repo': repo, 'timestamp': time.time()}
+
+
+@gameta_cli.group('cache')
+@gameta_context
+def cache_cli(context: GametaContext) -> None:
+    """
+    CLI for managing the cache of successfully applied CLI commands
+    \f
+    Args:
+        context (GametaContext): Gameta Context
+
+    Returns:
+        None
+
+    Raises:
+        click.ClickException: If we are not currently operating in a metarepo directory
+    """
+    if not context.is_metarepo:
+        raise click.ClickException(f"{context.project_dir} is not a metarepo, initialise it with 'gameta init'")
+
+
+@cache_cli.command()
+@click.option('--repositories', '-r', type=str, multiple=True, default=(),
+              help='Repositories to clear cached results of, defaults to all repositories')
+@gameta_context
+def clear(context: GametaContext, repositories: Tuple[str]) -> None:
+    """
+    Clears cached results of CLI commands
+    \f
+    Args:
+        context (GametaContext): Gameta Context
+        repositories (Tuple[str]): Repositories to clear cached results of
+
+    Returns:
+        None
+
+    Examples:
+        $ gameta cache clear  # Clears all cached results
+        $ gameta cache clear -r repo_a  # Clears the cached results of repo_a
+
+    Raises:
+        click.ClickException: If errors occur during processing
+    """
+    click.echo(f"Clearing cached results of {list(repositories) if repositories else 'all repositories'}")
+    try:
+        cache: ResultCache = ResultCache(context.resolve(CACHE_FILE, check=False))
+        if not exists(cache.file):
+            click.echo("Cache is empty")
+            return
+        cache.load()
+        count: int = cache.clear(list(repositories))
+        cache.save()
+        click.echo(f"Successfully cleared {count} cached results")
+    except Exception as e:
+        raise click.ClickException(f"{e.__class__.__name__}.{str(e)}")
@@ -1,5 +1,5 @@
 
-from os import getcwd, chdir
+from os import getcwd
 from os.path import abspath
 
 import click
@@ -39,7 +39,6 @@ def gameta_cli(context: GametaContext, project_dir: str, version: bool) -> None:
         return
 
     context.project_dir = abspath(project_dir)
-    chdir(context.project_dir)
 
     # Load current repositories
     context.load()
@@ -52,3 +51,5 @@ from .apply import *
 from .params import *
 from .cmd import *
 from .constants import *
+from .cache import *
+from .store import *
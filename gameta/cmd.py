@@ -1,10 +1,13 @@
 from copy import deepcopy
-from typing import Tuple, Dict, Optional, Callable, Any
+from os.path import join, splitext
+from typing import Tuple, Dict, Optional, Callable, Any, Set
 
 import click
 
 from .cli import gameta_cli
 from .context import gameta_context, GametaContext
+from .engines import engines
+from .query import TagQuery, ParameterQuery
 
 
 __all__ = ['command_cli']
@@ -35,14 +38,23 @@ def command_cli(context: GametaContext) -> None:
 @click.option('--overwrite', '-o', type=bool, is_flag=True, default=False,
               help='Overwrite existing Gameta command in the store')
 @click.option('--command', '-c', 'commands', type=str, required=True, multiple=True, help='CLI Commands to be executed')
-@click.option('--tags', '-t', type=str, multiple=True, default=(), help='Repository tags to apply CLI commands to')
+@click.option('--tags', '-t', type=str, multiple=True, default=(),
+              help="Repository tags or tag queries e.g. 'a & !b | c' to apply CLI commands to")
 @click.option('--repositories', '-r', type=str, multiple=True, default=(), help='Repositories to apply CLI commands to')
+@click.option('--where', '-w', type=str, multiple=True, default=(),
+              help="Only apply CLI commands to repositories whose parameters match e.g. 'team in (a, b)'")
 @click.option('--verbose', '-v', is_flag=True, default=False,
               help='Display execution output when CLI command is applied')
 @click.option('--shell', '-s', is_flag=True, default=False, help='Execute CLI commands in a separate shell')
 @click.option('--python', '-p', is_flag=True, default=False, help='Execute Python scripts using Python 3 interpreter')
 @click.option('--raise-errors', '-e', is_flag=True, default=False,
               help='Raise errors that occur when executing CLI commands and terminate execution')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1,
+              help='Maximum number of repositories to apply CLI commands to concurrently')
+@click.option('--engine', type=click.Choice(list(engines.keys())), default='thread',
+              help='Engine used to execute CLI commands')
+@click.option('--cache', is_flag=True, default=False,
+              help='Skip repositories that are unchanged since the CLI commands last succeeded in them')
 @gameta_context
 def add(
         context: GametaContext,
@@ -52,10 +64,14 @@ def add(
         commands: Tuple[str],
         tags: Tuple[str],
         repositories: Tuple[str],
+        where: Tuple[str],
         verbose: bool,
         shell: bool,
         python: bool,
-        raise_errors: bool
+        raise_errors: bool,
+        jobs: int,
+        engine: str,
+        cache: bool
 ) -> None:
     """
     Adds a new Gameta command to the Gameta command store
@@ -69,11 +85,16 @@ def add(
         commands (Tuple[str]): CLI command to be applied
         tags (Tuple[str]): Repository tags to apply command to
         repositories (Tuple[str]): Repositories to apply command to
+        where (Tuple[str]): Parameter predicates that the repositories applied to must all match
         verbose (bool): Flag to indicate that output should be displayed as the command is applied
         shell (bool): Flag to indicate that command should be executed in a separate shell
         python (bool): Flag to indicate that command should be executed by the Python 3 interpreter
         raise_errors (bool): Flag to indicate that errors should be raised if they occur during execution and the
                              overall execution should be terminated
+        jobs (int): Maximum number of repositories to apply the command to concurrently
+        engine (str): Name of the engine used to execute the command
+        cache (bool): Flag to indicate that repositories that are unchanged since the command last succeeded in them
+                      should be skipped
 
     Returns:
         None
@@ -82,8 +103,12 @@ def add(
         click.ClickException: If errors occur during processing
     """
     # Validate parameters
-    # Tags must already be added before they can be used
-    if any(t not in context.tags for t in tags):
+    # Tags must already be added before they can be used, including the tags of tag queries
+    try:
+        queried: Set[str] = {tag for query in tags for tag in TagQuery(query, context.tags).tags}
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if any(t not in context.tags for t in queried):
         raise click.ClickException(
             f"One of the tags in {list(tags)} has not been added, please run `gameta tags add` to add it first"
         )
@@ -93,6 +118,12 @@ def add(
             f"One of the repositories in {list(repositories)} does not exist, please run `gameta repo add` to "
             f"add it first"
         )
+    # Parameter predicates must be well-formed
+    try:
+        for predicate in where:
+            ParameterQuery(predicate)
+    except ValueError as e:
+        raise click.ClickException(str(e))
     # If Python flag is set, all commands must be valid Python scripts
     if python:
         try:
@@ -110,8 +141,14 @@ def add(
             'verbose': verbose,
             'shell': True if len(commands) > 1 else shell,
             'python': python,
-            'raise_errors': raise_errors
+            'raise_errors': raise_errors,
+            'jobs': jobs,
+            'engine': engine,
+            'cache': cache
         }
+        # Predicates are only stored if provided so that existing commands are unchanged
+        if where:
+            gameta_command['where'] = list(where)
 
         click.echo(f"Adding command {name} with parameters ({gameta_command}) to the command store")
         if name in context.commands:
@@ -163,9 +200,11 @@ def delete(context: GametaContext, name: str) -> None:
               help='New CLI commands to be executed')
 @click.option('--description', '-d', type=str, default=None, help='Brief description of the Gameta command')
 @click.option('--tags', '-t', type=str, multiple=True, default=None,
-              help='New repository tags to apply CLI commands to')
+              help="New repository tags or tag queries e.g. 'a & !b | c' to apply CLI commands to")
 @click.option('--repositories', '-r', type=str, multiple=True, default=None,
               help='New repositories to apply CLI commands to')
+@click.option('--where', '-w', type=str, multiple=True, default=None,
+              help="New parameter predicates e.g. 'team in (a, b)' that repositories must match")
 @click.option('--verbose/--no-verbose', '-v/-nv', is_flag=True, default=None,
               help='Display execution output when CLI command is applied')
 @click.option('--shell/--no-shell', '-s/-ns', is_flag=True, default=None,
@@ -174,6 +213,12 @@ def delete(context: GametaContext, name: str) -> None:
               help='Execute Python scripts using Python 3 interpreter')
 @click.option('--raise-errors/--no-errors', '-e/-ne', is_flag=True, default=None,
               help='Raise errors that occur when executing CLI commands and terminate execution')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=None,
+              help='Maximum number of repositories to apply CLI commands to concurrently')
+@click.option('--engine', type=click.Choice(list(engines.keys())), default=None,
+              help='Engine used to execute CLI commands')
+@click.option('--cache/--no-cache', is_flag=True, default=None,
+              help='Skip repositories that are unchanged since the CLI commands last succeeded in them')
 @gameta_context
 def update(
         context: GametaContext,
@@ -182,10 +227,14 @@ def update(
         description: Optional[str],
         tags: Optional[Tuple[str]],
         repositories: Optional[Tuple[str]],
+        where: Optional[Tuple[str]],
         verbose: Optional[bool],
         shell: Optional[bool],
         python: Optional[bool],
-        raise_errors: Optional[bool]
+        raise_errors: Optional[bool],
+        jobs: Optional[int],
+        engine: Optional[str],
+        cache: Optional[bool]
 ) -> None:
     """
     Updates an existing Gameta command in the Gameta command store
@@ -197,11 +246,16 @@ def update(
         description (Optional[str]): Brief description of CLI command
         tags (Optional[Tuple[str]]): Repository tags to apply command to
         repositories (Optional[Tuple[str]]): Repositories to apply command to
+        where (Optional[Tuple[str]]): Parameter predicates that the repositories applied to must all match
         verbose (Optional[bool]): Flag to indicate that output should be displayed as the command is applied
         shell (Optional[bool]): Flag to indicate that command should be executed in a separate shell
         python (Optional[bool]): Flag to indicate that command should be executed by the Python 3 interpreter
         raise_errors (Optional[bool]): Flag to indicate that errors should be raised if they occur during execution and
                                        the overall execution should be terminated
+        jobs (Optional[int]): Maximum number of repositories to apply the command to concurrently
+        engine (Optional[str]): Name of the engine used to execute the command
+        cache (Optional[bool]): Flag to indicate that repositories that are unchanged since the command last succeeded
+                                in them should be skipped
 
     Returns:
         None
@@ -216,10 +270,14 @@ def update(
         'description': description,
         'tags': tags,
         'repositories': repositories,
+        'where': where,
         'verbose': verbose,
         'shell': shell,
         'python': python,
-        'raise_errors': raise_errors
+        'raise_errors': raise_errors,
+        'jobs': jobs,
+        'engine': engine,
+        'cache': cache
     }
     if name not in context.commands:
         raise click.ClickException(f"Command {name} does not exist in the command store")
@@ -231,6 +289,7 @@ def update(
             if not (
                 isinstance(value, str) or
                 isinstance(value, bool) or
+                isinstance(value, int) or
                 (isinstance(value, tuple) and len(value) > 0)
             ):
                 continue
@@ -247,8 +306,12 @@ def update(
         # Multiple commands need to be accompanied with the shell parameter
         if len(updated_command['commands']) > 1 and updated_command['shell'] is False:
             raise click.ClickException('Multiple CLI commands requires shell param to be True')
-        # Tags must already be added before they can be used
-        if any(t not in context.tags for t in tags):
+        # Tags must already be added before they can be used, including the tags of tag queries
+        try:
+            queried: Set[str] = {tag for query in tags for tag in TagQuery(query, context.tags).tags}
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        if any(t not in context.tags for t in queried):
             raise click.ClickException(
                 f"One of the tags in {list(tags)} has not been added, please run `gameta tags add` to add it first"
             )
@@ -258,6 +321,12 @@ def update(
                 f"One of the repositories in {list(repositories)} does not exist, please run `gameta repo add` to "
                 f"add it first"
             )
+        # Parameter predicates must be well-formed
+        try:
+            for predicate in updated_command.get('where', []):
+                ParameterQuery(predicate)
+        except ValueError as e:
+            raise click.ClickException(str(e))
         # If Python flag is set, all commands need to be valid Python scripts
         if updated_command['python']:
             try:
@@ -317,9 +386,13 @@ def ls(context: GametaContext) -> None:
         formatters: Dict[str, Callable[[Any], str]] = {
             'commands': lambda v: ' && '.join(v),
             'tags': lambda v: ', '.join(v),
-            'repositories': lambda v: ', '.join(v)
+            'repositories': lambda v: ', '.join(v),
+            'where': lambda v: ', '.join(v)
         }
-        for key in ['description', 'commands', 'tags', 'repositories', 'verbose', 'shell', 'python', 'raise_errors']:
+        for key in [
+            'description', 'commands', 'tags', 'repositories', 'where', 'verbose', 'shell', 'python', 'raise_errors',
+            'jobs', 'engine', 'cache'
+        ]:
             if key in details:
                 command_string += '\t' + param_string.format(key, formatters.get(key, str)(details.get(key)))
 
@@ -335,18 +408,50 @@ def ls(context: GametaContext) -> None:
 @command_cli.command()
 @click.option('--command', '-c', 'commands', type=str, multiple=True, required=True,
               help='Gameta commands to be invoked')
+@click.option('--profile', type=click.IntRange(min=1), default=None,
+              help='Print the resource usage of the N repositories with the longest wall times for each Gameta command')
+@click.option('--report', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Write the outcome and resource usage of all repositories to a JSON file')
+@click.option('--output', type=click.Choice(['text', 'jsonl']), default='text',
+              help='Format of the execution output, jsonl writes events to stdout and messages to stderr')
+@click.option('--log-dir', type=click.Path(file_okay=False, writable=True), default=None,
+              help='Write the output of each repository to <repository>.log in this directory')
+@click.option('--log-tail', type=click.IntRange(min=0), default=4,
+              help='Kilobytes at the end of the output of each failed repository printed when output is logged')
 @click.pass_context
-def exec(context: click.Context, commands: Tuple[str]) -> None:
+def exec(
+        context: click.Context,
+        commands: Tuple[str],
+        profile: Optional[int],
+        report: Optional[str],
+        output: str,
+        log_dir: Optional[str],
+        log_tail: int
+) -> None:
     """
     Executes Gameta commands from the CLI command store
     \f
     Args:
         context (click.Context): Click Context
         commands (Tuple[str]): Gameta commands to be executed
+        profile (Optional[int]): Number of repositories with the longest wall times to print the resource usage of
+        report (Optional[str]): Path of the JSON file to write the outcome and resource usage of all repositories to,
+                                the name of the Gameta command is added to the file name if multiple Gameta commands
+                                are executed
+        output (str): Format of the execution output, either text or jsonl
+        log_dir (Optional[str]): Directory the output of each repository is logged to, logs of each Gameta command are
+                                 written to a subdirectory named after it if multiple Gameta commands are executed
+        log_tail (int): Number of kilobytes at the end of the output of each failed repository to be printed
 
     Returns:
         None
 
+    Examples:
+        $ gameta cmd exec -c build --profile 10  # Prints the 10 repositories with the longest build times
+        $ gameta cmd exec -c lint -c build --report usage.json  # Writes to usage.lint.json and usage.build.json
+        $ gameta cmd exec -c build --output jsonl  # Machine-readable events
+        $ gameta cmd exec -c lint -c build --log-dir logs  # Writes to logs/lint/<repo>.log and logs/build/<repo>.log
+
     Raises:
         click.ClickException: If errors occur during processing
     """
@@ -360,10 +465,28 @@ def exec(context: click.Context, commands: Tuple[str]) -> None:
         Returns:
             Dict: Structured command output
         """
-        return {
+        command: Dict = {
             p: g_context.commands[command_name][p]
             for p in ['commands', 'tags', 'repositories', 'verbose', 'shell', 'raise_errors', 'python']
         }
+        # Optional parameters fall back to the defaults of gameta apply
+        command.update({
+            p: g_context.commands[command_name][p]
+            for p in ['where', 'jobs', 'engine', 'cache'] if p in g_context.commands[command_name]
+        })
+        command['profile'] = profile
+        command['output'] = output
+        if report is not None and len(commands) > 1:
+            root, extension = splitext(report)
+            command['report'] = f'{root}.{command_name}{extension}'
+        else:
+            command['report'] = report
+        if log_dir is not None and len(commands) > 1:
+            command['log_dir'] = join(log_dir, command_name)
+        else:
+            command['log_dir'] = log_dir
+        command['log_tail'] = log_tail
+        return command
 
     from gameta.apply import apply
 
@@ -375,9 +498,9 @@ def exec(context: click.Context, commands: Tuple[str]) -> None:
         )
 
     try:
-        click.echo(f"Executing {list(commands)}")
+        click.echo(f"Executing {list(commands)}", err=output == 'jsonl')
         for command in commands:
-            click.echo(f"Executing Gameta command {command}")
+            click.echo(f"Executing Gameta command {command}", err=output == 'jsonl')
             context.invoke(apply, **get_command(command))
     except click.ClickException:
         raise
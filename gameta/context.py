@@ -1,17 +1,35 @@
+import fcntl
+import hashlib
 import json
+import marshal
+import os
 import shlex
+import sqlite3
+import time
 from abc import abstractmethod
-from contextlib import contextmanager
-from copy import deepcopy
-from os import getenv, getcwd, chdir, environ
-from os.path import join, basename, normpath, abspath
-from typing import Optional, List, Generator, Dict, Tuple, Union
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager, ExitStack
+from glob import glob
+from itertools import islice
+from os import environ
+from os.path import join, basename, normpath, isdir, isfile, exists, dirname, relpath, realpath, getsize
+from typing import (
+    Optional, List, Generator, Dict, Tuple, Union, Set, Mapping, Iterator, Any, FrozenSet, Iterable, Hashable
+)
+from urllib.request import pathname2url
 
 import click
 
 
+from jsonschema import ValidationError
 from jsonschema.validators import Draft7Validator
 
+from . import __version__
+from .engines import SHELL, engines
+from .query import TagQuery, ParameterQuery
+from .templates import Template
+
 
 __all__ = [
     # Contexts
@@ -19,21 +37,145 @@ __all__ = [
 ]
 
 
-SHELL = getenv('SHELL', '/bin/sh')
+# Directory of the working files of Gameta, relative to the metarepo, its content is ignored by git
+GAMETA_DIR: str = '.gameta'
+GAMETA_GITIGNORE: str = '*\n'
+
+# Directory of the repositories shared with Python commands, relative to the metarepo
+SHARED_DIR: str = join(GAMETA_DIR, 'repos')
+SHARED_MAX_AGE: float = 24 * 60 * 60
+
+# Directory of the script files of commands that cannot be passed as arguments, relative to the metarepo
+SCRIPTS_DIR: str = join(GAMETA_DIR, 'scripts')
+# Maximum number of bytes of a command passed as an argument, the kernel limits a single argument to 128 KiB
+MAX_INLINE_SCRIPT: int = 32 * 1024
+
+# Validation results of the .meta file, relative to the metarepo
+VALIDATED_FILE: str = join(GAMETA_DIR, 'validated')
+
+# Snapshot of the loaded GametaContext, relative to the metarepo
+SNAPSHOT_FILE: str = join(GAMETA_DIR, 'snapshot')
+# Files modified within this many seconds are not snapshotted or indexed, as changes within the resolution of their
+# modification times would go undetected
+RACY_INTERVAL: float = 2
+
+# Names, tags and dependencies of the repositories in the shards of the .meta file, relative to the metarepo
+SHARD_INDEX_FILE: str = join(GAMETA_DIR, 'shards')
+# Maximum number of shards of the .meta file loaded at a time
+SHARD_WORKERS: int = 8
+# Repositories in a shard, repositories of each of their tags and dependencies of the repositories that declare any
+Summary = Tuple[List[str], Dict[str, List[str]], Dict[str, List[str]]]
+
+# Journal of the changes made to the .meta file, relative to the metarepo, changes are appended to it instead of
+# rewriting the .meta file if it exists
+JOURNAL_FILE: str = '.meta.journal'
+# Journals are compacted into the .meta file once they are larger than it, or than this many bytes for small .meta files
+JOURNAL_COMPACTION_SIZE: int = 64 * 1024
+
+# SQLite database storing the .meta file of large metarepos, relative to the metarepo
+DATABASE_FILE: str = '.meta.db'
+# Repositories are stored one per row with their tags and parameter values, which are keyed as in ParameterQuery
+DATABASE_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS sections (name TEXT PRIMARY KEY, position INTEGER NOT NULL, data TEXT);
+CREATE TABLE IF NOT EXISTS repositories (
+    name TEXT PRIMARY KEY, position INTEGER NOT NULL, path TEXT, details TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS repositories_path ON repositories (path);
+CREATE TABLE IF NOT EXISTS tags (repository TEXT NOT NULL, tag TEXT NOT NULL, PRIMARY KEY (repository, tag));
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+CREATE TABLE IF NOT EXISTS parameters (
+    repository TEXT NOT NULL, parameter TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (repository, parameter)
+);
+CREATE INDEX IF NOT EXISTS parameters_value ON parameters (parameter, value);
+"""
+# Version of the database, stored as its user_version. Databases of earlier versions may not have kept the tags and
+# parameter values of their repositories in sync, so they are loaded in full and reindexed when they are next exported.
+DATABASE_VERSION: int = 1
+
+
+def write_file(file: str, content: str) -> bool:
+    """
+    Writes a file atomically, the content is written to a temporary file in the same directory, flushed to disk and
+    renamed over the file so that readers never see a partially written file. Files that already have the content are
+    not written, so that their modification times are preserved.
+
+    Args:
+        file (str): Absolute path of the file, symbolic links are resolved so that they are preserved
+        content (str): Content of the file
+
+    Returns:
+        bool: Flag to indicate that the file was written
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    file = realpath(file)
+    try:
+        with open(file, 'r') as f:
+            if f.read() == content:
+                return False
+        mode: Optional[int] = os.stat(file).st_mode & 0o7777
+    except (OSError, ValueError):
+        mode = None
+    temp: str = f'{file}.{os.getpid()}.tmp'
+    try:
+        with open(temp, 'w') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(temp, mode)
+        os.replace(temp, file)
+    except BaseException:
+        if exists(temp):
+            os.remove(temp)
+        raise
+    return True
+
+
+def make_dirs(directory: str) -> None:
+    """
+    Creates a directory and its parents if they do not exist, directories within the .gameta directory of a metarepo
+    also get a .gitignore file in the .gameta directory so that its working files are kept out of version control
+
+    Args:
+        directory (str): Absolute path of the directory
+
+    Returns:
+        None
+
+    Raises:
+        OSError: If the directory cannot be created
+    """
+    os.makedirs(directory, exist_ok=True)
+    parent: str = directory
+    while basename(parent) != GAMETA_DIR:
+        if dirname(parent) == parent:
+            return
+        parent = dirname(parent)
+    gitignore: str = join(parent, '.gitignore')
+    if not exists(gitignore):
+        write_file(gitignore, GAMETA_GITIGNORE)
 
 
 class File(object):
     """
-    Generic file interface for Gameta file formats
+    Generic file interface for Gameta file formats. The sections of the GametaContext stored in the file are
+    fingerprinted when the file is loaded or exported, so that the file is only exported if a section has changed.
 
     Attributes:
         context (GametaContext): Reference to Gameta Context
         file_name (str): Name of the reference file
+        valid (bool): Flag to indicate that the file was last loaded without errors
+        fingerprints (Dict[Hashable, Optional[bytes]]): Fingerprints of the sections, or of their elements, as last
+                                                        loaded or exported, empty if they have not been recorded
     """
 
     def __init__(self, context: 'GametaContext', file_name: str):
         self.context = context
         self.file_name = file_name
+        self.valid: bool = True
+        self.fingerprints: Dict[Hashable, Optional[bytes]] = {}
 
     @property
     def file(self) -> str:
@@ -45,140 +187,1510 @@ class File(object):
         """
         return join(self.context.project_dir, self.file_name)
 
+    @property
+    def sources(self) -> List[str]:
+        """
+        Returns the absolute paths to the files that data is loaded from
+
+        Returns:
+            List[str]: Absolute paths to the files
+        """
+        return [self.file]
+
+    @abstractmethod
+    def load(self) -> None:
+        """
+        Abstractmethod to load data and validate data from the file and populate the GametaContext
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    def export(self) -> None:
+        """
+        Abstractmethod to export data from the GametaContext to the file
+
+        Returns:
+            None
+        """
+
     @abstractmethod
+    def contents(self) -> Dict[str, Any]:
+        """
+        Abstractmethod to retrieve the sections of the GametaContext stored in the file
+
+        Returns:
+            Dict[str, Any]: Data of each section
+        """
+
+    def digest(self) -> Dict[Hashable, Optional[bytes]]:
+        """
+        Fingerprints the sections of the GametaContext stored in the file. Sections with shared references may be
+        serialised differently even if they are equal, which only results in the file being compared with its content.
+
+        Returns:
+            Dict[Hashable, Optional[bytes]]: Serialised data of each section, None if it cannot be serialised
+        """
+        fingerprints: Dict[Hashable, Optional[bytes]] = {}
+        for name, section in self.contents().items():
+            try:
+                fingerprints[name] = marshal.dumps(section)
+            except ValueError:
+                fingerprints[name] = None
+        return fingerprints
+
+    def record(self, fingerprints: Optional[Dict[Hashable, Optional[bytes]]] = None) -> None:
+        """
+        Records the sections of the GametaContext stored in the file as unchanged
+
+        Args:
+            fingerprints (Optional[Dict[Hashable, Optional[bytes]]]): Fingerprints of the sections, defaults to those
+                                                                      of the current sections
+
+        Returns:
+            None
+        """
+        self.fingerprints = self.digest() if fingerprints is None else fingerprints
+
+    def dirty(self, fingerprints: Dict[Hashable, Optional[bytes]]) -> Set[Hashable]:
+        """
+        Returns the sections, or their elements, that have changed, been added or been removed since they were recorded.
+        If they have only been reordered, all of them have changed.
+
+        Args:
+            fingerprints (Dict[Hashable, Optional[bytes]]): Fingerprints of the current sections
+
+        Returns:
+            Set[Hashable]: Keys of the sections that have changed
+        """
+        dirty: Set[Hashable] = {
+            key for key, fingerprint in fingerprints.items()
+            if fingerprint is None or self.fingerprints.get(key) != fingerprint
+        }
+        dirty.update(key for key in self.fingerprints if key not in fingerprints)
+        if not dirty and list(fingerprints) != list(self.fingerprints):
+            return set(fingerprints)
+        return dirty
+
+
+class GitIgnore(File):
+    """
+    Interface for the .gitignore file
+
+    Attributes:
+        context (GametaContext): Reference to Gameta Context
+        file_name (str): Reference to the .gitignore file
+    """
+    def __init__(self, context: 'GametaContext', file_name: str = '.gitignore'):
+        super(GitIgnore, self).__init__(context, file_name)
+
+    def load(self) -> None:
+        """
+        Loads data from the .gitignore file and populates the GametaContext
+
+        Returns:
+            None
+        """
+        self.valid = True
+        try:
+            with open(self.file, 'r') as f:
+                self.context.gitignore_data = f.readlines()
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            self.valid = False
+            self.context.gitignore_data = []
+            click.echo(f"Could not load {self.file_name} file due to: {e.__class__.__name__}.{str(e)}")
+
+    def export(self) -> None:
+        """
+        Exports data from the GametaContext to the .gitignore file if it has changed
+
+        Returns:
+            None
+        """
+        fingerprints: Dict[Hashable, Optional[bytes]] = self.digest()
+        if not self.dirty(fingerprints):
+            return
+        try:
+            write_file(self.file, ''.join(self.context.gitignore_data))
+            self.record(fingerprints)
+        except Exception as e:
+            click.echo(f"Could not export data to {self.file_name} file: {e.__class__.__name__}.{str(e)}")
+
+    def contents(self) -> Dict[str, Any]:
+        """
+        Retrieves the sections of the GametaContext stored in the .gitignore file
+
+        Returns:
+            Dict[str, Any]: Gitignore data
+        """
+        return {'gitignore': self.context.gitignore_data}
+
+
+class ValidationCache(object):
+    """
+    Records the elements of the .meta file that have been validated against the JSON schema, keyed on digests of their
+    contents. Validation of a .meta file whose contents are unchanged is skipped entirely, otherwise only the elements
+    that have changed are validated. Cached results are discarded when the schema changes.
+
+    Attributes:
+        file (str): Absolute path of the validation cache file
+        schema (str): Digest of the JSON schema
+        digest (Optional[str]): Digest of the contents of the .meta file being validated
+        unchanged (bool): Flag to indicate that the .meta file has already been validated with the same contents
+        validated (Set[str]): Digests of the elements validated previously
+        current (Set[str]): Digests of the elements of the .meta file being validated
+        complete (bool): Flag to indicate that all elements of the .meta file are valid so far
+        added (bool): Flag to indicate that elements that were not validated previously have been validated
+    """
+
+    def __init__(self, file: str, schema: Dict):
+        self.file = file
+        self.schema: str = self.fingerprint(schema)
+        self.digest: Optional[str] = None
+        self.unchanged: bool = False
+        self.validated: Set[str] = set()
+        self.current: Set[str] = set()
+        self.complete: bool = True
+        self.added: bool = False
+
+    @staticmethod
+    def fingerprint(schema: Dict) -> str:
+        """
+        Generates the digest of a JSON schema, results cached against other schemas are discarded
+
+        Args:
+            schema (Dict): JSON schema
+
+        Returns:
+            str: Digest of the JSON schema
+        """
+        return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+    def load(self, content: Optional[bytes]) -> None:
+        """
+        Loads the validation results of the .meta file, a missing or corrupted cache file results in an empty cache
+
+        Args:
+            content (Optional[bytes]): Contents of the .meta file, None if the elements are not stored in a single file
+
+        Returns:
+            None
+        """
+        self.digest = hashlib.sha256(content).hexdigest() if content is not None else None
+        try:
+            with open(self.file) as f:
+                cache: Dict = json.load(f)
+            if cache.get('schema') == self.schema:
+                self.unchanged = self.digest is not None and cache.get('file') == self.digest
+                self.validated = set(cache.get('elements', []))
+        except (OSError, ValueError, AttributeError, TypeError):
+            self.validated = set()
+
+    def validate(self, group: str, validator: Draft7Validator, element: Any, shard: bool = False) -> None:
+        """
+        Validates an element of the .meta file unless it has been validated previously
+
+        Args:
+            group (str): Object group of the element e.g. repositories
+            validator (Draft7Validator): Validator of the object group
+            element (Any): Element to be validated
+            shard (bool): Flag to indicate that the element is in a shard of the .meta file, which is validated even if
+                          the .meta file is unchanged
+
+        Returns:
+            None
+
+        Raises:
+            jsonschema.ValidationError: If the element is invalid
+        """
+        if self.unchanged and not shard:
+            return
+        key: str = hashlib.sha256(json.dumps([group, element], sort_keys=True).encode()).hexdigest()
+        if key not in self.validated:
+            try:
+                validator.validate(element)
+            except Exception:
+                self.complete = False
+                raise
+            self.added = True
+        self.current.add(key)
+
+    def save(self, partial: bool = False) -> None:
+        """
+        Writes the validation results atomically, the .meta file is only recorded as validated if all of its elements
+        are valid. Results cannot be cached if the cache file cannot be written.
+
+        Args:
+            partial (bool): Flag to indicate that not all elements were validated e.g. as shards of the .meta file were
+                            not loaded, the results of the elements validated previously are retained
+
+        Returns:
+            None
+        """
+        if self.unchanged and not self.added:
+            return
+        try:
+            make_dirs(dirname(self.file))
+            temp: str = f'{self.file}.{os.getpid()}.tmp'
+            with open(temp, 'w') as f:
+                json.dump(
+                    {
+                        'schema': self.schema,
+                        'file': self.digest if self.complete else None,
+                        'elements': sorted(self.current | self.validated if self.unchanged or partial else self.current)
+                    }, f
+                )
+            os.replace(temp, self.file)
+        except OSError:
+            pass
+
+
+class Snapshot(object):
+    """
+    Binary snapshot of the data loaded into the GametaContext from its files, keyed on the modification times, sizes
+    and inodes of the files. A fresh snapshot is restored with a single read instead of parsing and validating the
+    files again. Only data that was loaded without errors is snapshotted, so that errors are reported on every load.
+
+    Attributes:
+        context (GametaContext): Reference to Gameta Context
+        file (str): Absolute path of the snapshot file
+    """
+
+    __attributes__: Tuple[str, ...] = (
+        'gameta_data', 'is_metarepo', 'repositories', 'commands', 'constants', 'tags', 'gitignore_data'
+    )
+
+    def __init__(self, context: 'GametaContext'):
+        self.context = context
+        self.file = join(context.project_dir, SNAPSHOT_FILE)
+
+    def stats(self) -> Tuple[Optional[Tuple[int, int, int]], ...]:
+        """
+        Retrieves the modification times, sizes and inodes of the files of the GametaContext and e.g. the journal of the
+        .meta file, these must be retrieved before the files are loaded so that changes made while loading are detected
+
+        Returns:
+            Tuple[Optional[Tuple[int, int, int]], ...]: Modification time in nanoseconds, size and inode of each file,
+                                                        None if the file does not exist
+        """
+        stats: List[Optional[Tuple[int, int, int]]] = []
+        for interface in self.context.files.values():
+            for file in interface.sources:
+                try:
+                    stat: os.stat_result = os.stat(file)
+                    stats.append((stat.st_mtime_ns, stat.st_size, stat.st_ino))
+                except OSError:
+                    stats.append(None)
+        return tuple(stats)
+
+    def key(self, stats: Tuple[Optional[Tuple[int, int, int]], ...]) -> Tuple:
+        """
+        Generates the key of a snapshot, snapshots written by other versions of Gameta, of other files e.g. after the
+        .meta file has been imported into a database, or validated against another schema e.g. after an engine has
+        been registered are discarded
+
+        Args:
+            stats (Tuple[Optional[Tuple[int, int, int]], ...]): Statistics of the files of the GametaContext
+
+        Returns:
+            Tuple: Key of the snapshot
+        """
+        return (
+            __version__, self.context.project_dir, ValidationCache.fingerprint(self.context.__schema__),
+            tuple(interface.file_name for interface in self.context.files.values()), stats
+        )
+
+    def restore(self, stats: Tuple[Optional[Tuple[int, int, int]], ...]) -> bool:
+        """
+        Populates the GametaContext from the snapshot if it is fresh
+
+        Args:
+            stats (Tuple[Optional[Tuple[int, int, int]], ...]): Statistics of the files of the GametaContext
+
+        Returns:
+            bool: Flag to indicate that the GametaContext was populated from the snapshot
+        """
+        try:
+            with open(self.file, 'rb') as f:
+                key, data = marshal.loads(f.read())
+        except (OSError, ValueError, EOFError, TypeError):
+            return False
+        if key != self.key(stats):
+            return False
+        for attribute, value in data.items():
+            setattr(self.context, attribute, value)
+        return True
+
+    def save(self, stats: Tuple[Optional[Tuple[int, int, int]], ...]) -> None:
+        """
+        Writes the snapshot atomically if the files of the GametaContext were loaded without errors and have not been
+        modified too recently for further modifications to be detected. Snapshots are skipped if the snapshot file
+        cannot be written.
+
+        Args:
+            stats (Tuple[Optional[Tuple[int, int, int]], ...]): Statistics of the files of the GametaContext, retrieved
+                                                                before they were loaded
+
+        Returns:
+            None
+        """
+        # Shards of the .meta file are loaded lazily instead
+        if not self.context.is_metarepo or self.context.shards or \
+                not all(interface.valid for interface in self.context.files.values()):
+            return
+        threshold: float = (time.time() - RACY_INTERVAL) * 1e9
+        if any(stat is not None and stat[0] > threshold for stat in stats):
+            return
+        try:
+            content: bytes = marshal.dumps(
+                (self.key(stats), {attribute: getattr(self.context, attribute) for attribute in self.__attributes__})
+            )
+            make_dirs(dirname(self.file))
+            temp: str = f'{self.file}.{os.getpid()}.tmp'
+            with open(temp, 'wb') as f:
+                f.write(content)
+            os.replace(temp, self.file)
+        except (OSError, ValueError):
+            pass
+
+
+class Shard(object):
+    """
+    Shard of the .meta file included by the glob patterns of its include element, containing the repositories of e.g.
+    a team. Shards are only loaded when their repositories are accessed, the names, tags and dependencies of the
+    repositories of shards that are unchanged are taken from the shard index instead. Shards are only written if their
+    repositories have changed.
+
+    Attributes:
+        context (GametaContext): Reference to Gameta Context
+        file_name (str): Path of the shard relative to the metarepo
+        stat (Optional[Tuple[int, int, int]]): Modification time in nanoseconds, size and inode of the shard when it was
+                                               discovered
+        summary (Summary): Repositories in the shard, repositories of each of their tags and dependencies of the
+                           repositories that declare any
+        data (Optional[Dict]): Contents of the shard, None if it has not been loaded
+        fingerprint (Optional[bytes]): Serialised contents of the shard as last loaded or exported
+    """
+
+    def __init__(self, context: 'GametaContext', file_name: str):
+        self.context = context
+        self.file_name = file_name
+        self.stat: Optional[Tuple[int, int, int]] = None
+        self.summary: Summary = ([], {}, {})
+        self.data: Optional[Dict] = None
+        self.fingerprint: Optional[bytes] = None
+
+    @property
+    def file(self) -> str:
+        """
+        Returns the absolute path to the shard
+
+        Returns:
+            str: Absolute path to the shard
+        """
+        return join(self.context.project_dir, self.file_name)
+
+    def load(self) -> None:
+        """
+        Loads the contents of the shard
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the shard cannot be loaded or does not contain a projects element
+        """
+        try:
+            with open(self.file, 'rb') as f:
+                data: Any = json.loads(f.read())
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Could not load shard {self.file_name} due to: {e.__class__.__name__}.{str(e)}")
+        if not isinstance(data, dict) or not isinstance(data.get('projects'), dict):
+            raise ValueError(f"Shard {self.file_name} does not contain a projects element")
+        self.data = data
+        self.fingerprint = marshal.dumps(data, 2)
+
+    def validate(self, cache: ValidationCache) -> None:
+        """
+        Validates the repositories of the shard and summarises their tags and dependencies
+
+        Args:
+            cache (ValidationCache): Validation results of the elements of the .meta file
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If a repository is malformed
+        """
+        for repo, details in self.data['projects'].items():
+            try:
+                cache.validate('repositories', self.context.validators['repositories'], details, shard=True)
+            except ValidationError as e:
+                raise ValueError(f"Repository {repo} in shard {self.file_name} is malformed: {e.message}")
+        # Tags are summarised per tag rather than per repository to keep the shard index compact
+        tags: Dict[str, List[str]] = {}
+        dependencies: Dict[str, List[str]] = {}
+        for repo, details in self.data['projects'].items():
+            for tag in details.get('tags', []):
+                tags.setdefault(tag, []).append(repo)
+            if details.get('depends_on'):
+                dependencies[repo] = list(details['depends_on'])
+        self.summary = (list(self.data['projects']), tags, dependencies)
+
+    def export(self, projects: Dict[str, Dict]) -> None:
+        """
+        Exports the repositories of the shard atomically, the shard is only written if it has been loaded and its
+        contents have changed
+
+        Args:
+            projects (Dict[str, Dict]): Repositories in the shard
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the shard cannot be written
+        """
+        if self.data is None:
+            return
+        data: Dict = {**self.data, 'projects': projects}
+        fingerprint: bytes = marshal.dumps(data, 2)
+        if fingerprint == self.fingerprint:
+            return
+        write_file(self.file, json.dumps(data, indent=2))
+        self.data = data
+        self.fingerprint = fingerprint
+
+
+class ShardIndex(object):
+    """
+    Records the names, tags and dependencies of the repositories in the shards of the .meta file, keyed on the
+    modification times, sizes and inodes of the shards, so that unchanged shards do not need to be loaded to select
+    repositories. Shards are only recorded after they have been validated.
+
+    Attributes:
+        file (str): Absolute path of the shard index file
+        entries (Dict[str, Tuple[Tuple[int, int, int], Summary]]): Statistics and summaries of the shards
+    """
+
+    def __init__(self, file: str):
+        self.file = file
+        self.entries: Dict[str, Tuple[Tuple[int, int, int], Summary]] = {}
+
+    def load(self) -> None:
+        """
+        Loads the shard index, a missing or corrupted shard index results in an empty index
+
+        Returns:
+            None
+        """
+        try:
+            with open(self.file, 'rb') as f:
+                key, entries = marshal.loads(f.read())
+            self.entries = entries if key == __version__ else {}
+        except (OSError, ValueError, EOFError, TypeError):
+            self.entries = {}
+
+    def lookup(self, shard: Shard) -> bool:
+        """
+        Summarises a shard from the shard index if it is unchanged since it was recorded
+
+        Args:
+            shard (Shard): Shard of the .meta file
+
+        Returns:
+            bool: Flag to indicate that the shard was summarised from the shard index
+        """
+        entry: Optional[Tuple] = self.entries.get(shard.file_name)
+        if shard.stat is None or entry is None or tuple(entry[0]) != shard.stat:
+            return False
+        shard.summary = entry[1]
+        return True
+
+    def save(self, shards: Iterable[Shard]) -> None:
+        """
+        Records the summaries of the shards, shards modified too recently for further modifications to be detected are
+        not recorded. The shard index is only written if it has changed, and is not written if it cannot be written.
+
+        Args:
+            shards (Iterable[Shard]): Validated shards of the .meta file
+
+        Returns:
+            None
+        """
+        threshold: float = (time.time() - RACY_INTERVAL) * 1e9
+        entries: Dict[str, Tuple[Tuple[int, int, int], Summary]] = {
+            shard.file_name: (shard.stat, shard.summary)
+            for shard in shards
+            if shard.stat is not None and shard.stat[0] <= threshold
+        }
+        if entries == self.entries:
+            return
+        try:
+            make_dirs(dirname(self.file))
+            temp: str = f'{self.file}.{os.getpid()}.tmp'
+            with open(temp, 'wb') as f:
+                f.write(marshal.dumps((__version__, entries)))
+            os.replace(temp, self.file)
+            self.entries = entries
+        except (OSError, ValueError):
+            pass
+
+
+class Journal(object):
+    """
+    Append-only journal of the changes made to the elements of the .meta file, each change sets or deletes a
+    repository, command or constant and is stored as a line of JSON. The journal is replayed over the .meta file when it
+    is loaded, and is compacted into the .meta file once it grows larger than it. Changes are idempotent, so a journal
+    that is replayed over a .meta file that already contains its changes has no effect. The journal is locked across
+    processes while it is read or written, see Journal.lock.
+
+    Attributes:
+        file (str): Absolute path of the journal file
+        errors (List[str]): Malformed entries skipped when the journal was last replayed
+        locked (bool): Flag to indicate that the journal is locked by this instance
+    """
+
+    def __init__(self, file: str):
+        self.file = file
+        self.errors: List[str] = []
+        self.locked: bool = False
+
+    @contextmanager
+    def lock(self, shared: bool = False) -> Generator[None, None, None]:
+        """
+        Locks the journal with an advisory lock of its file, waiting for other processes to release theirs. The lock is
+        held until the outermost block of this instance exits, so that the journal can be read and written within it.
+
+        Args:
+            shared (bool): Flag to indicate that the journal is only read, so other readers need not wait
+
+        Returns:
+            Generator[None, None, None]: Block within which the journal is locked
+
+        Raises:
+            OSError: If the journal cannot be opened e.g. it does not exist
+        """
+        if self.locked:
+            yield
+            return
+        with open(self.file, 'rb') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            self.locked = True
+            try:
+                yield
+            finally:
+                self.locked = False
+
+    @staticmethod
+    def apply(data: Dict, entry: Any) -> None:
+        """
+        Applies an entry of the journal to the data of the .meta file
+
+        Args:
+            data (Dict): Data of the .meta file
+            entry (Any): Entry of the journal
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the entry is malformed
+        """
+        if not isinstance(entry, dict) or entry.get('op') not in ('set', 'delete') or \
+                entry.get('section') not in ('projects', 'commands', 'constants') or \
+                not isinstance(entry.get('name'), str) or (entry['op'] == 'set' and 'value' not in entry):
+            raise ValueError(f"Malformed entry {entry}")
+        section: Any = data.setdefault(entry['section'], {})
+        if not isinstance(section, dict):
+            raise ValueError(f"Section {entry['section']} is not an object")
+        if entry['op'] == 'set':
+            section[entry['name']] = entry['value']
+        else:
+            section.pop(entry['name'], None)
+
+    def replay(self, data: Dict) -> bytes:
+        """
+        Replays the journal over the data of the .meta file, malformed entries are skipped and recorded, and an
+        incomplete last entry left by an interrupted write is ignored
+
+        Args:
+            data (Dict): Data of the .meta file, updated with the changes
+
+        Returns:
+            bytes: Complete entries of the journal
+
+        Raises:
+            OSError: If the journal cannot be read
+        """
+        with self.lock(shared=True), open(self.file, 'rb') as f:
+            content: bytes = f.read()
+        content = content[:content.rfind(b'\n') + 1]
+        self.errors = []
+        for number, line in enumerate(content.splitlines(), 1):
+            try:
+                self.apply(data, json.loads(line))
+            except ValueError as e:
+                self.errors.append(f"Entry {number}: {e.__class__.__name__}.{str(e)}")
+        return content
+
+    def append(self, entries: List[Dict]) -> int:
+        """
+        Appends entries to the journal and flushes them to disk, an incomplete last entry left by an interrupted write
+        is discarded first
+
+        Args:
+            entries (List[Dict]): Entries to be appended
+
+        Returns:
+            int: Size of the journal in bytes
+
+        Raises:
+            OSError: If the journal cannot be written
+        """
+        content: bytes = ''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries).encode()
+        with self.lock(), open(self.file, 'r+b') as f:
+            end: int = f.seek(0, os.SEEK_END)
+            start: int = end
+            while start > 0:
+                block: int = max(start - 4096, 0)
+                f.seek(block)
+                newline: int = f.read(start - block).rfind(b'\n')
+                if newline != -1:
+                    start = block + newline + 1
+                    break
+                start = block
+            f.seek(start)
+            f.truncate()
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        return start + len(content)
+
+    def reset(self) -> None:
+        """
+        Empties the journal once its changes have been written to the .meta file, the journal is truncated in place
+        rather than replaced so that other processes waiting for its lock see it emptied
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the journal cannot be written
+        """
+        if not exists(self.file):
+            return
+        with self.lock(), open(self.file, 'r+b') as f:
+            if f.seek(0, os.SEEK_END):
+                f.truncate(0)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class Meta(File):
+    """
+    Interface for the .meta file. If the .meta file has a journal, the changes made to its elements are appended to the
+    journal instead of rewriting the .meta file, see Journal.
+
+    Attributes:
+        context (GametaContext): Reference to Gameta Context
+        file_name (str): Reference to the .meta file
+        journaled (bool): Flag to indicate that the journal of the .meta file existed when the elements were last
+                          recorded, elements are then fingerprinted individually to determine the changes to journal
+    """
+
+    def __init__(self, context: 'GametaContext', file_name: str = '.meta'):
+        super(Meta, self).__init__(context, file_name)
+        self.journaled: bool = False
+
+    @property
+    def journal(self) -> Optional[Journal]:
+        """
+        Returns the journal of the .meta file, whether it exists or not
+
+        Returns:
+            Optional[Journal]: Journal of the .meta file, None if the file format is not journaled
+        """
+        return Journal(join(self.context.project_dir, JOURNAL_FILE))
+
+    @property
+    def sources(self) -> List[str]:
+        """
+        Returns the absolute paths to the .meta file and its journal
+
+        Returns:
+            List[str]: Absolute paths to the files
+        """
+        journal: Optional[Journal] = self.journal
+        return [self.file] if journal is None else [self.file, journal.file]
+
     def load(self) -> None:
         """
-        Abstractmethod to load data and validate data from the file and populate the GametaContext
+        Loads data from the .meta file and replays its journal over it, validates it and populates the GametaContext
+
+        Returns:
+            None
+        """
+        content: bytes = b''
+        self.valid = True
+        journal: Optional[Journal] = self.journal
+        with ExitStack() as stack:
+            # The .meta file and its journal are read under the lock of the journal, so that it is not compacted between
+            if journal is not None:
+                try:
+                    stack.enter_context(journal.lock(shared=True))
+                except FileNotFoundError:
+                    pass
+
+            # Attempt to load .meta file
+            try:
+                with open(self.file, 'rb') as f:
+                    content = f.read()
+                self.context.gameta_data = json.loads(content)
+            except FileNotFoundError:
+                return
+            except Exception as e:
+                self.valid = False
+                click.echo(f"Could not load {self.file_name} file due to: {e.__class__.__name__}.{str(e)}")
+
+            # The journal is part of the contents validated, so that the changes journaled are validated
+            if self.valid and journal is not None and isinstance(self.context.gameta_data, dict):
+                try:
+                    content += journal.replay(self.context.gameta_data)
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    self.valid = False
+                    click.echo(f"Could not load {JOURNAL_FILE} file due to: {e.__class__.__name__}.{str(e)}")
+                for error in journal.errors:
+                    self.valid = False
+                    click.echo(f"Skipped malformed entry of {JOURNAL_FILE} file: {error}")
+
+        self.populate(content)
+
+    def populate(self, content: Optional[bytes]) -> None:
+        """
+        Validates the data loaded into the GametaContext and populates its repositories, commands and constants
+
+        Args:
+            content (Optional[bytes]): Contents of the file the data was loaded from, None if the contents cannot be
+                                       compared as a whole
+
+        Returns:
+            None
+        """
+        # Elements that have been validated with the same contents previously are not validated again
+        cache: ValidationCache = ValidationCache(
+            join(self.context.project_dir, VALIDATED_FILE), self.context.__schema__
+        )
+        cache.load(content)
+
+        # Validate repositories
+        try:
+            for repo in self.context.gameta_data['projects'].values():
+                cache.validate('repositories', self.context.validators['repositories'], repo)
+            self.context.repositories = self.context.gameta_data['projects']
+            self.discover(cache)
+            self.context.is_metarepo = True
+            self.context.generate_tags()
+            self.context.validate_dependencies()
+        except Exception as e:
+            self.context.repositories = {}
+            self.context.tags = {}
+            self.context.shards, self.context.owners, self.context.pending = {}, {}, set()
+            self.valid = False
+            click.echo(f"Malformed repository element, error: {e.__class__.__name__}.{str(e)}")
+
+        # Validate commands
+        try:
+            for command in self.context.gameta_data.get('commands', {}).values():
+                cache.validate('commands', self.context.validators['commands'], command)
+            self.context.commands = self.context.gameta_data.get('commands', {})
+        except Exception as e:
+            self.context.commands = {}
+            self.valid = False
+            click.echo(f"Malformed commands element, error: {e.__class__.__name__}.{str(e)}")
+
+        # Validate constants
+        try:
+            cache.validate(
+                'constants', self.context.validators['constants'], self.context.gameta_data.get('constants', {})
+            )
+            self.context.constants = self.context.gameta_data.get('constants', {})
+        except Exception as e:
+            self.context.constants = {}
+            self.valid = False
+            click.echo(f"Malformed constants element, error: {e.__class__.__name__}.{str(e)}")
+
+        if self.context.is_metarepo:
+            cache.save(partial=bool(self.context.pending))
+
+    def discover(self, cache: ValidationCache) -> None:
+        """
+        Discovers the shards of the .meta file matching the glob patterns of its include element. Shards that are
+        unchanged since they were recorded in the shard index are left to be loaded when their repositories are
+        accessed, other shards are loaded and validated in parallel.
+
+        Args:
+            cache (ValidationCache): Validation results of the elements of the .meta file
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the include element or a shard is malformed, or a repository is defined more than once
+        """
+        self.context.shards, self.context.owners, self.context.pending = {}, {}, set()
+        patterns: Any = self.context.gameta_data.get('include', [])
+        if not isinstance(patterns, list) or not all(isinstance(pattern, str) for pattern in patterns):
+            raise ValueError("Include element must be a list of glob patterns")
+        if not patterns:
+            return
+
+        index: ShardIndex = ShardIndex(join(self.context.project_dir, SHARD_INDEX_FILE))
+        index.load()
+        loaded: List[Shard] = []
+        for pattern in patterns:
+            for path in sorted(glob(join(self.context.project_dir, pattern))):
+                file_name: str = relpath(path, self.context.project_dir)
+                if file_name in self.context.shards or file_name == self.file_name or not isfile(path):
+                    continue
+                shard: Shard = Shard(self.context, file_name)
+                self.context.shards[file_name] = shard
+                stat: os.stat_result = os.stat(path)
+                shard.stat = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                if index.lookup(shard):
+                    self.context.pending.add(file_name)
+                else:
+                    loaded.append(shard)
+
+        def load(shard: Shard) -> None:
+            shard.load()
+            shard.validate(cache)
+        # Parsing is bound by the GIL, so loading shards in parallel mainly overlaps reading them
+        with ThreadPoolExecutor(max_workers=max(min(len(loaded), SHARD_WORKERS), 1)) as pool:
+            list(pool.map(load, loaded))
+
+        # Repositories of the shards are kept apart from those of the .meta file, which are exported to it
+        self.context.repositories = dict(self.context.gameta_data['projects'])
+        for file_name, shard in self.context.shards.items():
+            for repo in shard.summary[0]:
+                if repo in self.context.owners or repo in self.context.gameta_data['projects']:
+                    raise ValueError(
+                        f"Repository {repo} in shard {file_name} is already defined in "
+                        f"{self.context.owners.get(repo, self.file_name)}"
+                    )
+                self.context.owners[repo] = file_name
+            if shard.data is not None:
+                self.context.loaded.update(shard.data['projects'])
+        index.save(self.context.shards.values())
+
+    def export(self) -> None:
+        """
+        Exports data from the GametaContext to the .meta file if it has changed, and to the shards whose repositories
+        have changed
+
+        Returns:
+            None
+        """
+        fingerprints: Dict[Hashable, Optional[bytes]] = self.digest()
+        dirty: Set[Hashable] = self.dirty(fingerprints)
+        if not dirty:
+            return
+        try:
+            if self.append(fingerprints, dirty):
+                self.record(fingerprints)
+                return
+            shards: Dict[str, Dict[str, Dict]] = self.update()
+            self.write()
+        except Exception as e:
+            click.echo(f"Could not export data to {self.file_name} file: {e.__class__.__name__}.{str(e)}")
+            return
+
+        # Sections are only recorded once every file they are stored in has been written, so that failures are retried
+        exported: bool = True
+        if 'projects' in dirty:
+            for file_name, shard in self.context.shards.items():
+                try:
+                    shard.export(shards.get(file_name, {}))
+                except Exception as e:
+                    exported = False
+                    click.echo(f"Could not export data to {file_name} file: {e.__class__.__name__}.{str(e)}")
+        if exported:
+            self.record(fingerprints)
+
+    def contents(self) -> Dict[str, Any]:
+        """
+        Retrieves the sections of the GametaContext stored in the .meta file, the repositories of shards that have not
+        been loaded are left out as they cannot have changed
+
+        Returns:
+            Dict[str, Any]: Repositories, commands and constants
+        """
+        return {'projects': self.context.loaded, 'commands': self.context.commands, 'constants': self.context.constants}
+
+    @staticmethod
+    def fingerprint(element: Any) -> bytes:
+        """
+        Serialises an element of the .meta file to compare it with the element recorded, version 2 of the marshal
+        format does not share references so that equal elements are always serialised identically
+
+        Args:
+            element (Any): Element of the .meta file e.g. repository details
+
+        Returns:
+            bytes: Serialised element
+        """
+        return marshal.dumps(element, 2)
+
+    def digest(self) -> Dict[Hashable, Optional[bytes]]:
+        """
+        Fingerprints the sections of the GametaContext stored in the .meta file, or each of their elements if the .meta
+        file is journaled
+
+        Returns:
+            Dict[Hashable, Optional[bytes]]: Serialised data of each section, or of each element keyed on its section
+                                             and name, None if it cannot be serialised
+        """
+        if not self.journaled:
+            return super(Meta, self).digest()
+        fingerprints: Dict[Hashable, Optional[bytes]] = {}
+        for section, elements in self.contents().items():
+            for name, element in elements.items():
+                try:
+                    fingerprints[(section, name)] = marshal.dumps(element, 2)
+                except ValueError:
+                    fingerprints[(section, name)] = None
+        return fingerprints
+
+    def record(self, fingerprints: Optional[Dict[Hashable, Optional[bytes]]] = None) -> None:
+        """
+        Records the sections of the GametaContext stored in the .meta file as unchanged, whether the .meta file is
+        journaled is determined when they are recorded after it has been loaded. The .meta file is not journaled if it
+        has shards, which are only written if their repositories have changed.
+
+        Args:
+            fingerprints (Optional[Dict[Hashable, Optional[bytes]]]): Fingerprints of the sections, defaults to those
+                                                                      of the current sections
+
+        Returns:
+            None
+        """
+        if fingerprints is None:
+            journal: Optional[Journal] = self.journal
+            self.journaled = journal is not None and not self.context.shards and exists(journal.file)
+        super(Meta, self).record(fingerprints)
+
+    def changes(
+            self, fingerprints: Dict[Hashable, Optional[bytes]], dirty: Set[Hashable]
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Determines the journal entries that change the elements of the .meta file as recorded into its current elements
+
+        Args:
+            fingerprints (Dict[Hashable, Optional[bytes]]): Fingerprints of the current elements
+            dirty (Set[Hashable]): Elements that have changed, been added or been removed
+
+        Returns:
+            Tuple[List[Dict], bool]: Journal entries, and a flag to indicate that replaying them preserves the order of
+                                     the elements, which it does not if elements have been reordered as replayed
+                                     elements are only ever appended to their sections
+        """
+        contents: Dict[str, Any] = self.contents()
+        # Elements are set in their current order, so that elements that have been added are replayed in order
+        entries: List[Dict] = [
+            {'op': 'delete', 'section': section, 'name': name}
+            for section, name in self.fingerprints if (section, name) in dirty and (section, name) not in fingerprints
+        ]
+        entries.extend(
+            {'op': 'set', 'section': section, 'name': name, 'value': contents[section][name]}
+            for section, name in fingerprints if (section, name) in dirty
+        )
+        replayed: List[Hashable] = [key for key in self.fingerprints if key in fingerprints]
+        if len(replayed) < len(fingerprints):
+            sections: Dict[str, int] = {section: position for position, section in enumerate(contents)}
+            replayed = sorted(
+                replayed + [key for key in fingerprints if key not in self.fingerprints],
+                key=lambda key: sections[key[0]]
+            )
+        return entries, replayed == list(fingerprints)
+
+    def append(self, fingerprints: Dict[Hashable, Optional[bytes]], dirty: Set[Hashable]) -> bool:
+        """
+        Appends the changes made to the elements of the .meta file to its journal if it is journaled
+
+        Args:
+            fingerprints (Dict[Hashable, Optional[bytes]]): Fingerprints of the current elements
+            dirty (Set[Hashable]): Elements that have changed, been added or been removed
+
+        Returns:
+            bool: Flag to indicate that the changes were journaled, otherwise the .meta file must be written in full. It
+                  is also written in full to compact the journal if the journal has malformed entries, cannot replay
+                  the changes in order or has grown larger than the .meta file.
+
+        Raises:
+            OSError: If the journal cannot be written
+        """
+        journal: Optional[Journal] = self.journal
+        if not self.journaled or not self.fingerprints or journal is None or not exists(journal.file):
+            return False
+        entries, ordered = self.changes(fingerprints, dirty)
+        size: int = journal.append(entries)
+        return self.valid and ordered and size <= max(JOURNAL_COMPACTION_SIZE, getsize(self.file))
+
+    def write(self) -> None:
+        """
+        Writes the data to be exported to the .meta file in full, the journal of the .meta file is emptied afterwards as
+        the .meta file contains its changes. Both are written under the lock of the journal, and the data of a journaled
+        .meta file is rebased onto its journal so that changes journaled by other processes are not lost.
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the .meta file or its journal cannot be written
+        """
+        journal: Optional[Journal] = self.journal
+        if journal is None or not exists(journal.file):
+            write_file(self.file, json.dumps(self.context.gameta_data, indent=2))
+            return
+        with journal.lock():
+            data: Dict = self.rebase(journal) if self.journaled else self.context.gameta_data
+            write_file(self.file, json.dumps(data, indent=2))
+            journal.reset()
+
+    def rebase(self, journal: Journal) -> Dict:
+        """
+        Replays the journal over the .meta file as last written, and the changes made to the elements of the .meta file
+        since they were recorded over both. Elements keep their current order, followed by those added by other
+        processes.
+
+        Args:
+            journal (Journal): Locked journal of the .meta file
+
+        Returns:
+            Dict: Data to be exported, the data of the GametaContext if the .meta file cannot be read
+        """
+        fingerprints: Dict[Hashable, Optional[bytes]] = self.digest()
+        entries, _ = self.changes(fingerprints, self.dirty(fingerprints))
+        try:
+            with open(self.file, 'rb') as f:
+                data: Any = json.loads(f.read())
+            if not isinstance(data, dict):
+                return self.context.gameta_data
+            journal.replay(data)
+            for entry in entries:
+                journal.apply(data, entry)
+        except (OSError, ValueError):
+            return self.context.gameta_data
+
+        rebased: Dict = dict(self.context.gameta_data)
+        for section, elements in data.items():
+            current: Any = rebased.get(section, {})
+            if section in ('projects', 'commands', 'constants') and isinstance(current, dict) and \
+                    isinstance(elements, dict):
+                rebased[section] = {**{name: elements[name] for name in current if name in elements}, **elements}
+        return rebased
+
+    def update(self) -> Dict[str, Dict[str, Dict]]:
+        """
+        Updates the data to be exported with the repositories, commands and constants of the GametaContext, the
+        repositories of the shards of the .meta file are left out
+
+        Returns:
+            Dict[str, Dict[str, Dict]]: Repositories of each loaded shard
+        """
+        shards: Dict[str, Dict[str, Dict]] = {}
+        if self.context.owners:
+            projects: Dict[str, Dict] = {}
+            for repo, details in self.context.loaded.items():
+                owner: Optional[str] = self.context.owners.get(repo)
+                (projects if owner is None else shards.setdefault(owner, {}))[repo] = details
+            self.context.gameta_data['projects'] = projects
+        else:
+            self.context.gameta_data['projects'] = self.context.loaded
+        if self.context.commands:
+            self.context.gameta_data['commands'] = self.context.commands
+        if self.context.constants:
+            self.context.gameta_data['constants'] = self.context.constants
+        return shards
+
+
+class Database(Meta):
+    """
+    Interface for the SQLite database that stores the .meta file of large metarepos instead, see gameta store. Each
+    repository is stored in its own row with its tags and parameter values indexed, and exports only write the rows of
+    the repositories that have changed. The database is used instead of the .meta file if it exists. The rows are
+    loaded lazily as a shard of the database, see Rows, so that repositories are selected from the indexes without
+    reading their details.
+
+    Attributes:
+        context (GametaContext): Reference to Gameta Context
+        file_name (str): Reference to the database file
+        sections (Optional[Dict[str, Tuple[int, Optional[str]]]]): Positions and serialised data of the sections of the
+                                                                   .meta file stored in the database, None if they have
+                                                                   not been read
+        rows (Optional[Dict[str, Tuple[int, bytes]]]): Positions and fingerprints of the details of the repositories
+                                                       stored in the database, None if they have not been read
+        summary (Optional[Summary]): Names, tags and dependencies of the repositories read from the indexes when the
+                                     database was loaded, None if the repositories were read in full
+    """
+
+    def __init__(self, context: 'GametaContext', file_name: str = DATABASE_FILE):
+        super(Database, self).__init__(context, file_name)
+        self.sections: Optional[Dict[str, Tuple[int, Optional[str]]]] = None
+        self.rows: Optional[Dict[str, Tuple[int, bytes]]] = None
+        self.summary: Optional[Summary] = None
+
+    def update(self) -> Dict[str, Dict[str, Dict]]:
+        """
+        Updates the data to be exported with the repositories, commands and constants of the GametaContext, the shards
+        of the .meta file are merged into the database
+
+        Returns:
+            Dict[str, Dict[str, Dict]]: Repositories of each loaded shard, none as there are no shards
+        """
+        super(Database, self).update()
+        self.context.gameta_data['projects'] = self.context.repositories
+        self.context.gameta_data.pop('include', None)
+        return {}
+
+    def discover(self, cache: ValidationCache) -> None:
+        """
+        Databases store the repositories of the shards of the .meta file themselves, so shards are not discovered even
+        if the database was imported with an include element. The rows of the database are the only shard if they have
+        not been read, and are loaded once their repositories are accessed.
+
+        Args:
+            cache (ValidationCache): Validation results of the elements of the .meta file
+
+        Returns:
+            None
+        """
+        self.context.shards, self.context.owners, self.context.pending = {}, {}, set()
+        if self.summary is None:
+            return
+        rows: Rows = Rows(self.context, self)
+        rows.summary = self.summary
+        self.context.shards[rows.file_name] = rows
+        self.context.owners = dict.fromkeys(self.summary[0], rows.file_name)
+        self.context.pending.add(rows.file_name)
+
+    def connect(self, create: bool = False) -> sqlite3.Connection:
+        """
+        Opens a connection to the database
+
+        Args:
+            create (bool): Flag to create the database if it does not exist
+
+        Returns:
+            sqlite3.Connection: Connection to the database
+
+        Raises:
+            sqlite3.OperationalError: If the database does not exist and is not created
+        """
+        return sqlite3.connect(f"file:{pathname2url(self.file)}?mode={'rwc' if create else 'rw'}", uri=True)
+
+    @property
+    def journal(self) -> Optional[Journal]:
+        """
+        Returns the journal of the database, databases are not journaled as only the rows that have changed are written
+
+        Returns:
+            Optional[Journal]: None
+        """
+        return None
+
+    def read(self, connection: sqlite3.Connection, fetch: bool = True) -> Dict[str, Dict]:
+        """
+        Reads the sections and repositories stored in the database
+
+        Args:
+            connection (sqlite3.Connection): Connection to the database
+            fetch (bool): Flag to read the repositories, otherwise only the sections are read
+
+        Returns:
+            Dict[str, Dict]: Details of the repositories stored, empty if they are not read
+        """
+        self.sections = {
+            name: (position, data)
+            for name, position, data in connection.execute(
+                'SELECT name, position, data FROM sections ORDER BY position'
+            )
+        }
+        return self.fetch(connection) if fetch else {}
+
+    def fetch(self, connection: sqlite3.Connection) -> Dict[str, Dict]:
+        """
+        Reads the repositories stored in the database and records their positions and fingerprints
+
+        Args:
+            connection (sqlite3.Connection): Connection to the database
 
         Returns:
-            None
+            Dict[str, Dict]: Details of the repositories stored
         """
+        repositories: Dict[str, Dict] = {}
+        self.rows = {}
+        for name, position, details in connection.execute(
+            'SELECT name, position, details FROM repositories ORDER BY position'
+        ):
+            repositories[name] = json.loads(details)
+            self.rows[name] = (position, self.fingerprint(repositories[name]))
+        return repositories
 
-    @abstractmethod
-    def export(self) -> None:
+    @staticmethod
+    def summarise(connection: sqlite3.Connection) -> Summary:
         """
-        Abstractmethod to export data from the GametaContext to the file
+        Reads the names, tags and dependencies of the repositories stored in the database from its indexes
+
+        Args:
+            connection (sqlite3.Connection): Connection to the database
 
         Returns:
-            None
+            Summary: Repositories stored, repositories of each of their tags and dependencies of the repositories that
+                     declare any
+        """
+        names: List[str] = [name for name, in connection.execute('SELECT name FROM repositories ORDER BY position')]
+        tags: Dict[str, List[str]] = {}
+        for tag, repo in connection.execute('SELECT tag, repository FROM tags'):
+            tags.setdefault(tag, []).append(repo)
+        dependencies: Dict[str, List[str]] = {}
+        for repo, value in connection.execute(
+                "SELECT repository, value FROM parameters WHERE parameter = 'depends_on'"
+        ):
+            depends_on: Any = json.loads(value)
+            if depends_on:
+                dependencies[repo] = depends_on
+        return names, tags, dependencies
+
+    def index(self, parameter: str) -> Dict[str, FrozenSet[str]]:
         """
+        Reads the index of the values of a parameter from the database, without reading the repositories
 
+        Args:
+            parameter (str): Name of the parameter
 
-class GitIgnore(File):
-    """
-    Interface for the .gitignore file
+        Returns:
+            Dict[str, FrozenSet[str]]: Repositories with each value of the parameter, keyed on the index keys of the
+                                       values
 
-    Attributes:
-        context (GametaContext): Reference to Gameta Context
-        file_name (str): Reference to the .gitignore file
-    """
-    def __init__(self, context: 'GametaContext', file_name: str = '.gitignore'):
-        super(GitIgnore, self).__init__(context, file_name)
+        Raises:
+            ValueError: If the database cannot be read
+        """
+        values: Dict[str, Set[str]] = {}
+        try:
+            with closing(self.connect()) as connection:
+                for value, repo in connection.execute(
+                        'SELECT value, repository FROM parameters WHERE parameter = ?', (parameter,)
+                ):
+                    values.setdefault(value, set()).add(repo)
+        except sqlite3.Error as e:
+            raise ValueError(f"Could not read {self.file_name} file due to: {e.__class__.__name__}.{str(e)}")
+        return {key: frozenset(repos) for key, repos in values.items()}
 
     def load(self) -> None:
         """
-        Loads data from the .gitignore file and populates the GametaContext
+        Loads data from the database, validates it and populates the GametaContext. Only the sections and the indexes
+        of the repositories are read, unless the database was written by an earlier version.
 
         Returns:
             None
         """
+        self.valid = True
+        self.rows = self.summary = None
         try:
-            with open(self.file, 'r') as f:
-                self.context.gitignore_data = f.readlines()
-        except FileNotFoundError:
-            return
+            with closing(self.connect()) as connection:
+                lazy: bool = connection.execute('PRAGMA user_version').fetchone()[0] >= DATABASE_VERSION
+                repositories: Dict[str, Dict] = self.read(connection, fetch=not lazy)
+                if lazy:
+                    self.summary = self.summarise(connection)
+            self.context.gameta_data = {
+                name: repositories if name == 'projects' else json.loads(data)
+                for name, (_, data) in self.sections.items()
+            }
         except Exception as e:
-            self.context.gitignore_data = []
+            self.valid = False
+            self.sections = self.rows = self.summary = None
             click.echo(f"Could not load {self.file_name} file due to: {e.__class__.__name__}.{str(e)}")
+        self.populate(None)
+
+    def store(self, connection: sqlite3.Connection) -> None:
+        """
+        Stores the data of the GametaContext in the database in a single transaction, only the sections and
+        repositories that differ from those stored are written
+
+        Args:
+            connection (sqlite3.Connection): Connection to the database
+
+        Returns:
+            None
+        """
+        connection.executescript(DATABASE_SCHEMA)
+        with connection:
+            if self.sections is None or self.rows is None:
+                self.read(connection)
+            reindex: bool = connection.execute('PRAGMA user_version').fetchone()[0] < DATABASE_VERSION
+
+            # The projects section only records its position, the repositories are stored in their own rows
+            sections: Dict[str, Tuple[int, Optional[str]]] = {
+                name: (position, None if name == 'projects' else json.dumps(section))
+                for position, (name, section) in enumerate(self.context.gameta_data.items())
+            }
+            for name, (position, data) in sections.items():
+                if self.sections.get(name) != (position, data):
+                    connection.execute(
+                        'INSERT OR REPLACE INTO sections (name, position, data) VALUES (?, ?, ?)',
+                        (name, position, data)
+                    )
+            for name in [name for name in self.sections if name not in sections]:
+                connection.execute('DELETE FROM sections WHERE name = ?', (name,))
+            self.sections = sections
+
+            repositories: Dict[str, Dict] = self.context.repositories
+            for repo in [repo for repo in self.rows if repo not in repositories]:
+                for statement in [
+                    'DELETE FROM repositories WHERE name = ?',
+                    'DELETE FROM tags WHERE repository = ?',
+                    'DELETE FROM parameters WHERE repository = ?'
+                ]:
+                    connection.execute(statement, (repo,))
+                del self.rows[repo]
+
+            # Repositories keep their positions unless they have been reordered, new repositories are appended
+            renumber: bool = list(islice(repositories, len(self.rows))) != list(self.rows)
+            last: int = max((position for position, _ in self.rows.values()), default=-1)
+            rows: Dict[str, Tuple[int, bytes]] = {}
+            for index, (repo, details) in enumerate(repositories.items()):
+                if renumber:
+                    position: int = index
+                elif repo in self.rows:
+                    position = self.rows[repo][0]
+                else:
+                    last += 1
+                    position = last
+                rows[repo] = (position, self.fingerprint(details))
+                if self.rows.get(repo) == rows[repo] and not reindex:
+                    continue
+                connection.execute(
+                    'INSERT OR REPLACE INTO repositories (name, position, path, details) VALUES (?, ?, ?, ?)',
+                    (repo, position, details.get('path'), json.dumps(details))
+                )
+                connection.execute('DELETE FROM tags WHERE repository = ?', (repo,))
+                connection.executemany(
+                    'INSERT INTO tags (repository, tag) VALUES (?, ?)',
+                    [(repo, tag) for tag in set(details.get('tags', []))]
+                )
+                connection.execute('DELETE FROM parameters WHERE repository = ?', (repo,))
+                connection.executemany(
+                    'INSERT INTO parameters (repository, parameter, value) VALUES (?, ?, ?)',
+                    [(repo, parameter, ParameterQuery.key(value)) for parameter, value in details.items()]
+                )
+            if reindex:
+                connection.execute(f'PRAGMA user_version = {DATABASE_VERSION}')
+            self.rows = rows
 
     def export(self) -> None:
         """
-        Exports data from the GametaContext to the .gitignore file
+        Exports data from the GametaContext to the database if it has changed
 
         Returns:
             None
         """
+        fingerprints: Dict[Hashable, Optional[bytes]] = self.digest()
+        if not self.dirty(fingerprints):
+            return
         try:
-            with open(self.file, 'w') as f:
-                f.writelines(self.context.gitignore_data)
+            self.update()
+            with closing(self.connect(create=True)) as connection:
+                self.store(connection)
+            self.record(fingerprints)
         except Exception as e:
+            # Rows are read again on the next export as the transaction was rolled back
+            self.sections = self.rows = None
             click.echo(f"Could not export data to {self.file_name} file: {e.__class__.__name__}.{str(e)}")
 
 
-class Meta(File):
+class Rows(Shard):
     """
-    Interface for the .meta file
+    Rows of the repositories stored in the database of the .meta file, which are loaded as a shard of the database once
+    its repositories are accessed. The names, tags and dependencies of the repositories are read from the indexes of the
+    database instead, see Database.summarise.
 
     Attributes:
         context (GametaContext): Reference to Gameta Context
-        file_name (str): Reference to the .meta file
+        file_name (str): Reference to the database file
+        database (Database): Database the rows are stored in
     """
 
-    def __init__(self, context: 'GametaContext', file_name: str = '.meta'):
-        super(Meta, self).__init__(context, file_name)
+    def __init__(self, context: 'GametaContext', database: Database):
+        super(Rows, self).__init__(context, database.file_name)
+        self.database = database
 
     def load(self) -> None:
         """
-        Loads data from the .meta file, validates it and populates the GametaContext
+        Loads the repositories stored in the rows of the database, the rows have been validated before they were stored
 
         Returns:
             None
-        """
-        # Attempt to load .meta file
-        try:
-            with open(self.file_name, 'r') as f:
-                self.context.gameta_data = json.load(f)
-        except FileNotFoundError:
-            return
-        except Exception as e:
-            click.echo(f"Could not load {self.file_name} file due to: {e.__class__.__name__}.{str(e)}")
-
-        # Validate repositories
-        try:
-            for repo in self.context.gameta_data['projects'].values():
-                self.context.validators['repositories'].validate(repo)
-            self.context.repositories = self.context.gameta_data['projects']
-            self.context.is_metarepo = True
-            self.context.generate_tags()
-        except Exception as e:
-            self.context.repositories = {}
-            self.context.tags = {}
-            click.echo(f"Malformed repository element, error: {e.__class__.__name__}.{str(e)}")
 
-        # Validate commands
-        try:
-            for command in self.context.gameta_data.get('commands', {}).values():
-                self.context.validators['commands'].validate(command)
-            self.context.commands = self.context.gameta_data.get('commands', {})
-        except Exception as e:
-            self.context.commands = {}
-            click.echo(f"Malformed commands element, error: {e.__class__.__name__}.{str(e)}")
-
-        # Validate constants
+        Raises:
+            ValueError: If the rows cannot be read
+        """
         try:
-            self.context.validators['constants'].validate(self.context.gameta_data.get('constants', {}))
-            self.context.constants = self.context.gameta_data.get('constants', {})
-        except Exception as e:
-            self.context.constants = {}
-            click.echo(f"Malformed constants element, error: {e.__class__.__name__}.{str(e)}")
+            with closing(self.database.connect()) as connection:
+                self.data = {'projects': self.database.fetch(connection)}
+        except (sqlite3.Error, ValueError) as e:
+            raise ValueError(f"Could not load rows of {self.file_name} due to: {e.__class__.__name__}.{str(e)}")
 
-    def export(self) -> None:
+    def export(self, projects: Dict[str, Dict]) -> None:
         """
-        Exports data from the GametaContext to the .meta file
+        Rows are stored by the database itself, see Database.store
+
+        Args:
+            projects (Dict[str, Dict]): Repositories in the rows
 
         Returns:
             None
         """
+
+
+class RepositoryDetails(Mapping):
+    """
+    Read-only view of the details of a repository with environment variables substituted into its string fields, each
+    field is only substituted when it is first looked up and the result is memoized
+
+    Attributes:
+        details (Dict): Repository details from .meta file
+        env_vars (Dict): Environment variables substituted into the details
+        expanded (Dict): Fields that have been looked up, with environment variables substituted
+    """
+
+    def __init__(self, details: Dict, env_vars: Dict):
+        self.details = details
+        self.env_vars = env_vars
+        self.expanded: Dict = {}
+
+    def __getitem__(self, key: str) -> Any:
         try:
-            self.context.gameta_data['projects'] = self.context.repositories
-            if self.context.commands:
-                self.context.gameta_data['commands'] = self.context.commands
-            if self.context.constants:
-                self.context.gameta_data['constants'] = self.context.constants
-            with open(self.file, 'w') as f:
-                json.dump(self.context.gameta_data, f, indent=2)
-        except Exception as e:
-            click.echo(f"Could not export data to {self.file_name} file: {e.__class__.__name__}.{str(e)}")
+            return self.expanded[key]
+        except KeyError:
+            pass
+        value: Any = self.details[key]
+        if isinstance(value, str):
+            value = value.format_map(self.env_vars)
+        self.expanded[key] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.details)
+
+    def __len__(self) -> int:
+        return len(self.details)
 
 
 class GametaContext(object):
@@ -194,12 +1706,20 @@ class GametaContext(object):
         is_metarepo (bool): Project is a metarepo
         gameta_data (Dict): Gameta data extracted and exported
         repositories (Dict[str, Dict]): Data of all the repositories contained in the metarepo
-        tags (Dict[str, List[str]]): Repository data organised according to tags
+        loaded (Dict[str, Dict]): Data of the repositories of the .meta file and its loaded shards
+        shards (Dict[str, Shard]): Shards of the .meta file
+        owners (Dict[str, str]): Shard containing each repository in a shard of the .meta file
+        pending (Set[str]): Shards of the .meta file that have not been loaded yet
+        tags (Dict[str, FrozenSet[str]]): Repositories of each tag
         constants (Dict[str, Union[str, int, bool, float]]): Gameta constants data extracted
         commands (Dict): Gameta commands data extracted
         gitignore_data (List[str]): Gitignore data extracted from the .gitignore file
         env_vars (Dict): Extracted environment variables with keys prefixed with $
         files (Dict[str, File]): File formats supported
+        pruned (Set[str]): Directories of shared files whose unused files have been removed
+        expanded (Dict[str, RepositoryDetails]): Repository details with environment variables substituted, memoized
+                                                 for each repository
+        indexes (Dict[str, Dict[str, FrozenSet[str]]]): Indexes of the values of the parameters that have been queried
     """
     __schema__: Dict = {
         '$schema': "http://json-schema.org/draft-07/schema#",
@@ -237,6 +1757,13 @@ class GametaContext(object):
                     },
                     "__metarepo__": {
                         "type": "boolean"
+                    },
+                    "depends_on": {
+                        "type": "array",
+                        "items": {
+                            "type": "string"
+                        },
+                        "uniqueItems": True
                     }
                 },
                 "required": [
@@ -267,6 +1794,23 @@ class GametaContext(object):
                     "verbose": {
                         "type": "boolean"
                     },
+                    "jobs": {
+                        "type": "integer",
+                        "minimum": 1
+                    },
+                    "engine": {
+                        "type": "string",
+                        "enum": list(engines.keys())
+                    },
+                    "cache": {
+                        "type": "boolean"
+                    },
+                    "where": {
+                        "type": "array",
+                        "items": {
+                            "type": "string"
+                        }
+                    },
                     "repositories": {
                         "type": "array",
                         "items": {
@@ -281,7 +1825,7 @@ class GametaContext(object):
                     }
                 },
                 "minProperties": 6,
-                "maxProperties": 8,
+                "maxProperties": 12,
                 "additionalProperties": False,
             },
             "constants": {
@@ -312,8 +1856,11 @@ class GametaContext(object):
         self.gameta_data: Dict = {}
         self.constants: Dict[str, Union[str, int, bool, float]] = {}
         self.commands: Dict = {}
-        self.repositories: Dict[str, Dict] = {}
-        self.tags: Dict[str, List[str]] = {}
+        self.shards: Dict[str, Shard] = {}
+        self.owners: Dict[str, str] = {}
+        self.pending: Set[str] = set()
+        self.loaded: Dict[str, Dict] = {}
+        self.tags: Dict[str, FrozenSet[str]] = {}
 
         self.env_vars: Dict = {
             '$' + k.upper(): v
@@ -324,6 +1871,34 @@ class GametaContext(object):
             'meta': Meta(self),
             'gitignore': GitIgnore(self)
         }
+        self.pruned: Set[str] = set()
+        self.expanded: Dict[str, RepositoryDetails] = {}
+        self.indexes: Dict[str, Dict[str, FrozenSet[str]]] = {}
+
+    @property
+    def repositories(self) -> Dict[str, Dict]:
+        """
+        Returns the details of all repositories, shards of the .meta file that have not been loaded yet are loaded first
+
+        Returns:
+            Dict[str, Dict]: Details of the repositories
+        """
+        if self.pending:
+            self.include()
+        return self.loaded
+
+    @repositories.setter
+    def repositories(self, repositories: Dict[str, Dict]) -> None:
+        """
+        Sets the details of the repositories
+
+        Args:
+            repositories (Dict[str, Dict]): Details of the repositories
+
+        Returns:
+            None
+        """
+        self.loaded = repositories
 
     @property
     def project_name(self) -> str:
@@ -394,17 +1969,30 @@ class GametaContext(object):
         Returns:
             bool: Flag to indicate if repository is a primary meta-repository
         """
-        return abspath(self.repositories[repo]["path"]) == self.project_dir
+        return self.resolve(self.repository(repo)["path"], check=False) == self.project_dir
 
     def load(self) -> None:
         """
-        Loads data from all supported file formats
+        Loads data from all supported file formats, or from their snapshot if none of them have changed since it was
+        written
 
         Returns:
             None
         """
-        for file, interface in self.files.items():
-            interface.load()
+        # Large metarepos store the .meta file in a SQLite database instead, see gameta store
+        database: Database = Database(self)
+        self.files['meta'] = database if exists(database.file) else Meta(self)
+
+        snapshot: Snapshot = Snapshot(self)
+        stats: Tuple[Optional[Tuple[int, int, int]], ...] = snapshot.stats()
+        if not snapshot.restore(stats):
+            for file, interface in self.files.items():
+                interface.load()
+            snapshot.save(stats)
+        for interface in self.files.values():
+            interface.record()
+        self.expanded = {}
+        self.indexes = {}
 
     def export(self) -> None:
         """
@@ -415,6 +2003,8 @@ class GametaContext(object):
         """
         for file, interface in self.files.items():
             interface.export()
+        self.expanded = {}
+        self.indexes = {}
 
     def generate_tags(self) -> None:
         """
@@ -423,12 +2013,224 @@ class GametaContext(object):
         Returns:
             None
         """
-        for repo, details in self.repositories.items():
+        tags: Dict[str, Set[str]] = {}
+        for repo, details in self.loaded.items():
             for tag in details.get('tags', []):
-                if tag in self.tags:
-                    self.tags[tag].append(repo)
-                else:
-                    self.tags[tag] = [repo]
+                tags.setdefault(tag, set()).add(repo)
+        # Tags of the shards that have not been loaded are taken from the shard index, or the indexes of the database
+        for shard in self.pending:
+            for tag, repos in self.shards[shard].summary[1].items():
+                tags.setdefault(tag, set()).update(repos)
+        self.tags = {tag: frozenset(repos) for tag, repos in tags.items()}
+
+    def include(self, shards: Optional[Iterable[str]] = None) -> None:
+        """
+        Loads shards of the .meta file that have not been loaded yet, in parallel. Pending shards are unchanged since
+        they were validated and recorded in the shard index, so they are not validated again.
+
+        Args:
+            shards (Optional[Iterable[str]]): Shards to be loaded, defaults to all shards
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If a shard cannot be loaded
+        """
+        pending: List[Shard] = [
+            self.shards[shard] for shard in self.shards
+            if shard in self.pending and (shards is None or shard in shards)
+        ]
+        if not pending:
+            return
+        with ThreadPoolExecutor(max_workers=min(len(pending), SHARD_WORKERS)) as pool:
+            list(pool.map(lambda shard: shard.load(), pending))
+        for shard in pending:
+            self.pending.discard(shard.file_name)
+            self.loaded.update(shard.data['projects'])
+
+        # Repositories are kept in the order of their shards, regardless of the order the shards were loaded in
+        ordered: Dict[str, List[str]] = {}
+        for repo in self.loaded:
+            if repo in self.owners:
+                ordered.setdefault(self.owners[repo], []).append(repo)
+        for shard in self.shards:
+            for repo in ordered.get(shard, []):
+                self.loaded[repo] = self.loaded.pop(repo)
+
+    def names(self) -> FrozenSet[str]:
+        """
+        Returns the names of all repositories, without loading the shards of the .meta file
+
+        Returns:
+            FrozenSet[str]: Names of the repositories
+        """
+        return frozenset(self.loaded).union(*(self.shards[shard].summary[0] for shard in self.pending))
+
+    def repository(self, repo: str) -> Dict:
+        """
+        Returns the details of a repository, only the shard of the .meta file containing the repository is loaded
+
+        Args:
+            repo (str): Repository name
+
+        Returns:
+            Dict: Repository details
+
+        Raises:
+            KeyError: If the repository does not exist
+        """
+        if self.owners.get(repo) in self.pending:
+            self.include([self.owners[repo]])
+        return self.loaded[repo]
+
+    def add_tags(self, repo: str, tags: List[str]) -> None:
+        """
+        Adds tags to a repository and updates the tag indexes
+
+        Args:
+            repo (str): Repository name
+            tags (List[str]): Tags to be added
+
+        Returns:
+            None
+        """
+        details: Dict = self.repository(repo)
+        details['tags'] = sorted(set(details.get('tags', [])) | set(tags))
+        self.indexes.pop('tags', None)
+        for tag in tags:
+            self.tags[tag] = self.tags.get(tag, frozenset()) | {repo}
+
+    def delete_tags(self, repo: str, tags: List[str]) -> None:
+        """
+        Deletes tags from a repository and updates the tag indexes, tags without repositories are removed
+
+        Args:
+            repo (str): Repository name
+            tags (List[str]): Tags to be deleted
+
+        Returns:
+            None
+        """
+        details: Dict = self.repository(repo)
+        details['tags'] = sorted(set(details.get('tags', [])) - set(tags))
+        self.indexes.pop('tags', None)
+        for tag in tags:
+            repos: FrozenSet[str] = self.tags.get(tag, frozenset()) - {repo}
+            if repos:
+                self.tags[tag] = repos
+            else:
+                self.tags.pop(tag, None)
+
+    def select(self, queries: Iterable[str]) -> FrozenSet[str]:
+        """
+        Selects the repositories matching any of the tag queries
+
+        Args:
+            queries (Iterable[str]): Tag queries e.g. 'backend & !legacy | infra'
+
+        Returns:
+            FrozenSet[str]: Repositories matching the tag queries
+
+        Raises:
+            ValueError: If a tag query is malformed
+        """
+        tag_queries: List[TagQuery] = [TagQuery(query, self.tags) for query in queries]
+        # All repositories are only collected for queries that negate tags
+        repositories: FrozenSet[str] = self.names() if any(q.negated for q in tag_queries) else frozenset()
+        return frozenset().union(*(query.select(self.tags, repositories) for query in tag_queries))
+
+    def index(self, parameter: str) -> Dict[str, FrozenSet[str]]:
+        """
+        Returns the index of the values of a parameter, which is built the first time the parameter is queried and
+        retained until the repositories are loaded or exported again. The index is read from the database of the .meta
+        file if its rows have not been loaded.
+
+        Args:
+            parameter (str): Name of the parameter
+
+        Returns:
+            Dict[str, FrozenSet[str]]: Repositories with each value of the parameter, keyed on the index keys of the
+                                       values
+        """
+        index: Optional[Dict[str, FrozenSet[str]]] = self.indexes.get(parameter)
+        database: Optional[File] = self.files.get('meta')
+        if index is None and isinstance(database, Database) and database.file_name in self.pending:
+            index = self.indexes[parameter] = database.index(parameter)
+        elif index is None:
+            values: Dict[str, Set[str]] = {}
+            for repo, details in self.repositories.items():
+                if parameter in details:
+                    values.setdefault(ParameterQuery.key(details[parameter]), set()).add(repo)
+            index = self.indexes[parameter] = {key: frozenset(repos) for key, repos in values.items()}
+        return index
+
+    def where(self, predicates: Iterable[str]) -> FrozenSet[str]:
+        """
+        Selects the repositories matching all of the parameter predicates
+
+        Args:
+            predicates (Iterable[str]): Parameter predicates e.g. 'language == python' or 'team in (a, b)'
+
+        Returns:
+            FrozenSet[str]: Repositories matching the parameter predicates, all repositories if there are no predicates
+
+        Raises:
+            ValueError: If a parameter predicate is malformed
+        """
+        queries: List[ParameterQuery] = [ParameterQuery(predicate) for predicate in predicates]
+        if not queries:
+            return frozenset(self.repositories)
+        selected: FrozenSet[str] = queries[0].select(self.index(queries[0].parameter))
+        for query in queries[1:]:
+            selected &= query.select(self.index(query.parameter))
+        return selected
+
+    def validate_dependencies(self) -> None:
+        """
+        Validates the dependencies declared by the repositories, all dependencies must be existing repositories and the
+        dependency graph must not contain cycles
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If a dependency does not exist or a dependency cycle is detected
+        """
+        # Dependencies of the shards that have not been loaded are taken from the shard index
+        graph: Dict[str, List[str]] = {
+            repo: details.get('depends_on', []) for repo, details in self.loaded.items()
+        }
+        for shard in self.pending:
+            repos, _, dependencies = self.shards[shard].summary
+            graph.update((repo, dependencies.get(repo, [])) for repo in repos)
+        for repo, depends_on in graph.items():
+            missing: List[str] = [d for d in depends_on if d not in graph]
+            if missing:
+                raise ValueError(f"Repository {repo} depends on repositories {missing} that do not exist")
+
+        # Iterative depth first search, a repository that is reached again while it is being visited closes a cycle
+        # Repositories without dependencies cannot close a cycle, so they are not searched from
+        visited: Dict[str, bool] = {}
+        for root in graph:
+            if root in visited or not graph[root]:
+                continue
+            visited[root] = False
+            stack: List[Tuple[str, List[str]]] = [(root, list(graph[root]))]
+            while stack:
+                repo, dependencies = stack[-1]
+                if not dependencies:
+                    visited[repo] = True
+                    stack.pop()
+                    continue
+                dependency: str = dependencies.pop()
+                if dependency not in visited:
+                    visited[dependency] = False
+                    stack.append((dependency, list(graph[dependency])))
+                elif visited[dependency] is False:
+                    cycle: List[str] = [r for r, _ in stack]
+                    cycle = cycle[cycle.index(dependency):] + [dependency]
+                    raise ValueError(f"Dependency cycle detected: {' -> '.join(cycle)}")
 
     def apply(
             self,
@@ -436,10 +2238,11 @@ class GametaContext(object):
             repos: List[str] = (),
             shell: bool = False,
             python: bool = False,
-    ) -> Generator[Tuple[str, str], None, None]:
+    ) -> Generator[Tuple[str, List[str], str], None, None]:
         """
         Yields a list of commands to all repositories or a selected set of them, substitutes relevant parameters stored
-        in .meta file
+        in .meta file. Each command is yielded with the absolute path of the repository it should be executed in so that
+        planning does not depend on the current working directory.
 
         Args:
             commands (List[str]): Commands to be applied
@@ -448,28 +2251,146 @@ class GametaContext(object):
             python (bool): Flag to indicate if commands are to be tokenised as Python commands
 
         Returns:
-            None
+            Generator[Tuple[str, List[str], str], None, None]: Repository name, tokenised command and absolute path of
+                                                               the repository
+        """
+        for repo, repo_commands, _, path in self.render(commands, repos, python):
+            if python:
+                command: List[str] = self.python(repo_commands)
+            elif shell:
+                command: List[str] = self.shell(repo_commands)
+            else:
+                command: List[str] = self.tokenise(' && '.join(repo_commands))
+            yield repo, command, path
+
+    def render(
+            self,
+            commands: List[str],
+            repos: List[str] = (),
+            python: bool = False,
+    ) -> Generator[Tuple[str, List[str], Mapping, str], None, None]:
+        """
+        Yields a list of commands rendered with the parameters of all repositories or a selected set of them, without
+        tokenising them
+
+        Args:
+            commands (List[str]): Commands to be rendered
+            repos (List[str]): Selected set of repositories
+            python (bool): Flag to indicate if Python variables should be generated
+
+        Returns:
+            Generator[Tuple[str, List[str], Mapping, str], None, None]: Repository name, rendered commands, parameters
+                                                                        substituted and absolute path of the repository
         """
+        # Only the shards of the .meta file containing the selected repositories are loaded
+        self.include({self.owners[repo] for repo in repos if repo in self.owners})
         repositories: List[Tuple[str, Dict[str, str]]] = \
-            [(repo, details) for repo, details in self.repositories.items() if repo in repos] or \
+            [(repo, details) for repo, details in self.loaded.items() if repo in repos] or \
             list(self.repositories.items())
 
+        # Commands are parsed once rather than for each repository
+        templates: List[Template] = [Template(command) for command in commands]
+        # The repositories are shared by all repositories rather than embedded in each of their commands
+        shared: Optional[str] = self.share_repositories() if python else None
         for repo, details in repositories:
             # Generate complete set of parameters for substitution
+            path: str = self.resolve(details['path'])
+            parameters: Mapping = self.generate_parameters(repo, details, python, shared)
+            yield repo, [template.render(parameters) for template in templates], parameters, path
 
-            with self.cd(details['path']):
-                repo_commands: List[str] = [
-                    c.format(**self.generate_parameters(repo, details, python)) for c in deepcopy(commands)
-                ]
-                if python:
-                    command: List[str] = self.python(repo_commands)
-                elif shell:
-                    command: List[str] = self.shell(repo_commands)
-                else:
-                    command: List[str] = self.tokenise(' && '.join(repo_commands))
-                yield repo, command
+    def share(self, directory: str, content: str, extension: str) -> str:
+        """
+        Writes content once into a read-only file in a directory of the metarepo, named after the digest of the content
+        so that identical content is shared by a single file. Files in the directory that have not been used for a day
+        are removed the first time the directory is used by the context.
+
+        Args:
+            directory (str): Directory relative to the metarepo
+            content (str): Content to be shared
+            extension (str): Extension of the file
+
+        Returns:
+            str: Absolute path of the shared file
+
+        Raises:
+            OSError: If the file cannot be written
+        """
+        directory = join(self.project_dir, directory)
+        file: str = join(directory, f'{hashlib.sha256(content.encode()).hexdigest()}{extension}')
+        if exists(file):
+            # Marks the file as used
+            os.utime(file)
+        else:
+            make_dirs(directory)
+            temp: str = f'{file}.{os.getpid()}.tmp'
+            with open(temp, 'w') as f:
+                f.write(content)
+            os.chmod(temp, 0o444)
+            os.replace(temp, file)
+        if directory not in self.pruned:
+            expiry: float = time.time() - SHARED_MAX_AGE
+            for entry in os.scandir(directory):
+                if entry.path != file and entry.stat().st_mtime < expiry:
+                    os.remove(entry.path)
+            self.pruned.add(directory)
+        return file
+
+    def share_repositories(self) -> str:
+        """
+        Serialises the repositories once into a JSON file in the .gameta directory of the metarepo, which is only
+        written when the repositories change
+
+        Returns:
+            str: Python expression that loads the repositories, the repositories are embedded as a Python literal if
+                 they cannot be shared
+        """
+        if self.project_dir is None:
+            return self.literal(self.repositories)
+        try:
+            file: str = self.share(SHARED_DIR, json.dumps(self.repositories), '.json')
+        except OSError:
+            return self.literal(self.repositories)
+        return f'__import__("json").loads(__import__("pathlib").Path({json.dumps(file)}).read_text())'
+
+    def script(self, script: str, extension: str = '') -> Optional[str]:
+        """
+        Writes a script once into a file in the .gameta directory of the metarepo, repositories whose rendered scripts
+        are identical share the same file
+
+        Args:
+            script (str): Rendered script
+            extension (str): Extension of the script file
+
+        Returns:
+            Optional[str]: Absolute path of the script file, None if it cannot be written
+        """
+        if self.project_dir is None:
+            return None
+        try:
+            return self.share(SCRIPTS_DIR, script, extension)
+        except OSError:
+            return None
+
+    @staticmethod
+    def literal(data: Dict) -> str:
+        """
+        Converts JSON serialisable data into a Python literal that only contains double quoted strings
+
+        Args:
+            data (Dict): Data to be converted
+
+        Returns:
+            str: Python literal of the data
+        """
+        return json.dumps(data).replace("true", "True").replace("false", "False").replace("null", "None")
 
-    def generate_parameters(self, repo: str, repo_details: Dict, python: bool = False) -> Dict:
+    def generate_parameters(
+            self,
+            repo: str,
+            repo_details: Dict,
+            python: bool = False,
+            repositories: Optional[str] = None
+    ) -> Mapping:
         """
         Generates the set of parameters for each repository to be substituted into command strings. 
         
@@ -477,31 +2398,58 @@ class GametaContext(object):
             repo (str): Repository name of parameters to be generated
             repo_details (Dict): Repository details from .meta file
             python (bool): Flag to indicate if Python variables should be generated, defaults to False
+            repositories (Optional[str]): Expression loading the shared repositories, shared on demand if not provided
 
         Returns:
-            Dict: Generated set of parameters
+            Mapping: Generated set of parameters, a read-only view layering the environment variables over the
+                     constants over the repository details
         """
-
-        combined_details: Dict = {
-            k: v.format(**self.env_vars) if isinstance(v, str) else v
-            for k, v in deepcopy(repo_details).items()
-        }
+        details: RepositoryDetails = self.expand(repo, repo_details)
+        layers: List[Mapping] = [self.env_vars, self.constants]
         if python:
-            repositories: Dict = deepcopy(self.repositories)
-            repositories[repo] = deepcopy(combined_details)
-            combined_details.update(
-                {
-                    '__repos__':
-                        json.dumps(repositories)
-                            .replace("true", "True")
-                            .replace("false", "False")
-                            .replace("null", "None")
-                }
-            )
-        combined_details.update(self.constants)
-        combined_details.update(self.env_vars)
-        return combined_details
-        
+            repositories = repositories or self.share_repositories()
+            # Only details that differ from the shared repositories are embedded per repository
+            if details != self.repositories.get(repo):
+                repositories = f'{{**{repositories}, {json.dumps(repo)}: {self.literal(dict(details))}}}'
+            layers.append({'__repos__': repositories})
+        return ChainMap(*layers, details)
+
+    def namespace(self, parameters: ChainMap) -> Dict[str, Any]:
+        """
+        Flattens the parameters generated for a repository into the globals of its Python scripts, the environment
+        variables are left out as their names are not valid identifiers and the scripts inherit them in os.environ, as
+        are the shared repositories which are substituted into the scripts
+
+        Args:
+            parameters (ChainMap): Parameters generated for the repository
+
+        Returns:
+            Dict[str, Any]: Globals of the Python scripts of the repository
+        """
+        namespace: Dict[str, Any] = {}
+        for layer in reversed(parameters.maps):
+            if layer is not self.env_vars:
+                namespace.update(layer)
+        namespace.pop('__repos__', None)
+        return namespace
+
+    def expand(self, repo: str, repo_details: Dict) -> RepositoryDetails:
+        """
+        Returns the details of a repository with environment variables substituted, which are memoized until the
+        repositories are loaded or exported again
+
+        Args:
+            repo (str): Repository name
+            repo_details (Dict): Repository details from .meta file
+
+        Returns:
+            RepositoryDetails: Repository details with environment variables substituted
+        """
+        details: Optional[RepositoryDetails] = self.expanded.get(repo)
+        if details is None or details.details is not repo_details or details.env_vars is not self.env_vars:
+            details = self.expanded[repo] = RepositoryDetails(repo_details, self.env_vars)
+        return details
+
     @staticmethod
     def tokenise(command: str) -> List[str]:
         """
@@ -515,26 +2463,29 @@ class GametaContext(object):
         """
         return shlex.split(command)
 
-    @contextmanager
-    def cd(self, sub_directory: str) -> Generator[str, None, None]:
+    def resolve(self, sub_directory: str, check: bool = True) -> str:
         """
-        Changes directory to a subdirectory within the project
+        Resolves a subdirectory within the project into an absolute path
 
         Args:
             sub_directory (str): Relative subdirectory within the project
+            check (bool): Flag to indicate if the subdirectory must exist, defaults to True
 
         Returns:
-            Generator[str, None, None]: Path to current directory
+            str: Absolute path to the subdirectory
+
+        Raises:
+            FileNotFoundError: If the subdirectory must exist but does not
         """
-        cwd = getcwd()
-        path = normpath(join(self.project_dir, sub_directory.lstrip('/')))
-        chdir(path)
-        yield path
-        chdir(cwd)
+        path: str = normpath(join(self.project_dir, sub_directory.lstrip('/')))
+        if check and not isdir(path):
+            raise FileNotFoundError(f"No such directory: '{path}'")
+        return path
 
     def shell(self, commands: List[str]) -> List[str]:
         """
-        Prepares commands to be executed in a separate shell as subprocess does not natively handle piping
+        Prepares commands to be executed in a separate shell as subprocess does not natively handle piping. Commands
+        that are too long to be passed as an argument are executed from a script file instead.
 
         Args:
             commands (List[str]): User-defined commands
@@ -542,15 +2493,19 @@ class GametaContext(object):
         Returns:
             List[str]: Shell command string to be executed by subprocess
         """
-        return self.tokenise(
-            f'{SHELL} -c "' +
-            ' && '.join(commands) +
-            '"'
-        )
+        script: str = ' && '.join(commands)
+        if len(script.encode()) > MAX_INLINE_SCRIPT:
+            file: Optional[str] = self.script(script, '.sh')
+            if file is not None:
+                return [SHELL, file]
+        # The script is passed as a single argument so that it reaches the shell unchanged
+        return [SHELL, '-c', script]
 
     def python(self, commands: List[str]) -> List[str]:
         """
-        Prepares commands to be executed by Python interpreter via shell
+        Prepares commands to be executed by Python interpreter via shell, scripts are quoted so that the shell passes
+        them to Python unchanged. Scripts that are too long to be passed as an argument are executed from a script file
+        instead, in the same way as with python -c.
 
         Args:
             commands List[str]: Python scripts
@@ -558,9 +2513,14 @@ class GametaContext(object):
         Returns:
             List[str]: Python prepared commands to be executed by subprocess
         """
-        return self.shell(
-            ["python3 -c \'{}\'".format(command.replace('"', '\\\"')) for command in commands]
-        )
-
+        prepared: List[str] = []
+        for command in commands:
+            file: Optional[str] = None
+            if len(command.encode()) > MAX_INLINE_SCRIPT:
+                file = self.script(command, '.py')
+            if file is not None:
+                command = f'exec(compile(open({json.dumps(file)}).read(), {json.dumps(file)}, "exec"))'
+            prepared.append(f'python3 -c {shlex.quote(command)}')
+        return self.shell(prepared)
 
 gameta_context = click.make_pass_decorator(GametaContext, ensure=True)
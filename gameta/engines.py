@@ -0,0 +1,1297 @@
+import asyncio
+import heapq
+import os
+import resource
+import shlex
+import signal
+import subprocess
+import sys
+import time
+from abc import abstractmethod
+from collections import deque
+from os import getenv
+from os.path import basename
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from threading import Lock, Timer, current_thread, main_thread
+from typing import List, Dict, Optional, Set, Type, Tuple, Iterable, Deque, Callable, Any, Sequence, FrozenSet
+from uuid import uuid4
+
+import click
+
+from .events import EventWriter
+from .pump import LineDecoder, OutputLog, OutputPump
+from .workers import PythonWorker
+
+
+__all__ = [
+    # Execution primitives
+    'Job', 'Usage', 'Result', 'Scheduler',
+
+    # Engines
+    'Engine', 'ThreadEngine', 'AsyncioEngine', 'Shell', 'ShellPoolEngine', 'PythonPoolEngine', 'engines',
+]
+
+
+SHELL = getenv('SHELL', '/bin/sh')
+# Shells that accept the POSIX syntax the shell-pool engine frames scripts with
+POSIX_SHELLS: FrozenSet[str] = frozenset(['sh', 'ash', 'dash', 'bash', 'ksh', 'mksh', 'zsh', 'yash', 'posh', 'busybox'])
+
+
+class Job(object):
+    """
+    A single unit of work, i.e. a command planned for a repository
+
+    Attributes:
+        repo (str): Name of the repository
+        command (List[str]): Tokenised command to be executed
+        cwd (str): Absolute path of the directory the command is executed in
+        depends_on (List[str]): Repositories that must be processed successfully before this Job can be executed
+        script (Optional[List[str]]): Rendered Python scripts if the command executes them, allowing Engines to
+                                      execute them without a new interpreter
+        parameters (Dict[str, Any]): Parameters the Python scripts were rendered with
+    """
+
+    def __init__(
+            self,
+            repo: str,
+            command: List[str],
+            cwd: str,
+            depends_on: Optional[List[str]] = None,
+            script: Optional[List[str]] = None,
+            parameters: Optional[Dict[str, Any]] = None
+    ):
+        self.repo = repo
+        self.command = command
+        self.cwd = cwd
+        self.depends_on = depends_on or []
+        self.script = script
+        self.parameters = parameters or {}
+
+
+class Usage(object):
+    """
+    Resources consumed by an executed Job, CPU times and maximum resident set size are only available if the Engine
+    waits for the process of the Job itself
+
+    The kernel carries the peak resident set size of a process over fork and exec, so a process spawned by Gameta
+    reports at least the peak of Gameta itself. The maximum resident set size is hence only known when the process
+    exceeded the process it was spawned from, otherwise it is None.
+
+    Attributes:
+        wall_time (float): Seconds elapsed between the start and the end of the Job
+        user_time (Optional[float]): Seconds of user CPU time consumed by the process and its waited-for children
+        system_time (Optional[float]): Seconds of system CPU time consumed by the process and its waited-for children
+        max_rss (Optional[int]): Maximum resident set size of the process or its largest waited-for child in KiB, None
+            if it did not exceed the process it was spawned from
+    """
+
+    def __init__(
+            self,
+            wall_time: float,
+            user_time: Optional[float] = None,
+            system_time: Optional[float] = None,
+            max_rss: Optional[int] = None
+    ):
+        self.wall_time = wall_time
+        self.user_time = user_time
+        self.system_time = system_time
+        self.max_rss = max_rss
+
+    @classmethod
+    def wait(cls, process: subprocess.Popen, started: float) -> Tuple[int, 'Usage']:
+        """
+        Waits for a process with os.wait4 to collect its resource usage, falls back to Popen.wait if the process has
+        already been waited for
+
+        Args:
+            process (subprocess.Popen): Process to wait for
+            started (float): Monotonic time the process was started at
+
+        Returns:
+            Tuple[int, Usage]: Return code of the process and its resource usage
+        """
+        try:
+            _, status, rusage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            return process.wait(), cls(time.monotonic() - started)
+        # Recorded on the Popen so that it does not wait for the process again
+        process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        # The peak inherited from Gameta at fork cannot exceed the peak of Gameta once the process has exited
+        inherited: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return process.returncode, cls(
+            time.monotonic() - started,
+            rusage.ru_utime,
+            rusage.ru_stime,
+            cls.kibibytes(rusage.ru_maxrss) if rusage.ru_maxrss > inherited else None
+        )
+
+    @staticmethod
+    def kibibytes(max_rss: int) -> int:
+        """
+        Converts a maximum resident set size reported by getrusage to KiB
+
+        Args:
+            max_rss (int): ru_maxrss field of a struct_rusage
+
+        Returns:
+            int: Maximum resident set size in KiB
+        """
+        # ru_maxrss is reported in bytes on macOS and in KiB elsewhere
+        return max_rss // 1024 if sys.platform == 'darwin' else max_rss
+
+
+class Result(object):
+    """
+    Outcome of a Job that has been processed by an Engine
+
+    Attributes:
+        repo (str): Name of the repository
+        command (List[str]): Tokenised command that was executed
+        status (str): One of succeeded, failed, skipped, cached or cancelled
+        return_code (Optional[int]): Return code of the command, None if the command was not executed
+        error (Optional[subprocess.CalledProcessError]): Error raised when the command failed
+        usage (Optional[Usage]): Resources consumed by the command, None if the command was not executed
+        log (Optional[str]): Path of the log file of the output of the command, None if it was not logged
+        tail (Optional[str]): Last lines of output of the command if it failed and its output was logged
+    """
+    SUCCEEDED: str = 'succeeded'
+    FAILED: str = 'failed'
+    SKIPPED: str = 'skipped'
+    CACHED: str = 'cached'
+    CANCELLED: str = 'cancelled'
+
+    def __init__(
+            self,
+            repo: str,
+            command: List[str],
+            status: str,
+            return_code: Optional[int] = None,
+            error: Optional[subprocess.CalledProcessError] = None,
+            usage: Optional[Usage] = None
+    ):
+        self.repo = repo
+        self.command = command
+        self.status = status
+        self.return_code = return_code
+        self.error = error
+        self.usage = usage
+        self.log: Optional[str] = None
+        self.tail: Optional[str] = None
+
+    @property
+    def failed(self) -> bool:
+        """
+        Returns a flag indicating if the Job failed
+
+        Returns:
+            bool: Flag to indicate if the Job failed
+        """
+        return self.status == self.FAILED
+
+    def describe(self) -> str:
+        """
+        Returns a brief description of the outcome to be printed in the execution summary
+
+        Returns:
+            str: Description of the outcome
+        """
+        if self.failed or self.status == self.CANCELLED:
+            return f"{self.repo}: {self.status} with return code {self.return_code}"
+        return f"{self.repo}: {self.status}"
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the Result as a JSON serialisable dictionary
+
+        Returns:
+            Dict: Repository, command, status, return code and resource usage of the Result
+        """
+        return {
+            'repo': self.repo,
+            'command': self.command,
+            'status': self.status,
+            'return_code': self.return_code,
+            'wall_time': self.usage.wall_time if self.usage else None,
+            'user_time': self.usage.user_time if self.usage else None,
+            'system_time': self.usage.system_time if self.usage else None,
+            'max_rss': self.usage.max_rss if self.usage else None
+        }
+
+
+class Scheduler(object):
+    """
+    Orders the Jobs of a plan according to their dependencies. A Job becomes ready once all of its dependencies within
+    the plan have succeeded, dependencies outside of the plan are assumed to be satisfied. Jobs downstream of a Job that
+    did not succeed are skipped.
+
+    Attributes:
+        plan (List[Job]): Jobs to be scheduled
+        waiting (Dict[str, Set[str]]): Dependencies of each Job that have not succeeded yet
+        dependents (Dict[str, List[str]]): Jobs that depend on each Job
+        queue (List[Tuple[int, str]]): Heap of ready Jobs ordered by their position in the plan
+        results (Dict[str, Result]): Results of all Jobs that have been processed
+        halted (bool): Flag to indicate that no further Jobs should be started
+    """
+
+    def __init__(self, plan: List[Job]):
+        self.plan = plan
+        self.index: Dict[str, int] = {job.repo: i for i, job in enumerate(plan)}
+        self.waiting: Dict[str, Set[str]] = {
+            job.repo: {d for d in job.depends_on if d in self.index and d != job.repo} for job in plan
+        }
+        self.dependents: Dict[str, List[str]] = {job.repo: [] for job in plan}
+        for job in plan:
+            for dependency in self.waiting[job.repo]:
+                self.dependents[dependency].append(job.repo)
+        self.queue: List[Tuple[int, str]] = [(self.index[r], r) for r, w in self.waiting.items() if not w]
+        heapq.heapify(self.queue)
+        self.results: Dict[str, Result] = {}
+        self.halted: bool = False
+
+    @property
+    def finished(self) -> bool:
+        """
+        Returns a flag indicating if all Jobs in the plan have been processed
+
+        Returns:
+            bool: Flag to indicate if all Jobs have been processed
+        """
+        return len(self.results) == len(self.plan)
+
+    def ready(self) -> List[Job]:
+        """
+        Returns all Jobs that are ready to be executed in the order of the plan, each Job is only returned once
+
+        Returns:
+            List[Job]: Jobs that are ready to be executed
+        """
+        jobs: List[Job] = []
+        while self.queue and not self.halted:
+            jobs.append(self.plan[heapq.heappop(self.queue)[0]])
+        return jobs
+
+    def complete(self, result: Result) -> List[Result]:
+        """
+        Records the Result of a Job and releases the Jobs depending on it, if the Job did not succeed all Jobs
+        downstream of it are skipped instead
+
+        Args:
+            result (Result): Result of the Job
+
+        Returns:
+            List[Result]: Results of Jobs that were skipped as a consequence
+        """
+        self.results[result.repo] = result
+        skipped: List[Result] = []
+        if result.status == Result.SUCCEEDED:
+            for dependent in self.dependents[result.repo]:
+                self.waiting[dependent].discard(result.repo)
+                if not self.waiting[dependent] and dependent not in self.results:
+                    heapq.heappush(self.queue, (self.index[dependent], dependent))
+            return skipped
+
+        downstream: List[str] = list(self.dependents[result.repo])
+        while downstream:
+            repo: str = downstream.pop()
+            if repo in self.results:
+                continue
+            self.results[repo] = Result(repo, self.plan[self.index[repo]].command, Result.SKIPPED)
+            skipped.append(self.results[repo])
+            downstream.extend(self.dependents[repo])
+        return sorted(skipped, key=lambda r: self.index[r.repo])
+
+    def halt(self, running: Iterable[str] = ()) -> List[Result]:
+        """
+        Stops the scheduling of further Jobs, all Jobs that are neither processed nor running are skipped
+
+        Args:
+            running (Iterable[str]): Repositories whose Jobs are still running
+
+        Returns:
+            List[Result]: Results of Jobs that were skipped
+        """
+        self.halted = True
+        self.queue = []
+        running: Set[str] = set(running)
+        skipped: List[Result] = [
+            Result(job.repo, job.command, Result.SKIPPED)
+            for job in self.plan if job.repo not in self.results and job.repo not in running
+        ]
+        self.results.update({result.repo: result for result in skipped})
+        return skipped
+
+
+class Engine(object):
+    """
+    Generic interface for Gameta execution engines
+
+    Attributes:
+        jobs (int): Maximum number of repositories to be processed concurrently
+        verbose (bool): Flag to indicate that output should be displayed as the commands are executed
+        raise_errors (bool): Flag to indicate that execution should be terminated when an error occurs
+        events (Optional[EventWriter]): Writer of machine-readable events, replaces all printed messages if provided
+        log_dir (Optional[str]): Directory the output of each Job is logged to, in a file named after its repository
+        tail_size (int): Maximum number of bytes at the end of the output of each Job retained in memory
+        lock (threading.Lock): Lock to serialise output from concurrent Jobs
+        grace_period (float): Seconds cancelled Jobs are given to terminate before they are killed
+        processes (Dict[str, Any]): Processes of the running Jobs, keyed on the repository
+        cancelled (Set[str]): Repositories whose Jobs have been cancelled
+        signalled (Set[str]): Repositories of the cancelled Jobs whose processes have been sent SIGTERM
+        terminations (List[Tuple[threading.Timer, List[int]]]): Pending kills of cancelled process groups
+    """
+    grace_period: float = 5.0
+
+    def __init__(
+            self,
+            jobs: int = 1,
+            verbose: bool = False,
+            raise_errors: bool = False,
+            events: Optional[EventWriter] = None,
+            log_dir: Optional[str] = None,
+            tail_size: int = 4 * 1024
+    ):
+        self.jobs = max(jobs, 1)
+        # Output is always captured for events as it would otherwise be interleaved with them
+        self.verbose = verbose or events is not None
+        self.raise_errors = raise_errors
+        self.events = events
+        self.log_dir = log_dir
+        self.tail_size = tail_size
+        self.lock = Lock()
+        self.processes: Dict[str, Any] = {}
+        self.cancelled: Set[str] = set()
+        self.signalled: Set[str] = set()
+        self.terminations: List[Tuple[Timer, List[int]]] = []
+
+    @property
+    def concurrent(self) -> bool:
+        """
+        Returns a flag indicating if Jobs are executed concurrently
+
+        Returns:
+            bool: Flag to indicate if Jobs are executed concurrently
+        """
+        return self.jobs > 1
+
+    @property
+    def isolated(self) -> bool:
+        """
+        Returns a flag indicating if Jobs are started in their own process groups, this is required to terminate
+        running Jobs together with their child processes when another Job fails and errors are to be raised
+
+        Returns:
+            bool: Flag to indicate if Jobs are started in their own process groups
+        """
+        return self.concurrent and self.raise_errors
+
+    @property
+    def captured(self) -> bool:
+        """
+        Returns a flag indicating if the output of Jobs is read by the Engine rather than inherited from Gameta, which
+        is required to display it with repository prefixes or events, or to log it
+
+        Returns:
+            bool: Flag to indicate if the output of Jobs is captured
+        """
+        return self.verbose or self.log_dir is not None
+
+    def open_log(self, job: Job) -> Optional[OutputLog]:
+        """
+        Opens the log file of a Job if output is to be logged
+
+        Args:
+            job (Job): Job to be executed
+
+        Returns:
+            Optional[OutputLog]: Log of the Job, None if output is not logged
+        """
+        if self.log_dir is None:
+            return None
+        return OutputLog(os.path.join(self.log_dir, f"{job.repo.replace(os.sep, '_')}.log"), self.tail_size)
+
+    def echo(self, repo: str, message: str) -> None:
+        """
+        Prints a message, prefixed with the repository name if Jobs are executed concurrently, or writes it as an
+        output event
+
+        Args:
+            repo (str): Repository the message originates from
+            message (str): Message to be printed
+
+        Returns:
+            None
+        """
+        self.write([(repo, message)])
+
+    def write(self, lines: List[Tuple[str, str]]) -> None:
+        """
+        Prints a batch of lines of output with a single write, each line is prefixed with its repository name if Jobs
+        are executed concurrently, or writes them as output events
+
+        Args:
+            lines (List[Tuple[str, str]]): Repository and line of output
+
+        Returns:
+            None
+        """
+        if self.events is not None:
+            for repo, line in lines:
+                self.events.write('output', repo, data=line)
+            return
+        with self.lock:
+            click.echo('\n'.join(f"[{repo}] {line}" if self.concurrent else line for repo, line in lines))
+
+    @abstractmethod
+    def run(self, plan: List[Job]) -> List[Result]:
+        """
+        Abstractmethod to execute all Jobs in the plan
+
+        Args:
+            plan (List[Job]): Jobs to be executed
+
+        Returns:
+            List[Result]: Results of all Jobs in the order of the plan
+        """
+
+    def start(self, job: Job) -> float:
+        """
+        Announces that a Job is about to be executed
+
+        Args:
+            job (Job): Job to be executed
+
+        Returns:
+            float: Monotonic time the Job was started at
+        """
+        if self.events is not None:
+            self.events.write('start', job.repo, command=job.command)
+        else:
+            with self.lock:
+                click.echo(f"Executing {' '.join(job.command)} in {job.repo}")
+        return time.monotonic()
+
+    def finish(
+            self, job: Job, return_code: int, usage: Optional[Usage] = None, log: Optional[OutputLog] = None
+    ) -> Result:
+        """
+        Generates the Result of an executed Job from its return code, errors are printed if they are not to be raised.
+        The log of the Job is closed and the tail of its output is retained if it failed. Cancelled Jobs only count as
+        cancelled if they were terminated by a signal or their processes were signalled, otherwise they failed on their
+        own.
+
+        Args:
+            job (Job): Job that was executed
+            return_code (int): Return code of the command
+            usage (Optional[Usage]): Resources consumed by the command
+            log (Optional[OutputLog]): Log of the Job
+
+        Returns:
+            Result: Outcome of the Job
+        """
+        with self.lock:
+            self.processes.pop(job.repo, None)
+        message: Optional[str] = None
+        if not return_code:
+            result: Result = Result(job.repo, job.command, Result.SUCCEEDED, return_code, usage=usage)
+        elif job.repo in self.cancelled and (return_code < 0 or job.repo in self.signalled):
+            result: Result = Result(job.repo, job.command, Result.CANCELLED, return_code, usage=usage)
+            message = f"Terminated {' '.join(job.command)} in {job.repo} as execution was stopped"
+        else:
+            e: subprocess.CalledProcessError = subprocess.CalledProcessError(return_code, job.command)
+            result: Result = Result(job.repo, job.command, Result.FAILED, return_code, e, usage)
+            if not self.raise_errors:
+                message = (
+                    f'Error {e.__class__.__name__}.{str(e)} occurred when executing command {e.cmd} in '
+                    f'{job.repo}, continuing execution'
+                )
+
+        if log is not None:
+            log.close()
+            result.log = log.path
+            if result.failed:
+                result.tail = log.tail()
+
+        if self.events is not None:
+            self.report(result)
+        elif message is not None:
+            with self.lock:
+                click.echo(message)
+        return result
+
+    def fail(self, job: Job, error: OSError, started: float) -> Result:
+        """
+        Generates the Result of a Job whose command could not be started e.g. as its executable does not exist, the
+        error is output by the Job, which fails with return code 127 as it would in a shell
+
+        Args:
+            job (Job): Job that was to be executed
+            error (OSError): Error raised when the command was started
+            started (float): Monotonic time the Job was started at
+
+        Returns:
+            Result: Outcome of the Job
+        """
+        message: str = f"{error.__class__.__name__}.{str(error)}"
+        log: Optional[OutputLog] = self.open_log(job)
+        if log is not None:
+            log.write(message.encode() + b'\n')
+        if log is None or self.verbose:
+            self.echo(job.repo, message)
+        return self.finish(job, 127, Usage(time.monotonic() - started), log)
+
+    def report(self, result: Result) -> None:
+        """
+        Writes the finish event of a Result, events are flushed so that the Result can be consumed immediately
+
+        Args:
+            result (Result): Result of a Job
+
+        Returns:
+            None
+        """
+        fields: Dict = result.to_dict()
+        del fields['repo']
+        self.events.write('finish', result.repo, flush=True, **fields)
+
+    def attach(self, job: Job, process: Any) -> None:
+        """
+        Records the process of a running Job so that it can be cancelled, the process is terminated immediately if the
+        Job was cancelled before it was started
+
+        Args:
+            job (Job): Running Job
+            process (Any): Process of the Job, either a subprocess.Popen or an asyncio.subprocess.Process
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.processes[job.repo] = process
+            cancelled: bool = job.repo in self.cancelled
+            if cancelled:
+                self.signalled.add(job.repo)
+        if cancelled:
+            self.terminate([process.pid])
+
+    def cancel(self, repos: Iterable[str]) -> None:
+        """
+        Cancels the Jobs of the repositories specified, their process groups are sent SIGTERM and then SIGKILL if they
+        have not terminated after the grace period. Jobs can only be cancelled if they are isolated in their own
+        process groups, otherwise this is a no-op.
+
+        Args:
+            repos (Iterable[str]): Repositories whose Jobs are to be cancelled
+
+        Returns:
+            None
+        """
+        if not self.isolated:
+            return
+        with self.lock:
+            repos: Set[str] = set(repos) - self.cancelled
+            self.cancelled.update(repos)
+            self.signalled.update(repo for repo in repos if repo in self.processes)
+            pids: List[int] = [self.processes[repo].pid for repo in repos if repo in self.processes]
+        if pids:
+            self.terminate(pids)
+
+    def terminate(self, pids: List[int]) -> None:
+        """
+        Sends SIGTERM to the process groups specified and schedules SIGKILL after the grace period
+
+        Args:
+            pids (List[int]): IDs of the process groups to be terminated
+
+        Returns:
+            None
+        """
+        self.signal(pids, signal.SIGTERM)
+        timer: Timer = Timer(self.grace_period, self.signal, [pids, signal.SIGKILL])
+        timer.daemon = True
+        timer.start()
+        with self.lock:
+            self.terminations.append((timer, pids))
+
+    @staticmethod
+    def signal(pids: List[int], sig: int) -> None:
+        """
+        Sends a signal to the process groups specified, process groups that no longer exist are ignored
+
+        Args:
+            pids (List[int]): IDs of the process groups
+            sig (int): Signal to be sent
+
+        Returns:
+            None
+        """
+        for pid in pids:
+            try:
+                os.killpg(pid, sig)
+            except (ProcessLookupError, PermissionError):
+                continue
+
+    def reap(self) -> None:
+        """
+        Waits for pending kills of process groups that still have members, e.g. children of a cancelled Job that
+        ignore SIGTERM, and drops the others. Called once the plan has been executed.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            terminations, self.terminations = self.terminations, []
+        for timer, pids in terminations:
+            alive: bool = False
+            for pid in pids:
+                try:
+                    os.killpg(pid, 0)
+                    alive = True
+                except (ProcessLookupError, PermissionError):
+                    continue
+            if alive:
+                timer.join()
+            else:
+                timer.cancel()
+
+    def skip(self, results: List[Result]) -> None:
+        """
+        Announces Jobs that were skipped as one of their dependencies did not succeed, finish events of skipped Jobs
+        are left to the caller as Jobs are also skipped when execution is halted
+
+        Args:
+            results (List[Result]): Results of the skipped Jobs
+
+        Returns:
+            None
+        """
+        if self.events is not None:
+            return
+        with self.lock:
+            for result in results:
+                click.echo(f"Skipping {result.repo} as one of its dependencies did not succeed")
+
+
+class ThreadEngine(Engine):
+    """
+    Executes Jobs on a bounded pool of worker threads, each worker blocks on a single subprocess at a time. Jobs are
+    executed serially in the calling thread if only one job is allowed. Output of all running Jobs is read by a single
+    output pump and printed in batches.
+
+    Attributes:
+        pump (Optional[OutputPump]): Output pump of the running Jobs, only started if output is captured
+    """
+    pump: Optional[OutputPump] = None
+
+    def execute(self, job: Job) -> Result:
+        """
+        Executes a single Job in a subprocess, its resource usage is collected when it is waited for
+
+        Args:
+            job (Job): Job to be executed
+
+        Returns:
+            Result: Outcome of the Job
+        """
+        started: float = self.start(job)
+        try:
+            cmd: subprocess.Popen = subprocess.Popen(
+                job.command,
+                cwd=job.cwd,
+                stdout=subprocess.PIPE if self.captured else None,
+                stderr=subprocess.STDOUT,
+                start_new_session=self.isolated
+            )
+        except OSError as e:
+            return self.fail(job, e, started)
+        with cmd:
+            self.attach(job, cmd)
+            log: Optional[OutputLog] = None
+            if self.captured:
+                log = self.open_log(job)
+                self.pump.add(job.repo, cmd.stdout, log, echo=self.verbose).wait()
+            return_code, usage = Usage.wait(cmd, started)
+        return self.finish(job, return_code, usage, log)
+
+    def run(self, plan: List[Job]) -> List[Result]:
+        """
+        Executes all Jobs in the plan, the output pump is stopped once all Jobs have completed
+
+        Args:
+            plan (List[Job]): Jobs to be executed
+
+        Returns:
+            List[Result]: Results of all Jobs in the order of the plan
+        """
+        self.pump = OutputPump(self.write) if self.captured else None
+        try:
+            return self.schedule(plan)
+        finally:
+            if self.pump is not None:
+                self.pump.close()
+                self.pump = None
+
+    def schedule(self, plan: List[Job]) -> List[Result]:
+        """
+        Executes all Jobs in the plan in the order of their dependencies with at most self.jobs Jobs running
+        concurrently, Jobs are started as soon as their dependencies have succeeded. Jobs that have not started are
+        skipped if an error occurs and errors are to be raised.
+
+        Args:
+            plan (List[Job]): Jobs to be executed
+
+        Returns:
+            List[Result]: Results of all Jobs in the order of the plan
+        """
+        scheduler: Scheduler = Scheduler(plan)
+        queue: Deque[Job] = deque()
+        if not self.concurrent:
+            while not scheduler.finished:
+                queue.extend(scheduler.ready())
+                if not queue:
+                    scheduler.halt()
+                    break
+                result: Result = self.execute(queue.popleft())
+                self.skip(scheduler.complete(result))
+                if result.failed and self.raise_errors:
+                    scheduler.halt()
+            return [scheduler.results[job.repo] for job in plan]
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+                running: Dict[Future, Job] = {}
+                try:
+                    while not scheduler.finished:
+                        queue.extend(scheduler.ready())
+                        while queue and len(running) < self.jobs:
+                            job: Job = queue.popleft()
+                            running[pool.submit(self.execute, job)] = job
+                        if not running:
+                            scheduler.halt()
+                            break
+
+                        done: Set[Future]
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            del running[future]
+                            result: Result = future.result()
+                            self.skip(scheduler.complete(result))
+                            if result.failed and self.raise_errors:
+                                queue.clear()
+                                scheduler.halt(job.repo for job in running.values())
+                                self.cancel(job.repo for job in running.values())
+                except BaseException:
+                    # Running Jobs do not receive signals sent to Gameta if they are isolated e.g. on KeyboardInterrupt
+                    self.cancel(job.repo for job in running.values())
+                    raise
+        finally:
+            self.reap()
+        return [scheduler.results[job.repo] for job in plan]
+
+
+class AsyncioEngine(Engine):
+    """
+    Executes Jobs as asyncio subprocesses on a single event loop, output from all Jobs is read concurrently in chunks
+    and printed in batches of lines with the repository name as a prefix. No thread is required per running Job,
+    allowing a large number of Jobs to be executed concurrently. Only the wall time of each Job is recorded as child
+    processes are waited for by asyncio.
+
+    Attributes:
+        chunk_size (int): Maximum number of bytes read from a Job's output at a time
+        tasks (Set[asyncio.Future]): Tasks of the plan and of the Jobs started on the event loop
+    """
+    chunk_size: int = 64 * 1024
+    tasks: Set[asyncio.Future] = frozenset()
+
+    def run(self, plan: List[Job]) -> List[Result]:
+        """
+        Executes all Jobs in the plan on a new event loop with at most self.jobs Jobs running concurrently, Jobs that
+        have not started are skipped if an error occurs and errors are to be raised
+
+        Args:
+            plan (List[Job]): Jobs to be executed
+
+        Returns:
+            List[Result]: Results of all Jobs in the order of the plan
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        watcher: Optional[asyncio.AbstractChildWatcher] = self.watch_children(loop)
+        self.tasks = set()
+        try:
+            # Child processes can only be watched from a loop registered in the main thread
+            if current_thread() is main_thread():
+                asyncio.set_event_loop(loop)
+            schedule: asyncio.Future = loop.create_task(self.schedule(plan))
+            self.tasks.add(schedule)
+            return loop.run_until_complete(schedule)
+        except BaseException:
+            # Running Jobs do not receive signals sent to Gameta if they are isolated e.g. on KeyboardInterrupt
+            self.cancel(list(self.processes.keys()))
+            raise
+        finally:
+            # Tasks still running when execution is interrupted stop their processes before the loop is closed, so
+            # that neither the tasks nor the processes are left behind
+            pending: List[asyncio.Future] = [task for task in self.tasks if not task.done()]
+            if pending:
+                for task in pending:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.tasks = set()
+            self.reap()
+            if current_thread() is main_thread():
+                asyncio.set_event_loop(None)
+            if watcher is not None:
+                watcher.close()
+                asyncio.set_child_watcher(None)
+            loop.close()
+
+    @staticmethod
+    def watch_children(loop: asyncio.AbstractEventLoop) -> Optional['asyncio.AbstractChildWatcher']:
+        """
+        Attaches a pidfd based child watcher to the loop where it is supported but is not the default (Python 3.9 to
+        3.11), the default watcher of these versions waits on every child process in a separate thread
+
+        Args:
+            loop (asyncio.AbstractEventLoop): Event loop to attach the watcher to
+
+        Returns:
+            Optional[asyncio.AbstractChildWatcher]: Attached watcher, None if the default watcher is used
+        """
+        if sys.version_info >= (3, 12) or not hasattr(asyncio, 'PidfdChildWatcher'):
+            return None
+        try:
+            os.close(os.pidfd_open(os.getpid()))
+        except (AttributeError, OSError):
+            return None
+        watcher: asyncio.AbstractChildWatcher = asyncio.PidfdChildWatcher()
+        watcher.attach_loop(loop)
+        asyncio.set_child_watcher(watcher)
+        return watcher
+
+    async def schedule(self, plan: List[Job]) -> List[Result]:
+        """
+        Schedules all Jobs in the plan in the order of their dependencies with at most self.jobs Jobs running
+        concurrently
+
+        Args:
+            plan (List[Job]): Jobs to be executed
+
+        Returns:
+            List[Result]: Results of all Jobs in the order of the plan
+        """
+        scheduler: Scheduler = Scheduler(plan)
+        queue: Deque[Job] = deque()
+        running: Dict[asyncio.Future, Job] = {}
+        while not scheduler.finished:
+            queue.extend(scheduler.ready())
+            while queue and len(running) < self.jobs:
+                job: Job = queue.popleft()
+                task: asyncio.Future = asyncio.ensure_future(self.execute(job))
+                self.tasks.add(task)
+                running[task] = job
+            if not running:
+                scheduler.halt()
+                break
+
+            done: Set[asyncio.Future]
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                result: Result = future.result()
+                self.skip(scheduler.complete(result))
+                if result.failed and self.raise_errors:
+                    queue.clear()
+                    scheduler.halt(job.repo for job in running.values())
+                    self.cancel(job.repo for job in running.values())
+        return [scheduler.results[job.repo] for job in plan]
+
+    async def execute(self, job: Job) -> Result:
+        """
+        Executes a single Job in an asyncio subprocess, streaming its output if required
+
+        Args:
+            job (Job): Job to be executed
+
+        Returns:
+            Result: Outcome of the Job
+        """
+        started: float = self.start(job)
+        try:
+            process: asyncio.subprocess.Process = await asyncio.create_subprocess_exec(
+                *job.command,
+                cwd=job.cwd,
+                stdout=asyncio.subprocess.PIPE if self.captured else None,
+                stderr=asyncio.subprocess.STDOUT,
+                start_new_session=self.isolated
+            )
+        except OSError as e:
+            return self.fail(job, e, started)
+        self.attach(job, process)
+        log: Optional[OutputLog] = None
+        try:
+            if self.captured:
+                log = self.open_log(job)
+                decoder: LineDecoder = LineDecoder()
+                while True:
+                    chunk: bytes = await process.stdout.read(self.chunk_size)
+                    if log is not None:
+                        log.write(chunk)
+                    lines: List[str] = decoder.decode(chunk, final=not chunk) if self.verbose else []
+                    if lines:
+                        self.write([(job.repo, line) for line in lines])
+                    if not chunk:
+                        break
+            return_code: int = await process.wait()
+        except asyncio.CancelledError:
+            await self.stop(process)
+            if log is not None:
+                log.close()
+            raise
+        return self.finish(job, return_code, Usage(time.monotonic() - started), log)
+
+    async def stop(self, process: asyncio.subprocess.Process) -> None:
+        """
+        Terminates the process of a Job whose task is cancelled, the process is killed if it has not terminated after
+        the grace period. The process group is signalled if the Job is isolated.
+
+        Args:
+            process (asyncio.subprocess.Process): Process of the Job
+
+        Returns:
+            None
+        """
+        for sig in [signal.SIGTERM, signal.SIGKILL]:
+            if process.returncode is not None:
+                return
+            if self.isolated:
+                self.signal([process.pid], sig)
+            else:
+                try:
+                    process.send_signal(sig)
+                except ProcessLookupError:
+                    return
+            try:
+                await asyncio.wait_for(process.wait(), self.grace_period)
+            except asyncio.TimeoutError:
+                continue
+
+
+class Shell(object):
+    """
+    Long-lived shell that executes scripts written to its standard input, the output and return code of each script
+    are framed by a sentinel marker that is unique to the script
+
+    Attributes:
+        executable (str): Shell executable
+        process (subprocess.Popen): Shell process, started in its own process group if it is isolated
+    """
+
+    def __init__(self, executable: str, isolated: bool = False):
+        self.executable = executable
+        self.process: subprocess.Popen = subprocess.Popen(
+            [executable],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            start_new_session=isolated
+        )
+
+    @property
+    def alive(self) -> bool:
+        """
+        Returns a flag indicating if the shell is able to execute further scripts
+
+        Returns:
+            bool: Flag to indicate if the shell is alive
+        """
+        return self.process.poll() is None
+
+    def execute(self, script: str, cwd: str, output: Callable[[str], None]) -> int:
+        """
+        Executes a script in the directory specified, the script is executed in a subshell so that changes to its
+        environment, options such as set -e and exit do not affect the shell or the scripts executed after it. Standard
+        input of the script is redirected from /dev/null to protect the framing.
+
+        Args:
+            script (str): Shell script to be executed
+            cwd (str): Absolute path of the directory the script is executed in
+            output (Callable[[str], None]): Callback invoked with each line of output
+
+        Returns:
+            int: Return code of the script
+        """
+        token: bytes = uuid4().hex.encode()
+        marker: bytes = b'\n' + token + b' '
+        try:
+            self.process.stdin.write(
+                f"(cd -- {shlex.quote(cwd)} && {{\n{script}\n}}) </dev/null 2>&1\n"
+                f"printf '\\n%s %d\\n' {token.decode()} $?\n".encode()
+            )
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            return self.process.wait()
+
+        fd: int = self.process.stdout.fileno()
+        pending: bytes = b''
+        start: int = 0  # Set to 1 once the leading newline in pending terminates a line that has been output
+        while True:
+            chunk: bytes = os.read(fd, 65536)
+            if not chunk:
+                # The script terminated the shell e.g. by killing it
+                self.output(pending[start:], output, final=True)
+                return self.process.wait()
+            pending += chunk
+
+            index: int = pending.find(marker)
+            if index >= 0:
+                end: int = pending.find(b'\n', index + len(marker))
+                if end >= 0:
+                    self.output(pending[start:index], output, final=True)
+                    return int(pending[index + len(marker):end])
+                continue
+
+            # Lines are output as they complete, the last newline is retained as it may begin the marker, in which
+            # case a blank line before it is not part of the output either
+            cut: int = pending.rfind(b'\n')
+            while cut > start and pending[cut - 1:cut] == b'\n':
+                cut -= 1
+            if cut > start:
+                self.output(pending[start:cut], output)
+                pending = pending[cut:]
+                start = 1
+
+    @staticmethod
+    def output(data: bytes, output: Callable[[str], None], final: bool = False) -> None:
+        """
+        Splits output into lines and passes them to the output callback
+
+        Args:
+            data (bytes): Output of the script
+            output (Callable[[str], None]): Callback invoked with each line of output
+            final (bool): Flag to indicate that data ends the output, a trailing newline does not begin another line
+
+        Returns:
+            None
+        """
+        lines: List[bytes] = data.split(b'\n')
+        if final and lines[-1] == b'':
+            lines.pop()
+        for line in lines:
+            output(line.rstrip().decode(errors='replace'))
+
+    def close(self) -> None:
+        """
+        Terminates the shell after it has completed its current script
+
+        Returns:
+            None
+        """
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.process.wait()
+        self.process.stdout.close()
+
+
+class ShellPoolEngine(ThreadEngine):
+    """
+    Executes Jobs on a pool of long-lived shells instead of spawning a process for each repository, each shell forks a
+    subshell that changes into the directory of the repository and executes the command as a script. Shells are started
+    as they are needed, at most one for each concurrent Job, and terminated once the plan has been executed. Only the
+    wall time of each Job is recorded as its processes are waited for by the shell. The shells frame scripts with POSIX
+    syntax, so the SHELL must be a POSIX shell.
+
+    Attributes:
+        shells (List[Shell]): Idle shells
+        pool_lock (threading.Lock): Lock to synchronise access to the idle shells
+    """
+
+    def __init__(
+            self,
+            jobs: int = 1,
+            verbose: bool = False,
+            raise_errors: bool = False,
+            events: Optional[EventWriter] = None,
+            log_dir: Optional[str] = None,
+            tail_size: int = 4 * 1024
+    ):
+        if basename(SHELL) not in POSIX_SHELLS:
+            raise ValueError(f"The shell-pool engine requires a POSIX shell such as /bin/sh, {SHELL} is not supported")
+        super(ShellPoolEngine, self).__init__(
+            jobs=jobs, verbose=verbose, raise_errors=raise_errors, events=events, log_dir=log_dir, tail_size=tail_size
+        )
+        self.shells: List[Shell] = []
+        self.pool_lock = Lock()
+
+    @staticmethod
+    def script(command: List[str]) -> str:
+        """
+        Converts a tokenised command into a shell script, commands that are already wrapped in a shell are unwrapped
+
+        Args:
+            command (List[str]): Tokenised command
+
+        Returns:
+            str: Shell script
+        """
+        if len(command) == 3 and command[0] == SHELL and command[1] == '-c':
+            return command[2]
+        return ' '.join(shlex.quote(c) for c in command)
+
+    def execute(self, job: Job) -> Result:
+        """
+        Executes a single Job on an idle shell, a shell is started if none is idle
+
+        Args:
+            job (Job): Job to be executed
+
+        Returns:
+            Result: Outcome of the Job
+        """
+        started: float = self.start(job)
+        with self.pool_lock:
+            shell: Shell = self.shells.pop() if self.shells else Shell(SHELL, isolated=self.isolated)
+        self.attach(job, shell.process)
+        log: Optional[OutputLog] = self.open_log(job)
+
+        def output(line: str) -> None:
+            if log is not None:
+                log.write(line.encode() + b'\n')
+            if log is None or self.verbose:
+                self.echo(job.repo, line)
+
+        try:
+            return_code: int = shell.execute(self.script(job.command), job.cwd, output)
+        finally:
+            # The shell is no longer the process of the Job once it is idle, cancelling the Job must not terminate it
+            with self.lock:
+                self.processes.pop(job.repo, None)
+            if shell.alive:
+                with self.pool_lock:
+                    self.shells.append(shell)
+            else:
+                shell.close()
+        return self.finish(job, return_code, Usage(time.monotonic() - started), log)
+
+    def run(self, plan: List[Job]) -> List[Result]:
+        """
+        Executes all Jobs in the plan on the pool of shells, which is terminated afterwards. The output pump is not
+        started as output is read by each shell.
+
+        Args:
+            plan (List[Job]): Jobs to be executed
+
+        Returns:
+            List[Result]: Results of all Jobs in the order of the plan
+        """
+        try:
+            return self.schedule(plan)
+        finally:
+            with self.pool_lock:
+                shells, self.shells = self.shells, []
+            for shell in shells:
+                shell.close()
+
+
+class PythonPoolEngine(ThreadEngine):
+    """
+    Executes Python Jobs on a pool of long-lived Python interpreters instead of starting a shell and an interpreter for
+    each repository. Interpreters are forked from a forkserver that has imported the preloaded modules, each script is
+    compiled once per interpreter and executed in the directory of the repository with its parameters as globals.
+    Modules imported by a script remain imported for later scripts on the same interpreter. Jobs that are not Python
+    Jobs are executed as subprocesses.
+
+    Attributes:
+        preload (List[str]): Modules imported by the forkserver before interpreters are forked from it
+        workers (List[PythonWorker]): Idle interpreters
+        pool_lock (threading.Lock): Lock to synchronise access to the idle interpreters
+    """
+
+    def __init__(
+            self,
+            jobs: int = 1,
+            verbose: bool = False,
+            raise_errors: bool = False,
+            events: Optional[EventWriter] = None,
+            log_dir: Optional[str] = None,
+            tail_size: int = 4 * 1024,
+            preload: Sequence[str] = ()
+    ):
+        super(PythonPoolEngine, self).__init__(
+            jobs=jobs, verbose=verbose, raise_errors=raise_errors, events=events, log_dir=log_dir, tail_size=tail_size
+        )
+        self.preload: List[str] = list(preload)
+        self.workers: List[PythonWorker] = []
+        self.pool_lock = Lock()
+
+    def execute(self, job: Job) -> Result:
+        """
+        Executes the Python scripts of a single Job on an idle interpreter, an interpreter is started if none is idle
+
+        Args:
+            job (Job): Job to be executed
+
+        Returns:
+            Result: Outcome of the Job
+        """
+        if job.script is None:
+            return super(PythonPoolEngine, self).execute(job)
+
+        started: float = self.start(job)
+        with self.pool_lock:
+            worker: PythonWorker = self.workers.pop() if self.workers else PythonWorker(self.preload, self.isolated)
+        self.attach(job, worker.process)
+        log: Optional[OutputLog] = None
+        try:
+            if self.captured:
+                read, write = os.pipe()
+                with open(read, 'rb') as output:
+                    try:
+                        worker.submit(job.script, job.cwd, job.parameters, write)
+                    finally:
+                        os.close(write)
+                    log = self.open_log(job)
+                    self.pump.add(job.repo, output, log, echo=self.verbose).wait()
+            else:
+                worker.submit(job.script, job.cwd, job.parameters)
+            return_code, user_time, system_time, max_rss = worker.wait()
+        finally:
+            # The interpreter is no longer the process of the Job once it is idle, cancelling the Job must not kill it
+            with self.lock:
+                self.processes.pop(job.repo, None)
+            if worker.alive:
+                with self.pool_lock:
+                    self.workers.append(worker)
+            else:
+                worker.close()
+        if max_rss is not None:
+            max_rss = Usage.kibibytes(max_rss)
+        return self.finish(
+            job, return_code, Usage(time.monotonic() - started, user_time, system_time, max_rss), log
+        )
+
+    def run(self, plan: List[Job]) -> List[Result]:
+        """
+        Executes all Jobs in the plan on the pool of interpreters, which is terminated afterwards
+
+        Args:
+            plan (List[Job]): Jobs to be executed
+
+        Returns:
+            List[Result]: Results of all Jobs in the order of the plan
+        """
+        try:
+            return super(PythonPoolEngine, self).run(plan)
+        finally:
+            with self.pool_lock:
+                workers, self.workers = self.workers, []
+            for worker in workers:
+                worker.close()
+
+
+engines: Dict[str, Type[Engine]] = {
+    'thread': ThreadEngine,
+    'asyncio': AsyncioEngine,
+    'shell-pool': ShellPoolEngine,
+    'python-pool': PythonPoolEngine
+}
@@ -0,0 +1,69 @@
+import json
+import time
+from threading import RLock
+from typing import BinaryIO, List, Optional, Any
+
+
+__all__ = ['EventWriter']
+
+
+class EventWriter(object):
+    """
+    Writes machine-readable events as JSON lines to a binary stream, events are accumulated in a single buffer that is
+    flushed once it exceeds the buffer size, once the flush interval has elapsed or when an event requires it
+
+    Attributes:
+        stream (BinaryIO): Stream the events are written to
+        buffer_size (int): Number of bytes buffered before the buffer is flushed
+        flush_interval (float): Maximum number of seconds an event is buffered for while further events are written
+        buffer (List[bytes]): Encoded events that have not been written yet
+        size (int): Number of bytes in the buffer
+        flushed (float): Monotonic time of the last flush
+        lock (threading.RLock): Lock to serialise events written from concurrent Jobs
+    """
+
+    def __init__(self, stream: BinaryIO, buffer_size: int = 64 * 1024, flush_interval: float = 0.1):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.buffer: List[bytes] = []
+        self.size: int = 0
+        self.flushed: float = time.monotonic()
+        self.lock = RLock()
+
+    def write(self, event: str, repo: Optional[str] = None, flush: bool = False, **fields: Any) -> None:
+        """
+        Writes an event
+
+        Args:
+            event (str): Type of the event e.g. start, output or finish
+            repo (Optional[str]): Repository the event relates to
+            flush (bool): Flag to indicate that the buffer should be flushed after the event
+            **fields (Any): JSON serialisable fields of the event
+
+        Returns:
+            None
+        """
+        line: bytes = json.dumps(
+            {'event': event, 'repo': repo, 'time': time.time(), **fields}, separators=(',', ':')
+        ).encode() + b'\n'
+        with self.lock:
+            self.buffer.append(line)
+            self.size += len(line)
+            if flush or self.size >= self.buffer_size or time.monotonic() - self.flushed >= self.flush_interval:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes all buffered events to the stream
+
+        Returns:
+            None
+        """
+        with self.lock:
+            if self.buffer:
+                self.stream.write(b''.join(self.buffer))
+                self.buffer = []
+                self.size = 0
+            self.stream.flush()
+            self.flushed = time.monotonic()
@@ -97,7 +97,7 @@ def sync(context: GametaContext) -> None:
                 continue
 
             try:
-                Repo.clone_from(details['url'], details['path'])
+                Repo.clone_from(details['url'], context.resolve(details['path'], check=False))
                 click.echo(f'Successfully synced {repo} to {details["path"]}')
             except GitError as e:
                 click.echo(f"An error occurred {str(e)}, skipping repo")
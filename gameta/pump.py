@@ -0,0 +1,281 @@
+import codecs
+import errno
+import os
+import selectors
+from collections import deque
+from threading import Thread, Event, Lock
+from typing import List, Tuple, Callable, Dict, Deque, BinaryIO, Optional
+
+
+__all__ = ['SPLICE', 'LineDecoder', 'OutputLog', 'OutputPump']
+
+
+# Output can be moved from pipes to files within the kernel (Linux with Python 3.10 and above)
+SPLICE: bool = hasattr(os, 'splice')
+
+
+class LineDecoder(object):
+    """
+    Incrementally decodes chunks of UTF-8 output into lines, multi-byte characters split across chunks are decoded
+    once they are complete. Lines without a newline are released once they exceed the maximum line length so that
+    they are not held back indefinitely.
+
+    Attributes:
+        decoder (codecs.IncrementalDecoder): Incremental UTF-8 decoder, invalid bytes are replaced
+        partial (str): Decoded output after the last newline
+        max_line (int): Maximum number of characters held back waiting for a newline
+    """
+
+    def __init__(self, max_line: int = 1024 * 1024):
+        self.decoder: codecs.IncrementalDecoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.partial: str = ''
+        self.max_line = max_line
+
+    def decode(self, chunk: bytes, final: bool = False) -> List[str]:
+        """
+        Decodes a chunk of output
+
+        Args:
+            chunk (bytes): Chunk of output
+            final (bool): Flag to indicate that the output has ended, the remaining partial line is released
+
+        Returns:
+            List[str]: Complete lines in the chunk, stripped of trailing whitespace
+        """
+        *lines, self.partial = (self.partial + self.decoder.decode(chunk, final)).split('\n')
+        if (final and self.partial) or len(self.partial) > self.max_line:
+            lines.append(self.partial)
+            self.partial = ''
+        return [line.rstrip() for line in lines]
+
+
+class OutputLog(object):
+    """
+    Log file of the output of a Job, output is written to the file through a buffered writer and only a bounded tail
+    of it is retained in memory, so memory usage is independent of the amount of output. Output can also be forwarded
+    from a pipe straight into the file, in which case the tail is read back from the file.
+
+    Attributes:
+        path (str): Path of the log file
+        tail_size (int): Maximum number of bytes of the tail retained in memory
+        file (BinaryIO): Buffered writer of the log file
+        buffer (bytearray): Last bytes of output, at most tail_size bytes
+        truncated (bool): Flag to indicate that earlier output has been dropped from the tail
+        splice (bool): Flag to indicate that forwarded output is spliced into the file, cleared if the file does not
+                       support it
+        forwarded (bool): Flag to indicate that output has been spliced into the file, bypassing the tail
+    """
+
+    def __init__(self, path: str, tail_size: int = 4 * 1024, buffering: int = 64 * 1024):
+        self.path = path
+        self.tail_size = tail_size
+        self.file: BinaryIO = open(path, 'wb', buffering=buffering)
+        self.buffer: bytearray = bytearray()
+        self.truncated: bool = False
+        self.splice: bool = SPLICE
+        self.forwarded: bool = False
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Writes a chunk of output to the log file and the tail
+
+        Args:
+            chunk (bytes): Chunk of output
+
+        Returns:
+            None
+        """
+        self.file.write(chunk)
+        self.truncated = self.truncated or len(self.buffer) + len(chunk) > self.tail_size
+        self.buffer += chunk[max(len(chunk) - self.tail_size, 0):]
+        del self.buffer[:max(len(self.buffer) - self.tail_size, 0)]
+
+    def forward(self, fd: int, count: int) -> int:
+        """
+        Moves up to count bytes of output from a pipe to the log file. Output is spliced from the pipe into the file
+        without being copied through Python where supported, and is written through the buffered writer otherwise.
+
+        Args:
+            fd (int): File descriptor of the pipe, which must be readable
+            count (int): Maximum number of bytes to be moved
+
+        Returns:
+            int: Number of bytes moved, 0 once the output has ended
+
+        Raises:
+            BlockingIOError: If the pipe is non-blocking and has no output available
+        """
+        if self.splice:
+            try:
+                moved: int = os.splice(fd, self.file.fileno(), count, flags=os.SPLICE_F_MOVE)
+                self.forwarded = self.forwarded or moved > 0
+                return moved
+            except BlockingIOError:
+                raise
+            except OSError as e:
+                # e.g. file systems that do not support splice
+                if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EXDEV):
+                    raise
+                self.splice = False
+        chunk: bytes = os.read(fd, count)
+        self.write(chunk)
+        return len(chunk)
+
+    def tail(self) -> str:
+        """
+        Returns the tail of the output, a line that has been cut off is dropped. The tail is read from the log file if
+        output has been forwarded, which requires the log to have been closed.
+
+        Returns:
+            str: Last lines of output
+        """
+        data: bytes = bytes(self.buffer)
+        if self.forwarded:
+            with open(self.path, 'rb') as f:
+                size: int = f.seek(0, os.SEEK_END)
+                f.seek(max(size - self.tail_size, 0))
+                data = f.read()
+            self.truncated = size > self.tail_size
+        if self.truncated and b'\n' in data:
+            data = data[data.index(b'\n') + 1:]
+        return data.decode(errors='replace').rstrip()
+
+    def close(self) -> None:
+        """
+        Flushes and closes the log file
+
+        Returns:
+            None
+        """
+        self.file.close()
+
+
+class OutputPump(object):
+    """
+    Pumps the output of multiple processes from a single thread, pipes are multiplexed with selectors and read in
+    large non-blocking chunks. Lines read from all pipes in an iteration are passed to the writer as a single batch.
+    Output that is only logged is forwarded from the pipe to the log without being decoded.
+
+    Attributes:
+        writer (Callable[[List[Tuple[str, str]]], None]): Callback invoked with each batch of (repository, line)
+        chunk_size (int): Maximum number of bytes read from a pipe at a time
+        selector (selectors.BaseSelector): Selector multiplexing the pipes and the wakeup pipe
+        pending (Deque[Tuple]): Pipes added but not yet registered with the selector, with their repositories, logs,
+                                echo flags and completion events
+        lock (threading.Lock): Lock to synchronise access to the pending pipes
+        closed (bool): Flag to indicate that the pump should stop once all pipes have ended
+        error (Optional[Exception]): First error raised by the writer, output is discarded afterwards
+        thread (threading.Thread): Thread the pump runs on
+    """
+
+    def __init__(self, writer: Callable[[List[Tuple[str, str]]], None], chunk_size: int = 64 * 1024):
+        self.writer = writer
+        self.chunk_size = chunk_size
+        self.selector: selectors.BaseSelector = selectors.DefaultSelector()
+        self.pending: Deque[Tuple[str, BinaryIO, Optional[OutputLog], bool, Event]] = deque()
+        self.lock = Lock()
+        self.closed: bool = False
+        self.error: Optional[Exception] = None
+        self.wakeup: Tuple[int, int] = os.pipe()
+        os.set_blocking(self.wakeup[0], False)
+        self.selector.register(self.wakeup[0], selectors.EVENT_READ)
+        self.thread = Thread(target=self.run, name='gameta-output-pump', daemon=True)
+        self.thread.start()
+
+    def add(self, repo: str, pipe: BinaryIO, log: Optional[OutputLog] = None, echo: bool = True) -> Event:
+        """
+        Adds the output pipe of a process to the pump
+
+        Args:
+            repo (str): Repository the process is executed in
+            pipe (BinaryIO): Output pipe of the process
+            log (Optional[OutputLog]): Log the output is written to
+            echo (bool): Flag to indicate that lines of output should be passed to the writer
+
+        Returns:
+            threading.Event: Event set once the output has ended and has been written
+        """
+        done: Event = Event()
+        with self.lock:
+            self.pending.append((repo, pipe, log, echo, done))
+        os.write(self.wakeup[1], b'\0')
+        return done
+
+    def close(self) -> None:
+        """
+        Stops the pump once all pipes added have ended
+
+        Returns:
+            None
+
+        Raises:
+            Exception: First error raised by the writer
+        """
+        with self.lock:
+            self.closed = True
+        os.write(self.wakeup[1], b'\0')
+        self.thread.join()
+        self.selector.close()
+        os.close(self.wakeup[0])
+        os.close(self.wakeup[1])
+        if self.error is not None:
+            raise self.error
+
+    def run(self) -> None:
+        """
+        Reads from all pipes until the pump is closed and all pipes have ended
+
+        Returns:
+            None
+        """
+        streams: Dict[int, Tuple[str, Optional[OutputLog], Optional[LineDecoder], Event]] = {}
+        while True:
+            with self.lock:
+                while self.pending:
+                    repo, pipe, log, echo, done = self.pending.popleft()
+                    os.set_blocking(pipe.fileno(), False)
+                    streams[pipe.fileno()] = (repo, log, LineDecoder() if echo else None, done)
+                    self.selector.register(pipe.fileno(), selectors.EVENT_READ)
+                if self.closed and not streams:
+                    return
+
+            batch: List[Tuple[str, str]] = []
+            finished: List[Event] = []
+            for key, _ in self.selector.select():
+                if key.fd == self.wakeup[0]:
+                    try:
+                        os.read(self.wakeup[0], self.chunk_size)
+                    except BlockingIOError:
+                        pass
+                    continue
+
+                repo, log, decoder, done = streams[key.fd]
+                chunk: bytes = b''
+                try:
+                    if decoder is None and log is not None:
+                        ended: bool = not log.forward(key.fd, self.chunk_size)
+                    else:
+                        chunk = os.read(key.fd, self.chunk_size)
+                        ended = not chunk
+                except BlockingIOError:
+                    continue
+                except OSError:
+                    ended = True
+                if decoder is not None:
+                    if log is not None:
+                        log.write(chunk)
+                    batch.extend((repo, line) for line in decoder.decode(chunk, final=ended))
+                if ended:
+                    self.selector.unregister(key.fd)
+                    del streams[key.fd]
+                    finished.append(done)
+
+            if batch and self.error is None:
+                try:
+                    self.writer(batch)
+                except Exception as e:
+                    # Pipes must still be drained to allow the processes to complete
+                    self.error = e
+            # Output is written before the end of a pipe is announced
+            for done in finished:
+                done.set()
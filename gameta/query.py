@@ -0,0 +1,273 @@
+import json
+import re
+from typing import Callable, Collection, FrozenSet, List, Mapping, Set, Optional, Match, Any
+
+
+__all__ = ['TagQuery', 'ParameterQuery']
+
+
+# Operators of tag queries, tags are quoted as JSON strings or consist of any other non-whitespace characters, a quote
+# that does not start a JSON string is captured to be reported
+TOKENS = re.compile(r'\s*(?:([&|!()])|("(?:[^"\\]|\\.)*")|([^\s&|!()"]+)|("))')
+
+# Predicates of parameter queries
+PREDICATE = re.compile(
+    r'\s*(?P<parameter>[^\s=!()]+)\s*'
+    r'(?:(?P<operator>==|!=)\s*(?P<value>\S.*)|(?P<negated>not\s+)?in\s*\((?P<values>.*)\))\s*$',
+    re.DOTALL
+)
+
+
+Selector = Callable[[Mapping[str, FrozenSet[str]], FrozenSet[str]], FrozenSet[str]]
+
+
+class TagQuery(object):
+    """
+    Boolean query over repository tags, evaluated with set algebra on the tag index. Tags are combined with the
+    operators ! (not), & (and) and | (or) in decreasing order of precedence, and can be grouped with parentheses e.g.
+    'backend & !legacy | infra'. A query consisting of a single tag selects the repositories with that tag. Tags that
+    contain whitespace, operators or quotes are quoted as JSON strings e.g. '"r&d" | "data science"', and a query that
+    is exactly the name of an existing tag selects that tag, as tags could contain operators before tag queries.
+
+    Attributes:
+        expression (str): Query expression
+        tags (FrozenSet[str]): Tags referenced by the query
+        negated (bool): Flag to indicate that the query negates tags, negated tags are evaluated against all
+                        repositories
+        selector (Selector): Compiled query, selects repositories from the tag index and all repositories
+        tokens (List[str]): Operators and tags of the query
+        position (int): Index of the next token to be parsed
+    """
+
+    def __init__(self, expression: str, existing: Collection[str] = ()):
+        self.expression = expression
+        self.tokens: List[str] = [json.dumps(expression)] if expression in existing else self.tokenise(expression)
+        self.position: int = 0
+        self.negated: bool = False
+        tags: Set[str] = set()
+        self.selector: Selector = self.parse_union(tags)
+        if self.position < len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.position]!r} in tag query {expression!r}")
+        self.tags: FrozenSet[str] = frozenset(tags)
+
+    @staticmethod
+    def tokenise(expression: str) -> List[str]:
+        """
+        Splits a query expression into operators and tags, quoted tags retain their quotes
+
+        Args:
+            expression (str): Query expression
+
+        Returns:
+            List[str]: Operators and tags
+
+        Raises:
+            ValueError: If a quote is not terminated
+        """
+        tokens: List[str] = []
+        for operator, quoted, tag, quote in TOKENS.findall(expression):
+            if quote:
+                raise ValueError(f"Unterminated quote in tag query {expression!r}")
+            tokens.append(operator or quoted or tag)
+        return tokens
+
+    def next(self) -> str:
+        """
+        Returns the next token of the query without consuming it
+
+        Returns:
+            str: Next token, empty if all tokens have been consumed
+        """
+        return self.tokens[self.position] if self.position < len(self.tokens) else ''
+
+    def parse_union(self, tags: Set[str]) -> Selector:
+        """
+        Parses terms separated by |
+
+        Args:
+            tags (Set[str]): Tags referenced by the query, updated with the tags parsed
+
+        Returns:
+            Selector: Union of the terms
+        """
+        terms: List[Selector] = [self.parse_intersection(tags)]
+        while self.next() == '|':
+            self.position += 1
+            terms.append(self.parse_intersection(tags))
+        if len(terms) == 1:
+            return terms[0]
+        return lambda index, repositories: frozenset().union(*(term(index, repositories) for term in terms))
+
+    def parse_intersection(self, tags: Set[str]) -> Selector:
+        """
+        Parses factors separated by &
+
+        Args:
+            tags (Set[str]): Tags referenced by the query, updated with the tags parsed
+
+        Returns:
+            Selector: Intersection of the factors
+        """
+        factors: List[Selector] = [self.parse_factor(tags)]
+        while self.next() == '&':
+            self.position += 1
+            factors.append(self.parse_factor(tags))
+        if len(factors) == 1:
+            return factors[0]
+
+        def intersection(index: Mapping[str, FrozenSet[str]], repositories: FrozenSet[str]) -> FrozenSet[str]:
+            selected: FrozenSet[str] = factors[0](index, repositories)
+            for factor in factors[1:]:
+                if not selected:
+                    break
+                selected &= factor(index, repositories)
+            return selected
+        return intersection
+
+    def parse_factor(self, tags: Set[str]) -> Selector:
+        """
+        Parses a tag, a negated factor or a parenthesised query
+
+        Args:
+            tags (Set[str]): Tags referenced by the query, updated with the tags parsed
+
+        Returns:
+            Selector: Repositories selected by the factor
+
+        Raises:
+            ValueError: If the query is malformed
+        """
+        token: str = self.next()
+        self.position += 1
+        if token == '!':
+            self.negated = True
+            factor: Selector = self.parse_factor(tags)
+            return lambda index, repositories: repositories - factor(index, repositories)
+        if token == '(':
+            query: Selector = self.parse_union(tags)
+            if self.next() != ')':
+                raise ValueError(f"Missing ')' in tag query {self.expression!r}")
+            self.position += 1
+            return query
+        if not token:
+            raise ValueError(f"Unexpected end of tag query {self.expression!r}")
+        if token in ('&', '|', ')'):
+            raise ValueError(f"Unexpected {token!r} in tag query {self.expression!r}")
+        tag: str = token
+        if token.startswith('"'):
+            try:
+                tag = json.loads(token)
+            except ValueError:
+                raise ValueError(f"Malformed quoted tag {token} in tag query {self.expression!r}")
+        tags.add(tag)
+        return lambda index, repositories: index.get(tag, frozenset())
+
+    def select(self, index: Mapping[str, FrozenSet[str]], repositories: FrozenSet[str]) -> FrozenSet[str]:
+        """
+        Selects the repositories matching the query
+
+        Args:
+            index (Mapping[str, FrozenSet[str]]): Repositories of each tag
+            repositories (FrozenSet[str]): All repositories, which negated tags are evaluated against, only required if
+                                           the query is negated
+
+        Returns:
+            FrozenSet[str]: Repositories matching the query
+        """
+        return self.selector(index, repositories)
+
+
+class ParameterQuery(object):
+    """
+    Predicate over a repository parameter, evaluated with lookups in the index of the parameter values e.g.
+    'language == python', 'team in (a, b)', 'team != a' or 'team not in (a, b)'. Values are parsed as JSON if possible
+    and as strings otherwise, in the same way as parameter values entered with gameta params add, and are compared with
+    the parameter values stored in the .meta file. Repositories without the parameter never match.
+
+    Attributes:
+        expression (str): Predicate expression
+        parameter (str): Name of the parameter
+        keys (FrozenSet[str]): Index keys of the values compared with
+        negated (bool): Flag to indicate that repositories whose values are not compared with are selected
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        match: Optional[Match] = PREDICATE.match(expression)
+        if match is None:
+            raise ValueError(
+                f"Malformed predicate {expression!r}, expected <parameter> == <value>, <parameter> != <value>, "
+                f"<parameter> in (<value>, ...) or <parameter> not in (<value>, ...)"
+            )
+        self.parameter: str = match.group('parameter')
+        if match.group('operator') is not None:
+            values: List[Any] = [self.parse(match.group('value'))]
+            self.negated: bool = match.group('operator') == '!='
+        else:
+            values = self.parse_values(match.group('values'))
+            self.negated = match.group('negated') is not None
+        self.keys: FrozenSet[str] = frozenset(self.key(value) for value in values)
+
+    @staticmethod
+    def key(value: Any) -> str:
+        """
+        Generates the index key of a parameter value, values are keyed on their JSON representation so that e.g. true
+        and 1 are distinguished
+
+        Args:
+            value (Any): JSON serialisable parameter value
+
+        Returns:
+            str: Index key
+        """
+        return json.dumps(value, sort_keys=True)
+
+    @staticmethod
+    def parse(value: str) -> Any:
+        """
+        Parses a value of a predicate, quoted strings are unquoted
+
+        Args:
+            value (str): Value of the predicate
+
+        Returns:
+            Any: Parsed value
+        """
+        value = value.strip()
+        if len(value) > 1 and value[0] == value[-1] == "'":
+            return value[1:-1]
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+
+    @classmethod
+    def parse_values(cls, values: str) -> List[Any]:
+        """
+        Parses the comma-separated values of a membership predicate
+
+        Args:
+            values (str): Values of the predicate, without the parentheses
+
+        Returns:
+            List[Any]: Parsed values
+        """
+        try:
+            return json.loads(f'[{values}]')
+        except ValueError:
+            return [cls.parse(value) for value in values.split(',') if value.strip()]
+
+    def select(self, index: Mapping[str, FrozenSet[str]]) -> FrozenSet[str]:
+        """
+        Selects the repositories matching the predicate
+
+        Args:
+            index (Mapping[str, FrozenSet[str]]): Repositories with each value of the parameter, keyed on the index
+                                                  keys of the values
+
+        Returns:
+            FrozenSet[str]: Repositories matching the predicate
+        """
+        if self.negated:
+            return frozenset().union(*(repos for key, repos in index.items() if key not in self.keys))
+        return frozenset().union(*(index.get(key, frozenset()) for key in self.keys))
@@ -1,7 +1,7 @@
 from copy import deepcopy
 from os.path import join, normpath, exists
 from shutil import rmtree, copytree
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple, FrozenSet
 
 import click
 from git import Repo, GitError
@@ -142,6 +142,11 @@ def delete(context: GametaContext, name: str, clear: bool) -> None:
 
         context.remove_gitignore(context.repositories[name]["path"])
         del context.repositories[name]
+
+        # Remove dependencies on the deleted repository
+        for details in context.repositories.values():
+            if name in details.get('depends_on', []):
+                details['depends_on'].remove(name)
         context.export()
         click.echo(f"Repository {name} successfully deleted")
     except click.ClickException:
@@ -204,6 +209,14 @@ def update(
 
         if new_name is not None:
             del context.repositories[name]
+
+            # Point dependencies on the repository to its new name
+            for details in context.repositories.values():
+                if name in details.get('depends_on', []):
+                    details['depends_on'] = [new_name if d == name else d for d in details['depends_on']]
+            # Renamed repositories remain in their shard of the .meta file
+            if name in context.owners:
+                context.owners[new_name] = context.owners.pop(name)
             name = new_name
 
         # Perform a physical sync with the updated details
@@ -238,23 +251,32 @@ def update(
 
 
 @repo_cli.command()
+@click.option('--where', '-w', type=str, multiple=True, default=(),
+              help="Only list repositories whose parameters match e.g. 'team in (a, b)'")
 @gameta_context
-def ls(context: GametaContext) -> None:
+def ls(context: GametaContext, where: Tuple[str]) -> None:
     """
-    Lists all the repositories added in the .meta file
+    Lists all the repositories added in the .meta file, or the repositories whose parameters match all predicates
     \f
     Args:
         context (GametaContext): Gameta Context
+        where (Tuple[str]): Parameter predicates that the repositories listed must all match
 
     Returns:
         None
 
     Examples:
         $ gameta repo ls
+        $ gameta repo ls -w "language == python" -w "team in (a, b)"
 
     Raises:
         click.ClickException: If errors occur during processing
     """
+    try:
+        matched: Optional[FrozenSet[str]] = context.where(where) if where else None
+    except ValueError as e:
+        raise click.ClickException(str(e))
     click.echo(f"Listing repositories managed in metarepo {context.project_dir}")
     for repo in context.repositories:
-        click.echo(f"{repo}")
+        if matched is None or repo in matched:
+            click.echo(f"{repo}")
@@ -0,0 +1,177 @@
+import os
+from contextlib import closing
+from os.path import exists
+
+import click
+
+from .cli import gameta_cli
+from .context import gameta_context, GametaContext, Meta, Database, DATABASE_FILE, JOURNAL_FILE
+
+
+__all__ = ['store_cli']
+
+
+@gameta_cli.group('store')
+@gameta_context
+def store_cli(context: GametaContext) -> None:
+    """
+    CLI for storing the .meta file of large metarepos in a SQLite database or with a journal
+    \f
+    Args:
+        context (GametaContext): Gameta Context
+
+    Returns:
+        None
+
+    Raises:
+        click.ClickException: If we are not currently operating in a metarepo directory
+    """
+    if not context.is_metarepo:
+        raise click.ClickException(f"{context.project_dir} is not a metarepo, initialise it with 'gameta init'")
+
+
+@store_cli.command('import')
+@gameta_context
+def import_meta(context: GametaContext) -> None:
+    """
+    Imports the .meta file into a SQLite database, which is used instead of the .meta file from then on. Importing
+    again replaces the contents of the database.
+    \f
+    Args:
+        context (GametaContext): Gameta Context
+
+    Returns:
+        None
+
+    Examples:
+        $ gameta store import
+
+    Raises:
+        click.ClickException: If errors occur during processing
+    """
+    meta: Meta = Meta(context)
+    database: Database = Database(context)
+    click.echo(f"Importing {meta.file_name} file into {database.file_name} database")
+    if not exists(meta.file):
+        raise click.ClickException(f"{meta.file_name} file does not exist, export it with 'gameta store export'")
+    meta.load()
+    if not meta.valid:
+        raise click.ClickException(f"{meta.file_name} file could not be imported, correct the errors above first")
+
+    # The database is written to a temporary file first so that it is replaced atomically
+    temp: Database = Database(context, f'{DATABASE_FILE}.{os.getpid()}.tmp')
+    try:
+        # Shards of the .meta file are merged into the database
+        temp.update()
+        with closing(temp.connect(create=True)) as connection:
+            temp.store(connection)
+        os.replace(temp.file, database.file)
+        click.echo(f"Successfully imported {len(context.repositories)} repositories into {database.file_name} database")
+    except Exception as e:
+        if exists(temp.file):
+            os.remove(temp.file)
+        raise click.ClickException(f"{e.__class__.__name__}.{str(e)}")
+
+
+@store_cli.command('export')
+@gameta_context
+def export_meta(context: GametaContext) -> None:
+    """
+    Exports the SQLite database to the .meta file, the database is still used until it is deleted
+    \f
+    Args:
+        context (GametaContext): Gameta Context
+
+    Returns:
+        None
+
+    Examples:
+        $ gameta store export
+
+    Raises:
+        click.ClickException: If errors occur during processing
+    """
+    meta: Meta = Meta(context)
+    click.echo(f"Exporting {DATABASE_FILE} database to {meta.file_name} file")
+    if not isinstance(context.files['meta'], Database):
+        raise click.ClickException(f"{DATABASE_FILE} database does not exist, import it with 'gameta store import'")
+    try:
+        # The database loads its repositories and removes the include element, which it has merged the shards of
+        context.files['meta'].update()
+        meta.write()
+        click.echo(f"Successfully exported {len(context.repositories)} repositories to {meta.file_name} file")
+    except Exception as e:
+        raise click.ClickException(f"{e.__class__.__name__}.{str(e)}")
+
+
+@store_cli.command('journal')
+@gameta_context
+def enable_journal(context: GametaContext) -> None:
+    """
+    Enables the journal of the .meta file, changes are appended to the .meta.journal file instead of rewriting the
+    .meta file, and the journal is compacted into the .meta file once it grows larger than it
+    \f
+    Args:
+        context (GametaContext): Gameta Context
+
+    Returns:
+        None
+
+    Examples:
+        $ gameta store journal
+
+    Raises:
+        click.ClickException: If errors occur during processing
+    """
+    meta: Meta = Meta(context)
+    click.echo(f"Enabling {JOURNAL_FILE} journal of {meta.file_name} file")
+    if isinstance(context.files['meta'], Database):
+        raise click.ClickException(
+            f"{meta.file_name} file is stored in {DATABASE_FILE} database, which only writes the repositories that "
+            f"changed"
+        )
+    if exists(meta.journal.file):
+        click.echo(f"{JOURNAL_FILE} journal is already enabled, ignoring")
+        return
+    try:
+        with open(meta.journal.file, 'w'):
+            pass
+        click.echo(f"Successfully enabled {JOURNAL_FILE} journal")
+    except Exception as e:
+        raise click.ClickException(f"{e.__class__.__name__}.{str(e)}")
+
+
+@store_cli.command('compact')
+@gameta_context
+def compact_journal(context: GametaContext) -> None:
+    """
+    Compacts the journal of the .meta file into the .meta file e.g. before committing it, the journal remains enabled
+    until the .meta.journal file is deleted
+    \f
+    Args:
+        context (GametaContext): Gameta Context
+
+    Returns:
+        None
+
+    Examples:
+        $ gameta store compact
+
+    Raises:
+        click.ClickException: If errors occur during processing
+    """
+    meta: Meta = context.files['meta']
+    click.echo(f"Compacting {JOURNAL_FILE} journal into {meta.file_name} file")
+    if meta.journal is None or not exists(meta.journal.file):
+        raise click.ClickException(f"{JOURNAL_FILE} journal is not enabled, enable it with 'gameta store journal'")
+    if not meta.valid:
+        raise click.ClickException(
+            f"{JOURNAL_FILE} journal could not be compacted, correct the errors above first or delete it"
+        )
+    try:
+        meta.update()
+        meta.write()
+        meta.record()
+        click.echo(f"Successfully compacted {JOURNAL_FILE} journal into {meta.file_name} file")
+    except Exception as e:
+        raise click.ClickException(f"{e.__class__.__name__}.{str(e)}")
@@ -1,4 +1,4 @@
-from typing import List, Dict, Tuple
+from typing import List, Tuple
 
 import click
 
@@ -51,12 +51,11 @@ def add(context: GametaContext, name: str, tags: List[str]) -> None:
         click.ClickException: If errors occur during processing
     """
     click.echo(f"Adding tags {list(tags)} to {name}")
-    if name not in context.repositories:
+    if name not in context.names():
         raise click.ClickException(f"Repository {name} does not exist in .meta file")
 
     try:
-        repo_details: Dict = context.repositories[name]
-        repo_details['tags'] = sorted(list(set(repo_details.get('tags', [])) | set(tags)))
+        context.add_tags(name, list(tags))
         context.export()
         click.echo(f"Successfully added tags to repository {name}")
     except Exception as e:
@@ -86,7 +85,7 @@ def delete(context: GametaContext, name: str, tags: Tuple[str]) -> None:
         click.ClickException: If errors occur during processing
     """
     click.echo(f"Deleting tags {list(tags)} from {name}")
-    if name not in context.repositories:
+    if name not in context.names():
         raise click.ClickException(f"Repository {name} does not exist in .meta file")
 
     tags: List[str] = list(tags)
@@ -95,8 +94,7 @@ def delete(context: GametaContext, name: str, tags: Tuple[str]) -> None:
         tags.remove('metarepo')
 
     try:
-        repo_details: Dict = context.repositories[name]
-        repo_details['tags'] = sorted(list(set(repo_details.get('tags', [])) - set(tags)))
+        context.delete_tags(name, tags)
         context.export()
         click.echo(f"Successfully deleted tags from repository {name}")
     except Exception as e:
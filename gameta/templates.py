@@ -0,0 +1,72 @@
+from string import Formatter
+from typing import FrozenSet, Set, Mapping, Any, Optional
+
+
+__all__ = ['Template']
+
+
+class Template(object):
+    """
+    Command template parsed once and rendered for many repositories, rendering only looks up the parameters that are
+    referenced by its placeholders. Templates are rendered in the same way as with str.format, so literal braces are
+    escaped by doubling them.
+
+    Attributes:
+        source (str): Template string
+        fields (FrozenSet[str]): Names of the parameters referenced by the placeholders, including placeholders nested
+                                 in format specifications
+        static (Optional[str]): Rendered template if it has no placeholders, None otherwise
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.fields: FrozenSet[str] = frozenset(self.parse(source))
+        self.static: Optional[str] = None
+        if not self.fields:
+            # Resolves escaped braces and raises the same errors for invalid templates as rendering would
+            self.static = source.format()
+
+    @classmethod
+    def parse(cls, source: str) -> Set[str]:
+        """
+        Extracts the names of the parameters referenced by a template string
+
+        Args:
+            source (str): Template string
+
+        Returns:
+            Set[str]: Names of the parameters, attribute and index lookups are resolved on the parameter with the name
+
+        Raises:
+            ValueError: If the template string is malformed
+        """
+        fields: Set[str] = set()
+        for _, field_name, format_spec, _ in Formatter().parse(source):
+            if field_name is None:
+                continue
+            # e.g. {repo.name} and {repos[0]} reference the parameters repo and repos
+            fields.add(field_name.split('.', 1)[0].split('[', 1)[0])
+            if format_spec:
+                fields.update(cls.parse(format_spec))
+        return fields
+
+    def render(self, parameters: Mapping[str, Any]) -> str:
+        """
+        Renders the template with the parameters referenced by it
+
+        Args:
+            parameters (Mapping[str, Any]): Parameters available to the template
+
+        Returns:
+            str: Rendered template
+
+        Raises:
+            KeyError: If a parameter referenced by the template is missing
+            IndexError: If the template has positional placeholders
+        """
+        if self.static is not None:
+            return self.static
+        # Positional placeholders are left to str.format to reject
+        return self.source.format(
+            **{field: parameters[field] for field in self.fields if field and not field.isdigit()}
+        )
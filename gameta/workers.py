@@ -0,0 +1,214 @@
+import builtins
+import multiprocessing
+import os
+import resource
+import sys
+import traceback
+from functools import lru_cache
+from multiprocessing import reduction
+from multiprocessing.connection import Connection
+from types import CodeType
+from typing import List, Dict, Tuple, Optional, Sequence, Any
+
+
+__all__ = ['PythonWorker']
+
+
+@lru_cache(maxsize=256)
+def compile_script(script: str) -> CodeType:
+    """
+    Compiles a Python script, each distinct script is only compiled once by a worker
+
+    Args:
+        script (str): Python script
+
+    Returns:
+        CodeType: Compiled script
+    """
+    return compile(script, '<string>', 'exec')
+
+
+def exit_code(code: Any) -> int:
+    """
+    Converts the code of a SystemExit into a return code in the same way as the Python interpreter
+
+    Args:
+        code (Any): Code of the SystemExit
+
+    Returns:
+        int: Return code
+    """
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def execute(scripts: List[str], parameters: Dict[str, Any]) -> int:
+    """
+    Executes Python scripts in sequence as the __main__ module, with the parameters specified as globals. Execution
+    stops at the first script that fails.
+
+    Args:
+        scripts (List[str]): Python scripts
+        parameters (Dict[str, Any]): Globals of each script
+
+    Returns:
+        int: Return code of the last script executed
+    """
+    for script in scripts:
+        namespace: Dict[str, Any] = {'__name__': '__main__', '__builtins__': builtins, **parameters}
+        try:
+            exec(compile_script(script), namespace)
+            return_code: int = 0
+        except SystemExit as e:
+            return_code = exit_code(e.code)
+        except BaseException as e:
+            # The frame of this function is left out as with python -c
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            return_code = 1
+        if return_code:
+            return return_code
+    return 0
+
+
+def serve(connection: Connection, isolated: bool) -> None:
+    """
+    Main loop of a worker, announces that it is ready and then executes tasks received from the connection until it is
+    closed. Each task is executed in the directory specified, with its output redirected to the file descriptor
+    received after it, if any.
+
+    Args:
+        connection (Connection): Connection to the Engine
+        isolated (bool): Flag to indicate that the worker should start its own process group
+
+    Returns:
+        None
+    """
+    if isolated:
+        os.setsid()
+    # Scripts are executed as with python -c
+    sys.argv = ['-c']
+    sys.path.insert(0, '')
+    connection.send(os.getpid())
+    while True:
+        try:
+            scripts, cwd, parameters, captured = connection.recv()
+        except EOFError:
+            return
+        output: Optional[int] = reduction.recv_handle(connection) if captured else None
+        before: Tuple[resource.struct_rusage, ...] = (
+            resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+        )
+        saved: List[int] = []
+        try:
+            if output is not None:
+                saved = [os.dup(1), os.dup(2)]
+                os.dup2(output, 1)
+                os.dup2(output, 2)
+                os.close(output)
+            os.chdir(cwd)
+            return_code: int = execute(scripts, parameters)
+        except OSError:
+            traceback.print_exc()
+            return_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            # Restoring the original descriptors closes the output, which signals its end to the Engine
+            for fd, original in zip([1, 2], saved):
+                os.dup2(original, fd)
+                os.close(original)
+        after: Tuple[resource.struct_rusage, ...] = (
+            resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+        )
+        peak: int = max(a.ru_maxrss for a in after)
+        connection.send(
+            (
+                return_code,
+                sum(a.ru_utime - b.ru_utime for a, b in zip(after, before)),
+                sum(a.ru_stime - b.ru_stime for a, b in zip(after, before)),
+                # The peak of the worker covers all the scripts it executed, it only belongs to these scripts if it
+                # was raised by them
+                peak if peak > max(b.ru_maxrss for b in before) else None
+            )
+        )
+
+
+class PythonWorker(object):
+    """
+    Long-lived Python interpreter that executes Python scripts sent to it, workers are forked from a forkserver that
+    has imported the preloaded modules so that neither the interpreter nor these modules are initialised per script
+
+    Attributes:
+        connection (Connection): Connection to the worker
+        process (multiprocessing.Process): Worker process, started in its own process group if it is isolated
+    """
+
+    def __init__(self, preload: Sequence[str] = (), isolated: bool = False):
+        context = multiprocessing.get_context('forkserver')
+        # Only effective until the forkserver has been started
+        context.set_forkserver_preload([__name__] + list(preload))
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=serve, args=(child, isolated), daemon=True)
+        self.process.start()
+        child.close()
+        # The worker can only be terminated with its process group once it has started it
+        self.connection.recv()
+
+    @property
+    def alive(self) -> bool:
+        """
+        Returns a flag indicating if the worker is able to execute further scripts
+
+        Returns:
+            bool: Flag to indicate if the worker is alive
+        """
+        return self.process.is_alive()
+
+    def submit(self, scripts: List[str], cwd: str, parameters: Dict[str, Any], output: Optional[int] = None) -> None:
+        """
+        Sends Python scripts to the worker to be executed
+
+        Args:
+            scripts (List[str]): Python scripts, executed in sequence until one fails
+            cwd (str): Absolute path of the directory the scripts are executed in
+            parameters (Dict[str, Any]): Globals of each script, must be picklable
+            output (Optional[int]): File descriptor that the output of the scripts is written to, inherited from the
+                                    worker otherwise. The descriptor is duplicated to the worker and can be closed.
+
+        Returns:
+            None
+        """
+        self.connection.send((scripts, cwd, parameters, output is not None))
+        if output is not None:
+            reduction.send_handle(self.connection, output, self.process.pid)
+
+    def wait(self) -> Tuple[int, Optional[float], Optional[float], Optional[int]]:
+        """
+        Waits for the scripts sent to the worker to complete
+
+        Returns:
+            Tuple[int, Optional[float], Optional[float], Optional[int]]: Return code, user and system CPU time and
+                                                                        maximum resident set size of the worker if
+                                                                        the scripts raised it, resource usage is None
+                                                                        if the worker died
+        """
+        try:
+            return self.connection.recv()
+        except (EOFError, OSError):
+            # The worker was terminated e.g. when it was cancelled
+            self.process.join()
+            return self.process.exitcode, None, None, None
+
+    def close(self) -> None:
+        """
+        Terminates the worker after it has completed its current scripts
+
+        Returns:
+            None
+        """
+        self.connection.close()
+        self.process.join()
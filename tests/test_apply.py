@@ -1,6 +1,6 @@
 import json
 import zipfile
-from os import listdir
+from os import listdir, makedirs
 from os.path import join, dirname, exists
 from tempfile import mkdtemp
 from shutil import copyfile, copytree, rmtree
@@ -98,7 +98,7 @@ class TestApply(TestCase):
             context.env_vars['$TMP'] = tempdir
             mock_ensure_object.return_value = context
 
-            output = [c for repo, c in context.apply(list(params['commands']), shell=True)]
+            output = [c for repo, c, cwd in context.apply(list(params['commands']), shell=True)]
             result = self.runner.invoke(
                 self.apply,
                 [
@@ -555,3 +555,528 @@ class TestApply(TestCase):
             result = self.runner.invoke(self.apply, ['--command', params['commands'][0], '-v'])
             self.assertEqual(result.exit_code, 0)
             self.assertTrue(len(result.output.split('\n')) >= 18)
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_command_concurrently(self, mock_ensure_object):
+        params = {
+            'commands': ['mkdir test_dir'],
+            'actual_repositories': ['gameta', 'genisys', 'genisys-testing']
+        }
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'core', 'genisys'))
+            makedirs(join(f, 'core', 'genisys-testing'))
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True},
+                            'genisys': {'url': None, 'path': 'core/genisys', '__metarepo__': False},
+                            'genisys-testing': {'url': None, 'path': 'core/genisys-testing', '__metarepo__': False}
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.apply, ['--command', params['commands'][0], '-j', '3'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertCountEqual(
+                result.output.splitlines(),
+                [
+                    f"Applying {params['commands']} to repos {params['actual_repositories']}",
+                    f"Executing mkdir test_dir in {params['actual_repositories'][0]}",
+                    f"Executing mkdir test_dir in {params['actual_repositories'][1]}",
+                    f"Executing mkdir test_dir in {params['actual_repositories'][2]}",
+                    "Execution summary:",
+                    f"\t{params['actual_repositories'][0]}: succeeded",
+                    f"\t{params['actual_repositories'][1]}: succeeded",
+                    f"\t{params['actual_repositories'][2]}: succeeded",
+                ]
+            )
+            for path in [f, join(f, 'core', 'genisys'), join(f, 'core', 'genisys-testing')]:
+                self.assertTrue(exists(join(path, 'test_dir')))
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_command_concurrently_verbose_with_errors(self, mock_ensure_object):
+        params = {
+            'commands': ['rm test'],
+            'actual_repositories': ['gameta', 'genisys', 'genisys-testing']
+        }
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'core', 'genisys'))
+            makedirs(join(f, 'core', 'genisys-testing'))
+            with open(join(f, 'core', 'genisys', 'test'), 'w') as t:
+                t.write('test')
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True},
+                            'genisys': {'url': None, 'path': 'core/genisys', '__metarepo__': False},
+                            'genisys-testing': {'url': None, 'path': 'core/genisys-testing', '__metarepo__': False}
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.apply, ['--command', params['commands'][0], '-j', '2', '-v'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertTrue(
+                "[gameta] rm: cannot remove 'test': No such file or directory\n" in result.output
+            )
+            self.assertTrue(
+                result.output.endswith(
+                    "Execution summary:\n"
+                    "\tgameta: failed with return code 1\n"
+                    "\tgenisys: succeeded\n"
+                    "\tgenisys-testing: failed with return code 1\n"
+                )
+            )
+            self.assertFalse(exists(join(f, 'core', 'genisys', 'test')))
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_command_concurrently_with_errors_raised(self, mock_ensure_object):
+        params = {
+            'commands': ['test -f fail && exit 4; sleep 30'],
+            'actual_repositories': ['gameta', 'genisys', 'genisys-testing']
+        }
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'core', 'genisys'))
+            makedirs(join(f, 'core', 'genisys-testing'))
+            with open(join(f, 'fail'), 'w') as t:
+                t.write('fail')
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True},
+                            'genisys': {'url': None, 'path': 'core/genisys', '__metarepo__': False},
+                            'genisys-testing': {'url': None, 'path': 'core/genisys-testing', '__metarepo__': False}
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.apply, ['--command', params['commands'][0], '-s', '-j', '2', '-e'])
+            self.assertEqual(result.exit_code, 4)
+            self.assertTrue(
+                f"Terminated {SHELL} -c {params['commands'][0]} in genisys as execution was stopped\n" in result.output
+            )
+            self.assertTrue(
+                "Execution summary:\n"
+                "\tgameta: failed with return code 4\n"
+                "\tgenisys: cancelled with return code -15\n"
+                "\tgenisys-testing: skipped\n"
+                "Error: CalledProcessError" in result.output
+            )
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_command_with_resource_usage_report(self, mock_ensure_object):
+        params = {
+            'commands': ['mkdir test_dir'],
+            'actual_repositories': ['gameta', 'genisys', 'genisys-testing']
+        }
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'core', 'genisys'))
+            makedirs(join(f, 'core', 'genisys-testing'))
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True},
+                            'genisys': {'url': None, 'path': 'core/genisys', '__metarepo__': False},
+                            'genisys-testing': {'url': None, 'path': 'core/genisys-testing', '__metarepo__': False}
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(
+                self.apply,
+                ['--command', params['commands'][0], '-r', 'genisys', '-r', 'genisys-testing', '--profile', '1',
+                 '--report', join(f, 'report.json')]
+            )
+            self.assertEqual(result.exit_code, 0)
+            lines = result.output.splitlines()
+            self.assertEqual(lines[-4], "Resource usage of the 1 repositories with the longest wall times:")
+            self.assertEqual(lines[-3].split(), ['Repository', 'Wall', '(s)', 'User', '(s)', 'System', '(s)', 'Max',
+                                                 'RSS', '(MiB)'])
+            self.assertTrue(lines[-2].split()[0] in params['actual_repositories'][1:])
+            self.assertEqual(lines[-1], f"Resource usage report written to {join(f, 'report.json')}")
+            with open(join(f, 'report.json')) as r:
+                report = json.load(r)
+            self.assertEqual(report['commands'], params['commands'])
+            self.assertEqual([r['repo'] for r in report['results']], params['actual_repositories'][1:])
+            for repo in report['results']:
+                self.assertEqual(repo['status'], 'succeeded')
+                self.assertEqual(repo['return_code'], 0)
+                self.assertEqual(repo['command'], ['mkdir', 'test_dir'])
+                self.assertGreater(repo['wall_time'], 0)
+                # mkdir does not exceed the peak it inherited from the test process
+                self.assertIsNone(repo['max_rss'])
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_command_with_jsonl_output(self, mock_ensure_object):
+        params = {
+            'commands': ['echo hello'],
+            'actual_repositories': ['gameta', 'genisys', 'genisys-testing']
+        }
+        runner = CliRunner(mix_stderr=False)
+        with runner.isolated_filesystem() as f:
+            makedirs(join(f, 'core', 'genisys'))
+            makedirs(join(f, 'core', 'genisys-testing'))
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True},
+                            'genisys': {'url': None, 'path': 'core/genisys', '__metarepo__': False},
+                            'genisys-testing': {'url': None, 'path': 'core/genisys-testing', '__metarepo__': False}
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = runner.invoke(
+                self.apply,
+                ['--command', params['commands'][0], '-r', 'gameta', '-r', 'genisys-testing', '-j', '2',
+                 '--output', 'jsonl']
+            )
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.stderr, f"Applying {params['commands']} to repos ['gameta', 'genisys-testing']\n"
+            )
+            events = [json.loads(line) for line in result.stdout.splitlines()]
+            self.assertCountEqual(
+                [(e['event'], e['repo']) for e in events],
+                [
+                    ('start', 'gameta'), ('output', 'gameta'), ('finish', 'gameta'),
+                    ('start', 'genisys-testing'), ('output', 'genisys-testing'), ('finish', 'genisys-testing')
+                ]
+            )
+            for event in events:
+                if event['event'] == 'output':
+                    self.assertEqual(event['data'], 'hello')
+                elif event['event'] == 'finish':
+                    self.assertEqual(event['status'], 'succeeded')
+                    self.assertEqual(event['return_code'], 0)
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_command_with_asyncio_engine(self, mock_ensure_object):
+        params = {
+            'commands': ['echo hello'],
+            'actual_repositories': ['gameta', 'genisys', 'genisys-testing']
+        }
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'core', 'genisys'))
+            makedirs(join(f, 'core', 'genisys-testing'))
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True},
+                            'genisys': {'url': None, 'path': 'core/genisys', '__metarepo__': False},
+                            'genisys-testing': {'url': None, 'path': 'core/genisys-testing', '__metarepo__': False}
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(
+                self.apply, ['--command', params['commands'][0], '-j', '3', '--engine', 'asyncio', '-v']
+            )
+            self.assertEqual(result.exit_code, 0)
+            self.assertCountEqual(
+                result.output.splitlines(),
+                [
+                    f"Applying {params['commands']} to repos {params['actual_repositories']}",
+                    f"Executing echo hello in {params['actual_repositories'][0]}",
+                    f"Executing echo hello in {params['actual_repositories'][1]}",
+                    f"Executing echo hello in {params['actual_repositories'][2]}",
+                    f"[{params['actual_repositories'][0]}] hello",
+                    f"[{params['actual_repositories'][1]}] hello",
+                    f"[{params['actual_repositories'][2]}] hello",
+                    "Execution summary:",
+                    f"\t{params['actual_repositories'][0]}: succeeded",
+                    f"\t{params['actual_repositories'][1]}: succeeded",
+                    f"\t{params['actual_repositories'][2]}: succeeded",
+                ]
+            )
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_shell_command_with_shell_pool_engine(self, mock_ensure_object):
+        params = {
+            'commands': ['echo hello', 'pwd'],
+            'actual_repositories': ['gameta', 'genisys', 'genisys-testing']
+        }
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'core', 'genisys'))
+            makedirs(join(f, 'core', 'genisys-testing'))
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True},
+                            'genisys': {'url': None, 'path': 'core/genisys', '__metarepo__': False},
+                            'genisys-testing': {'url': None, 'path': 'core/genisys-testing', '__metarepo__': False}
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(
+                self.apply,
+                ['-c', params['commands'][0], '-c', params['commands'][1], '-s', '-j', '2', '--engine', 'shell-pool']
+            )
+            self.assertEqual(result.exit_code, 0)
+            self.assertCountEqual(
+                result.output.splitlines(),
+                [
+                    "Multiple commands detected, executing in a separate shell",
+                    f"Applying {params['commands']} to repos {params['actual_repositories']} in a separate shell",
+                    f"Executing {SHELL} -c echo hello && pwd in {params['actual_repositories'][0]}",
+                    f"Executing {SHELL} -c echo hello && pwd in {params['actual_repositories'][1]}",
+                    f"Executing {SHELL} -c echo hello && pwd in {params['actual_repositories'][2]}",
+                    f"[{params['actual_repositories'][0]}] hello",
+                    f"[{params['actual_repositories'][1]}] hello",
+                    f"[{params['actual_repositories'][2]}] hello",
+                    f"[{params['actual_repositories'][0]}] {f}",
+                    f"[{params['actual_repositories'][1]}] {join(f, 'core', 'genisys')}",
+                    f"[{params['actual_repositories'][2]}] {join(f, 'core', 'genisys-testing')}",
+                    "Execution summary:",
+                    f"\t{params['actual_repositories'][0]}: succeeded",
+                    f"\t{params['actual_repositories'][1]}: succeeded",
+                    f"\t{params['actual_repositories'][2]}: succeeded",
+                ]
+            )
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_command_with_output_logged(self, mock_ensure_object):
+        params = {
+            'commands': ['echo hello && test -f missing'],
+            'actual_repositories': ['gameta', 'genisys', 'genisys-testing']
+        }
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'core', 'genisys'))
+            makedirs(join(f, 'core', 'genisys-testing'))
+            with open(join(f, 'core', 'genisys', 'missing'), 'w') as m:
+                m.write('')
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True},
+                            'genisys': {'url': None, 'path': 'core/genisys', '__metarepo__': False},
+                            'genisys-testing': {'url': None, 'path': 'core/genisys-testing', '__metarepo__': False}
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(
+                self.apply,
+                ['-c', params['commands'][0], '-s', '-r', 'genisys', '-r', 'genisys-testing', '-j', '2',
+                 '--log-dir', join(f, 'logs')]
+            )
+            self.assertEqual(result.exit_code, 0)
+            self.assertFalse('[genisys] hello' in result.output)
+            self.assertTrue(
+                f"Last output of genisys-testing, full output in {join(f, 'logs', 'genisys-testing.log')}:\nhello\n"
+                in result.output
+            )
+            self.assertFalse('Last output of genisys,' in result.output)
+            for repo in params['actual_repositories'][1:]:
+                with open(join(f, 'logs', f'{repo}.log')) as log:
+                    self.assertEqual(log.read(), 'hello\n')
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_python_command_with_python_pool_engine(self, mock_ensure_object):
+        params = {
+            'commands': ['from os import getcwd\nprint(getcwd(), "{name}" == name, sorted({__repos__}))'],
+            'actual_repositories': ['gameta', 'genisys', 'genisys-testing']
+        }
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'core', 'genisys'))
+            makedirs(join(f, 'core', 'genisys-testing'))
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {
+                                'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True, 'name': 'g'
+                            },
+                            'genisys': {'url': None, 'path': 'core/genisys', '__metarepo__': False, 'name': 'a'},
+                            'genisys-testing': {
+                                'url': None, 'path': 'core/genisys-testing', '__metarepo__': False, 'name': 'b'
+                            }
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(
+                self.apply,
+                ['-c', params['commands'][0], '-p', '-v', '-j', '2', '--engine', 'python-pool', '--preload', 'json']
+            )
+            self.assertEqual(result.exit_code, 0)
+            lines = result.output.splitlines()
+            self.assertEqual(
+                lines[0],
+                f"Applying Python commands {params['commands']} to repos {params['actual_repositories']} in a "
+                f"separate shell"
+            )
+            for repo, path in zip(params['actual_repositories'], [f, join(f, 'core', 'genisys'),
+                                                                   join(f, 'core', 'genisys-testing')]):
+                self.assertTrue(f"[{repo}] {path} True {sorted(params['actual_repositories'])}" in lines)
+                self.assertTrue(f"\t{repo}: succeeded" in lines)
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_modules_preloaded_without_python_pool_engine(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump({'projects': {'gameta': {'url': None, 'path': '.', '__metarepo__': True}}}, m)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.apply, ['-c', 'print(1)', '-p', '--preload', 'json'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertEqual(
+                result.output.splitlines()[-1], "Error: Modules can only be preloaded by the python-pool engine"
+            )
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_missing_command_with_asyncio_engine(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'a'))
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', '__metarepo__': True},
+                            'a': {'url': None, 'path': 'a', '__metarepo__': False}
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.apply, ['-c', 'nonexistentcmd', '-j', '2', '--engine', 'asyncio'])
+            self.assertEqual(result.exit_code, 0)
+            lines = result.output.splitlines()
+            for repo in ['gameta', 'a']:
+                self.assertTrue(
+                    f"[{repo}] FileNotFoundError.[Errno 2] No such file or directory: 'nonexistentcmd'" in lines
+                )
+                self.assertTrue(f"\t{repo}: failed with return code 127" in lines)
+
+            result = self.runner.invoke(self.apply, ['-c', 'nonexistentcmd', '-j', '2', '--engine', 'asyncio', '-e'])
+            self.assertEqual(result.exit_code, 127)
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_command_to_tag_query(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            projects = {'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True}}
+            for repo, tags in [('a', ['backend']), ('b', ['backend', 'legacy']), ('c', ['infra']), ('d', [])]:
+                makedirs(join(f, repo))
+                projects[repo] = {'url': None, 'path': repo, 'tags': tags, '__metarepo__': False}
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump({'projects': projects}, m)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.apply, ['-c', 'true', '-t', 'backend & !legacy | infra', '-r', 'd'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.output,
+                "Applying ['true'] to repos ['a', 'c', 'd']\n"
+                "Executing true in a\n"
+                "Executing true in c\n"
+                "Executing true in d\n"
+            )
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_command_to_tags_with_operator_characters(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            projects = {'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True}}
+            for repo, tags in [('a', ['r&d']), ('b', ['r', 'd']), ('c', ['data science']), ('d', [])]:
+                makedirs(join(f, repo))
+                projects[repo] = {'url': None, 'path': repo, 'tags': tags, '__metarepo__': False}
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump({'projects': projects}, m)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            for tags, output in [
+                (['-t', 'r&d'], "Applying ['true'] to repos ['a']\nExecuting true in a\n"),
+                (
+                    ['-t', '"r&d" | "data science"'],
+                    "Applying ['true'] to repos ['a', 'c']\nExecuting true in a\nExecuting true in c\n"
+                ),
+                (['-t', 'r & d'], "Applying ['true'] to repos ['b']\nExecuting true in b\n")
+            ]:
+                with self.subTest(tags=tags):
+                    result = self.runner.invoke(self.apply, ['-c', 'true'] + tags)
+                    self.assertEqual(result.exit_code, 0)
+                    self.assertEqual(result.output, output)
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_command_to_malformed_tag_query(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump({'projects': {'gameta': {'url': None, 'path': '.', '__metarepo__': True}}}, m)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.apply, ['-c', 'true', '-t', 'backend & (infra'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertEqual(result.output, "Error: Missing ')' in tag query 'backend & (infra'\n")
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_command_to_repositories_matching_parameter_predicates(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            projects = {'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True}}
+            for repo, tags, team in [('a', ['backend'], 'x'), ('b', ['backend'], 'y'), ('c', [], 'x')]:
+                makedirs(join(f, repo))
+                projects[repo] = {'url': None, 'path': repo, 'tags': tags, '__metarepo__': False, 'team': team}
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump({'projects': projects}, m)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            for args, output in [
+                (['-w', 'team == x'], "Applying ['true'] to repos ['a', 'c']\nExecuting true in a\nExecuting true in c\n"),
+                (['-w', 'team in (x, y)', '-t', 'backend'], "Applying ['true'] to repos ['a', 'b']\n"
+                                                           "Executing true in a\nExecuting true in b\n"),
+                (['-w', 'team == x', '-r', 'b'], "No repositories match ['team == x']\n")
+            ]:
+                with self.subTest(args=args):
+                    result = self.runner.invoke(self.apply, ['-c', 'true', *args])
+                    self.assertEqual(result.exit_code, 0)
+                    self.assertEqual(result.output, output)
+
+            result = self.runner.invoke(self.apply, ['-c', 'true', '-w', 'team = x'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertTrue(result.output.startswith("Error: Malformed predicate 'team = x'"))
@@ -0,0 +1,235 @@
+import json
+import time
+from os import makedirs
+from os.path import join, exists
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from git import Repo
+
+from gameta.apply import apply
+from gameta.cache import ResultCache, CACHE_FILE, clear
+from gameta.context import GametaContext
+from gameta.engines import Job
+
+
+def create_repo(path: str) -> Repo:
+    makedirs(path, exist_ok=True)
+    repo = Repo.init(path)
+    with open(join(path, 'README.md'), 'w') as r:
+        r.write('hello')
+    repo.index.add(['README.md'])
+    repo.index.commit('Initial commit')
+    return repo
+
+
+class TestResultCache(TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None
+        self.runner = CliRunner()
+
+    def test_result_cache_fingerprint_changes_with_repository_state(self):
+        with self.runner.isolated_filesystem() as f:
+            repo = create_repo(join(f, 'a'))
+            initial = ResultCache.fingerprint(join(f, 'a'))
+            self.assertIsNotNone(initial)
+            self.assertEqual(ResultCache.fingerprint(join(f, 'a')), initial)
+
+            # Untracked files
+            with open(join(f, 'a', 'new'), 'w') as n:
+                n.write('new')
+            untracked = ResultCache.fingerprint(join(f, 'a'))
+            self.assertNotEqual(untracked, initial)
+            with open(join(f, 'a', 'new'), 'w') as n:
+                n.write('newer')
+            self.assertNotEqual(ResultCache.fingerprint(join(f, 'a')), untracked)
+
+            # Modified tracked files
+            with open(join(f, 'a', 'README.md'), 'w') as r:
+                r.write('world')
+            modified = ResultCache.fingerprint(join(f, 'a'))
+            self.assertNotEqual(modified, untracked)
+
+            # New commits
+            repo.index.add(['README.md', 'new'])
+            repo.index.commit('Second commit')
+            self.assertNotEqual(ResultCache.fingerprint(join(f, 'a')), modified)
+
+    def test_result_cache_fingerprint_ignores_cache_directory(self):
+        with self.runner.isolated_filesystem() as f:
+            create_repo(f)
+            initial = ResultCache.fingerprint(f)
+            makedirs(join(f, '.gameta'))
+            with open(join(f, CACHE_FILE), 'w') as c:
+                c.write('{}')
+            self.assertEqual(ResultCache.fingerprint(f), initial)
+
+    def test_result_cache_fingerprint_not_a_git_repository(self):
+        with self.runner.isolated_filesystem() as f:
+            self.assertIsNone(ResultCache.fingerprint(f))
+            cache = ResultCache(join(f, CACHE_FILE))
+            self.assertEqual(cache.keys([Job('a', ['true'], f)]), {'a': None})
+            cache.add(None, 'a')
+            self.assertEqual(cache.entries, {})
+
+    def test_result_cache_keyed_on_command(self):
+        with self.runner.isolated_filesystem() as f:
+            create_repo(f)
+            cache = ResultCache(join(f, CACHE_FILE))
+            keys = cache.keys([Job('a', ['flake8'], f), Job('b', ['pytest'], f)], jobs=2)
+            self.assertNotEqual(keys['a'], keys['b'])
+            self.assertEqual(cache.key(Job('a', ['flake8'], f)), keys['a'])
+
+    def test_result_cache_entries_evicted_on_save(self):
+        with self.runner.isolated_filesystem() as f:
+            cache = ResultCache(join(f, CACHE_FILE), max_entries=2, max_age=60)
+            cache.entries = {
+                'expired': {'repo': 'a', 'timestamp': time.time() - 120},
+                'oldest': {'repo': 'b', 'timestamp': time.time() - 30},
+                'older': {'repo': 'c', 'timestamp': time.time() - 20},
+                'newest': {'repo': 'd', 'timestamp': time.time() - 10},
+            }
+            self.assertFalse(cache.hit('expired'))
+            self.assertTrue(cache.hit('oldest'))
+            self.assertFalse(cache.hit(None))
+            cache.save()
+
+            loaded = ResultCache(join(f, CACHE_FILE))
+            loaded.load()
+            self.assertCountEqual(loaded.entries.keys(), ['older', 'newest'])
+
+    def test_result_cache_corrupted_file(self):
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, '.gameta'))
+            with open(join(f, CACHE_FILE), 'w') as c:
+                c.write('not json')
+            cache = ResultCache(join(f, CACHE_FILE))
+            cache.load()
+            self.assertEqual(cache.entries, {})
+
+    def test_result_cache_clear_repositories(self):
+        cache = ResultCache('cache')
+        cache.add('a1', 'a')
+        cache.add('a2', 'a')
+        cache.add('b1', 'b')
+        self.assertEqual(cache.clear(['a']), 2)
+        self.assertCountEqual(cache.entries.keys(), ['b1'])
+        self.assertEqual(cache.clear(), 1)
+        self.assertEqual(cache.entries, {})
+
+
+class TestApplyWithCache(TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None
+        self.runner = CliRunner()
+        self.apply = apply
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_unchanged_repositories_skipped(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            create_repo(f)
+            create_repo(join(f, 'core', 'genisys'))
+            with open(join(f, '.gitignore'), 'w') as g:
+                g.write('core/genisys\n')
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True},
+                            'genisys': {'url': None, 'path': 'core/genisys', '__metarepo__': False},
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+
+            result = self.runner.invoke(self.apply, ['--command', 'git status', '--cache'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertTrue(exists(join(f, CACHE_FILE)))
+            self.assertTrue('Executing git status in gameta' in result.output)
+            self.assertTrue('Executing git status in genisys' in result.output)
+
+            with open(join(f, 'core', 'genisys', 'README.md'), 'w') as r:
+                r.write('world')
+            result = self.runner.invoke(self.apply, ['--command', 'git status', '--cache', '-j', '2'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertTrue(
+                'Skipping gameta as it is unchanged since git status last succeeded in it' in result.output
+            )
+            self.assertTrue('Executing git status in genisys' in result.output)
+            self.assertTrue('\tgameta: cached\n\tgenisys: succeeded\n' in result.output)
+
+            result = self.runner.invoke(self.apply, ['--command', 'git status', '--cache'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertFalse('Executing' in result.output)
+
+            # Commands are cached separately
+            result = self.runner.invoke(self.apply, ['--command', 'git log', '--cache'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertTrue('Executing git log in gameta' in result.output)
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_apply_failures_not_cached(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            create_repo(f)
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True},
+                        }
+                    }, m
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+
+            for _ in range(2):
+                result = self.runner.invoke(self.apply, ['--command', 'git checkout nonexistent', '--cache'])
+                self.assertEqual(result.exit_code, 0)
+                self.assertTrue('Executing git checkout nonexistent in gameta' in result.output)
+
+
+class TestCacheClear(TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None
+        self.runner = CliRunner()
+        self.clear = clear
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_cache_clear_empty_cache(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            context = GametaContext()
+            context.project_dir = f
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.clear)
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(result.output, "Clearing cached results of all repositories\nCache is empty\n")
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_cache_clear_repositories(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            cache = ResultCache(join(f, CACHE_FILE))
+            cache.add('a1', 'a')
+            cache.add('b1', 'b')
+            cache.save()
+            context = GametaContext()
+            context.project_dir = f
+            mock_ensure_object.return_value = context
+
+            result = self.runner.invoke(self.clear, ['-r', 'a'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.output, "Clearing cached results of ['a']\nSuccessfully cleared 1 cached results\n"
+            )
+            result = self.runner.invoke(self.clear)
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.output, "Clearing cached results of all repositories\nSuccessfully cleared 1 cached results\n"
+            )
+            cache.load()
+            self.assertEqual(cache.entries, {})
@@ -1,6 +1,8 @@
 
 import zipfile
+from os import getcwd, makedirs
 from os.path import join, dirname
+from shutil import copyfile
 from unittest import TestCase
 from unittest.mock import patch
 
@@ -29,3 +31,19 @@ class TestGametaCli(TestCase):
             result = self.runner.invoke(self.cli, ["-v"])
             self.assertEqual(result.exit_code, 0)
             self.assertEqual(result.output, f"Gameta version: {__version__}\n")
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_cli_project_dir_does_not_change_working_directory(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'metarepo'))
+            with zipfile.ZipFile(join(dirname(__file__), 'data', 'git.zip'), 'r') as template:
+                template.extractall(join(f, 'metarepo'))
+            copyfile(join(dirname(__file__), 'data', '.meta'), join(f, 'metarepo', '.meta'))
+            context = GametaContext()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.cli, ['-d', join(f, 'metarepo')])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(getcwd(), f)
+            self.assertEqual(context.project_dir, join(f, 'metarepo'))
+            self.assertTrue(context.is_metarepo)
+            self.assertTrue(context.is_primary_metarepo('gameta'))
@@ -59,7 +59,7 @@ class TestCommandAdd(TestCase):
                 result.output,
                 f"Adding command {params['name']} with parameters ({{'commands': {params['commands']}, "
                 f"'description': '', 'tags': [], 'repositories': [], 'verbose': False, 'shell': True, 'python': False, "
-                f"'raise_errors': False}}) "
+                f"'raise_errors': False, 'jobs': 1, 'engine': 'thread', 'cache': False}}) "
                 f"to the command store\n"
                 f"Successfully added command {params['name']} to the command store\n"
             )
@@ -78,7 +78,10 @@ class TestCommandAdd(TestCase):
                                 'shell': True,
                                 'tags': [],
                                 'python': False,
-                                'verbose': False
+                                'verbose': False,
+                                'jobs': 1,
+                                'engine': 'thread',
+                                'cache': False
                             }
                         }
                     }
@@ -136,7 +139,8 @@ class TestCommandAdd(TestCase):
                 f"Adding command {params['name']} with parameters ({{'commands': {params['commands']}, "
                 f"'description': '{params['description']}', 'tags': {params['tags']}, "
                 f"'repositories': {params['repositories']}, 'verbose': {params['verbose']}, "
-                f"'shell': {params['shell']}, 'python': {params['python']}, 'raise_errors': {params['raise_errors']}}})"
+                f"'shell': {params['shell']}, 'python': {params['python']}, 'raise_errors': {params['raise_errors']}, "
+                f"'jobs': 1, 'engine': 'thread', 'cache': False}})"
                 f" to the command store\n"
                 f"Successfully added command {params['name']} to the command store\n"
             )
@@ -174,7 +178,10 @@ class TestCommandAdd(TestCase):
                                 'shell': params['shell'],
                                 'tags': params['tags'],
                                 'python': params['python'],
-                                'verbose': params['verbose']
+                                'verbose': params['verbose'],
+                                'jobs': 1,
+                                'engine': 'thread',
+                                'cache': False
                             }
                         }
                     }
@@ -362,7 +369,8 @@ class TestCommandAdd(TestCase):
                 f"Adding command {params['name']} with parameters ({{'commands': {params['commands']}, "
                 f"'description': '{params['description']}', 'tags': {params['tags']}, "
                 f"'repositories': {params['repositories']}, 'verbose': {params['verbose']}, "
-                f"'shell': {params['shell']}, 'python': {params['python']}, 'raise_errors': {params['raise_errors']}}})"
+                f"'shell': {params['shell']}, 'python': {params['python']}, 'raise_errors': {params['raise_errors']}, "
+                f"'jobs': 1, 'engine': 'thread', 'cache': False}})"
                 f" to the command store\n"
                 f"Successfully added command {params['name']} to the command store\n"
             )
@@ -400,7 +408,10 @@ class TestCommandAdd(TestCase):
                                 'shell': params['shell'],
                                 'tags': params['tags'],
                                 'python': params['python'],
-                                'verbose': params['verbose']
+                                'verbose': params['verbose'],
+                                'jobs': 1,
+                                'engine': 'thread',
+                                'cache': False
                             }
                         }
                     }
@@ -470,6 +481,73 @@ class TestCommandAdd(TestCase):
                     }
                 )
 
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_command_add_tag_query(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with zipfile.ZipFile(join(dirname(__file__), 'data', 'git.zip'), 'r') as template:
+                template.extractall(f)
+            copyfile(join(dirname(__file__), 'data', '.meta_other_repos'), join(f, '.meta'))
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.add, ['-n', 'hello_world', '-c', 'git pull', '-t', 'a & !d | metarepo'])
+            self.assertEqual(result.exit_code, 0)
+            with open(join(f, '.meta'), 'r') as m:
+                self.assertEqual(json.load(m)['commands']['hello_world']['tags'], ['a & !d | metarepo'])
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_command_add_tag_query_with_nonexistent_tag(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with zipfile.ZipFile(join(dirname(__file__), 'data', 'git.zip'), 'r') as template:
+                template.extractall(f)
+            copyfile(join(dirname(__file__), 'data', '.meta_other_repos'), join(f, '.meta'))
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            for query, message in [
+                ('a & !hello', "One of the tags in ['a & !hello'] has not been added, please run `gameta tags add` "
+                               "to add it first"),
+                ('a & (d', "Missing ')' in tag query 'a & (d'")
+            ]:
+                with self.subTest(query=query):
+                    result = self.runner.invoke(self.add, ['-n', 'hello_world', '-c', 'git pull', '-t', query])
+                    self.assertEqual(result.exit_code, 1)
+                    self.assertEqual(result.output, f"Error: {message}\n")
+            with open(join(f, '.meta'), 'r') as m:
+                self.assertNotIn('commands', json.load(m))
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_command_add_parameter_predicates(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with zipfile.ZipFile(join(dirname(__file__), 'data', 'git.zip'), 'r') as template:
+                template.extractall(f)
+            copyfile(join(dirname(__file__), 'data', '.meta_other_repos'), join(f, '.meta'))
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(
+                self.add, ['-n', 'hello_world', '-c', 'git pull', '-w', 'language == python', '-w', 'team in (a, b)']
+            )
+            self.assertEqual(result.exit_code, 0)
+            with open(join(f, '.meta'), 'r') as m:
+                self.assertEqual(
+                    json.load(m)['commands']['hello_world']['where'], ['language == python', 'team in (a, b)']
+                )
+            # Commands with predicates are valid
+            loaded = GametaContext()
+            loaded.project_dir = f
+            loaded.load()
+            self.assertEqual(loaded.commands['hello_world']['where'], ['language == python', 'team in (a, b)'])
+
+            result = self.runner.invoke(self.add, ['-n', 'hello_world2', '-c', 'git pull', '-w', 'language'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertTrue(result.output.startswith("Error: Malformed predicate 'language'"))
+            with open(join(f, '.meta'), 'r') as m:
+                self.assertNotIn('hello_world2', json.load(m)['commands'])
+
     @patch('gameta.cli.click.Context.ensure_object')
     def test_command_add_nonexistent_repository(self, mock_ensure_object):
         params = {
@@ -552,7 +630,9 @@ class TestCommandAdd(TestCase):
                                     'repositories': [],
                                     'shell': True,
                                     'tags': [],
-                                    'verbose': False
+                                    'verbose': False,
+                                    'jobs': 1,
+                                    'engine': 'thread'
                                 }
                             }
                         }
@@ -581,7 +661,9 @@ class TestCommandAdd(TestCase):
                 f"Adding command {params['name']} with parameters ({{'commands': {params['commands']}, "
                 f"'description': '{params['description']}', 'tags': {params['tags']}, "
                 f"'repositories': {params['repositories']}, 'verbose': {params['verbose']}, 'shell': {params['shell']}, "
-                f"'python': {params['python']}, 'raise_errors': {params['raise_errors']}}}) to the command store\n"
+                f"'python': {params['python']}, 'raise_errors': {params['raise_errors']}, 'jobs': 1, "
+                f"'engine': 'thread', 'cache': False}}) "
+                f"to the command store\n"
                 f"Overwriting command {params['name']} in the command store\n"
                 f"Successfully added command {params['name']} to the command store\n"
             )
@@ -619,7 +701,10 @@ class TestCommandAdd(TestCase):
                                 'shell': params['shell'],
                                 'tags': params['tags'],
                                 'python': params['python'],
-                                'verbose': params['verbose']
+                                'verbose': params['verbose'],
+                                'jobs': 1,
+                                'engine': 'thread',
+                                'cache': False
                             }
                         }
                     }
@@ -663,7 +748,8 @@ class TestCommandAdd(TestCase):
                 f"Adding command {params['name']} with parameters ({{'commands': {params['commands']}, "
                 f"'description': '{params['description']}', 'tags': {params['tags']}, "
                 f"'repositories': {params['repositories']}, 'verbose': {params['verbose']}, "
-                f"'shell': {params['shell']}, 'python': {params['python']}, 'raise_errors': {params['raise_errors']}}})"
+                f"'shell': {params['shell']}, 'python': {params['python']}, 'raise_errors': {params['raise_errors']}, "
+                f"'jobs': 1, 'engine': 'thread', 'cache': False}})"
                 f" to the command store\n"
                 f"Successfully added command {params['name']} to the command store\n"
             )
@@ -689,7 +775,10 @@ class TestCommandAdd(TestCase):
                                 'shell': params['shell'],
                                 'tags': params['tags'],
                                 'python': params['python'],
-                                'verbose': params['verbose']
+                                'verbose': params['verbose'],
+                                'jobs': 1,
+                                'engine': 'thread',
+                                'cache': False
                             }
                         }
                     }
@@ -2201,3 +2290,61 @@ class TestCommandExec(TestCase):
                         }
                     }
                 )
+
+    @patch('gameta.cli.click.core.Context')
+    def test_command_exec_multiple_commands_with_reports(self, mock_context):
+        params = {
+            'commands': ['hello', 'world'],
+            'hello': {
+                'commands': ['mkdir hello'],
+                'description': '',
+                'tags': [],
+                'repositories': [],
+                'verbose': False,
+                'shell': False,
+                'python': False,
+                'raise_errors': True
+            },
+            'world': {
+                'commands': ['mkdir world'],
+                'description': '',
+                'tags': [],
+                'repositories': [],
+                'verbose': False,
+                'shell': False,
+                'python': False,
+                'raise_errors': True
+            }
+        }
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'gameta': {'url': None, 'path': '.', 'tags': ['metarepo'], '__metarepo__': True}
+                        },
+                        'commands': {
+                            'hello': params['hello'],
+                            'world': params['world']
+                        }
+                    }, m
+                )
+            gameta_context = GametaContext()
+            gameta_context.project_dir = f
+            gameta_context.load()
+            context = Context(exec, obj=gameta_context)
+            mock_context.return_value = context
+            result = self.runner.invoke(
+                self.exec, ['-c', params['commands'][0], '-c', params['commands'][1], '--report', join(f, 'usage.json')]
+            )
+            self.assertEqual(result.exit_code, 0)
+            self.assertFalse(exists(join(f, 'usage.json')))
+            for command in params['commands']:
+                self.assertTrue(exists(join(f, command)))
+                self.assertTrue(
+                    f"Resource usage report written to {join(f, f'usage.{command}.json')}\n" in result.output
+                )
+                with open(join(f, f'usage.{command}.json')) as r:
+                    report = json.load(r)
+                self.assertEqual(report['commands'], params[command]['commands'])
+                self.assertEqual([r['status'] for r in report['results']], ['succeeded'])
@@ -1,11 +1,19 @@
 import json
-from os import makedirs, listdir, symlink, getcwd, getenv, environ
-from os.path import join, basename, exists
+import sqlite3
+import subprocess
+import threading
+from contextlib import closing
+from os import makedirs, listdir, symlink, getcwd, getenv, environ, utime, chmod, stat
+from os.path import join, exists, basename, getmtime, islink
+from time import time
 from unittest import TestCase, skipIf
+from unittest.mock import patch
 
+import click
 from click.testing import CliRunner
 
-from gameta.context import GametaContext
+from gameta.context import GametaContext, Database, Journal, DATABASE_FILE, SCRIPTS_DIR, write_file
+from gameta.engines import engines
 
 
 class TestGametaContext(TestCase):
@@ -21,43 +29,44 @@ class TestGametaContext(TestCase):
     def test_gameta_context_environment_variables_exists(self):
         self.assertTrue('$HOME' in self.context.env_vars)
 
-    def test_gameta_context_cd_to_valid_directory(self):
+    def test_gameta_context_resolve_valid_directory(self):
         with self.runner.isolated_filesystem() as f:
             makedirs(join(f, 'test', 'hello', 'world'))
             makedirs(join(f, 'i', 'am'))
             makedirs(join(f, 'a'))
 
             self.context.project_dir = f
-            with self.context.cd(join('test', 'hello')):
-                self.assertCountEqual(listdir('.'), ['world'])
-            self.assertCountEqual(listdir('.'), ['test', 'i', 'a'])
+            self.assertEqual(self.context.resolve(join('test', 'hello')), join(f, 'test', 'hello'))
+            self.assertCountEqual(listdir(self.context.resolve(join('test', 'hello'))), ['world'])
+            self.assertEqual(getcwd(), f)
 
-    def test_gameta_context_cd_to_nonexistent_directory(self):
+    def test_gameta_context_resolve_nonexistent_directory(self):
         with self.runner.isolated_filesystem() as f:
             self.context.project_dir = f
             with self.assertRaises(FileNotFoundError):
-                with self.context.cd('test'):
-                    pass
+                self.context.resolve('test')
 
-    def test_gameta_context_only_cd_within_project_directory(self):
+    def test_gameta_context_resolve_nonexistent_directory_unchecked(self):
+        with self.runner.isolated_filesystem() as f:
+            self.context.project_dir = f
+            self.assertEqual(self.context.resolve('test', check=False), join(f, 'test'))
+
+    def test_gameta_context_only_resolve_within_project_directory(self):
         with self.runner.isolated_filesystem() as f:
             self.context.project_dir = f
             with self.assertRaises(FileNotFoundError):
-                with self.context.cd('/usr'):
-                    pass
+                self.context.resolve('/usr')
             with self.assertRaises(FileNotFoundError):
-                with self.context.cd('/////usr'):
-                    pass
+                self.context.resolve('/////usr')
 
-    def test_gameta_context_cd_to_symlink_within_project_directory(self):
+    def test_gameta_context_resolve_symlink_within_project_directory(self):
         with self.runner.isolated_filesystem() as f:
             makedirs(join(f, 'test'))
             makedirs(join(f, 'a'))
             symlink(join(f, 'a'), join(f, 'test', 'hello'))
 
             self.context.project_dir = join(f, 'test')
-            with self.context.cd('hello'):
-                self.assertEqual(basename(getcwd()), 'a')
+            self.assertEqual(self.context.resolve('hello'), join(f, 'test', 'hello'))
 
     def test_gameta_context_project_name_after_providing_project_dir(self):
         with self.runner.isolated_filesystem() as f:
@@ -228,6 +237,68 @@ class TestGametaContext(TestCase):
             ]
         )
 
+    def test_gameta_context_shell_special_characters_preserved(self):
+        commands = ['echo "double quoted" \'single\'', 'echo $((1 + 1)) `echo back` "a\\\\b"']
+        command = self.context.shell(commands)
+        self.assertEqual(command, [getenv('SHELL', '/bin/sh'), '-c', ' && '.join(commands)])
+        self.assertEqual(
+            subprocess.run(command, stdout=subprocess.PIPE).stdout, b'double quoted single\n2 back a\\b\n'
+        )
+
+    def test_gameta_context_shell_long_commands_executed_from_script_file(self):
+        with self.runner.isolated_filesystem() as f:
+            self.context.project_dir = f
+            commands = [f'echo {"x" * 40000}', 'echo "done" | tr a-z A-Z']
+            command = self.context.shell(commands)
+            self.assertEqual(command[0], getenv('SHELL', '/bin/sh'))
+            self.assertEqual(len(command), 2)
+            with open(command[1]) as s:
+                self.assertEqual(s.read(), ' && '.join(commands))
+            # Identical commands share a script file
+            self.assertEqual(self.context.shell(commands), command)
+            self.assertEqual(listdir(join(f, '.gameta', 'scripts')), [basename(command[1])])
+            self.assertEqual(
+                subprocess.run(command, stdout=subprocess.PIPE).stdout,
+                f'{"x" * 40000}\nDONE\n'.encode()
+            )
+
+    def test_gameta_context_shell_long_commands_inline_without_project_directory(self):
+        self.assertEqual(
+            self.context.shell([f'echo {"x" * 40000}']), [getenv('SHELL', '/bin/sh'), '-c', f'echo {"x" * 40000}']
+        )
+
+    def test_gameta_context_python_long_scripts_executed_from_script_file(self):
+        with self.runner.isolated_filesystem() as f:
+            self.context.project_dir = f
+            scripts = [
+                'import sys\nprint(f"${sys.argv}", \'single\', "back\\\\slash", sys.path[0] == "")\n#' + 'a' * 32 * 1024
+            ]
+            command = self.context.python(scripts)
+            self.assertEqual(command[:2], [getenv('SHELL', '/bin/sh'), '-c'])
+            self.assertNotIn('$', command[2])
+            self.assertEqual(listdir(join(f, '.gameta', 'scripts')), [command[2].split('"')[1].split('/')[-1]])
+            with open(command[2].split('"')[1]) as s:
+                self.assertEqual(s.read(), scripts[0])
+            self.assertEqual(
+                subprocess.run(command, stdout=subprocess.PIPE).stdout,
+                b"$['-c'] single back\\slash True\n"
+            )
+
+    def test_gameta_context_python_quotable_scripts_executed_inline(self):
+        with self.runner.isolated_filesystem() as f:
+            self.context.project_dir = f
+            self.assertEqual(
+                self.context.python(['print("hello")']),
+                [getenv('SHELL', '/bin/sh'), '-c', 'python3 -c \'print("hello")\'']
+            )
+            command = self.context.python(['print("$HOME", "`ls`", "back\\\\slash")'])
+            self.assertEqual(
+                subprocess.run(command, stdout=subprocess.PIPE).stdout, b'$HOME `ls` back\\slash\n'
+            )
+            command = self.context.python(['print(\'single\', "it\'s", \'"double"\')'])
+            self.assertEqual(subprocess.run(command, stdout=subprocess.PIPE).stdout, b'single it\'s "double"\n')
+            self.assertFalse(exists(join(f, '.gameta')))
+
     def test_gameta_context_generate_tags_no_repositories(self):
         self.context.generate_tags()
         self.assertEqual({}, self.context.tags)
@@ -274,6 +345,92 @@ class TestGametaContext(TestCase):
             }
         )
 
+    def test_gameta_context_generate_tags_duplicate_tags(self):
+        self.context.repositories = {
+            "genisys": {"url": None, "path": "core/genisys", "tags": ["core", "core"], '__metarepo__': False}
+        }
+        self.context.generate_tags()
+        self.assertEqual(self.context.tags, {'core': frozenset(['genisys'])})
+
+    def test_gameta_context_add_tags_index_updated(self):
+        self.context.repositories = {
+            "gameta": {"url": None, "path": ".", "tags": ["metarepo"], '__metarepo__': True},
+            "genisys": {"url": None, "path": "core/genisys", "tags": ["core"], '__metarepo__': False}
+        }
+        self.context.generate_tags()
+        self.context.add_tags('gameta', ['core', 'templating', 'metarepo'])
+        self.assertEqual(self.context.repositories['gameta']['tags'], ['core', 'metarepo', 'templating'])
+        self.assertEqual(
+            self.context.tags,
+            {
+                'core': frozenset(['gameta', 'genisys']),
+                'metarepo': frozenset(['gameta']),
+                'templating': frozenset(['gameta'])
+            }
+        )
+
+    def test_gameta_context_delete_tags_index_updated(self):
+        self.context.repositories = {
+            "gameta": {"url": None, "path": ".", "tags": ["core", "metarepo"], '__metarepo__': True},
+            "genisys": {"url": None, "path": "core/genisys", "tags": ["core"], '__metarepo__': False}
+        }
+        self.context.generate_tags()
+        self.context.delete_tags('gameta', ['core', 'metarepo', 'nonexistent'])
+        self.assertEqual(self.context.repositories['gameta']['tags'], [])
+        self.assertEqual(self.context.tags, {'core': frozenset(['genisys'])})
+
+    def test_gameta_context_select_tag_queries(self):
+        self.context.repositories = {
+            "gameta": {"url": None, "path": ".", "tags": ["metarepo"], '__metarepo__': True},
+            "genisys": {"url": None, "path": "core/genisys", "tags": ["core"], '__metarepo__': False},
+            "genisys-testing": {
+                "url": None, "path": "core/genisys-testing", "tags": ["core", "testing"], '__metarepo__': False
+            }
+        }
+        self.context.generate_tags()
+        self.assertEqual(self.context.select([]), frozenset())
+        self.assertEqual(self.context.select(['core & !testing']), {'genisys'})
+        self.assertEqual(self.context.select(['core & !testing', 'metarepo']), {'genisys', 'gameta'})
+        self.assertEqual(self.context.select(['!core']), {'gameta'})
+        with self.assertRaises(ValueError):
+            self.context.select(['core &'])
+
+    def test_gameta_context_where_parameter_predicates(self):
+        self.context.repositories = {
+            "gameta": {"url": None, "path": ".", '__metarepo__': True},
+            "genisys": {"url": None, "path": "core/genisys", '__metarepo__': False, 'language': 'python', 'team': 'a'},
+            "genisys-testing": {
+                "url": None, "path": "core/genisys-testing", '__metarepo__': False, 'language': 'python', 'team': 'b'
+            },
+            "gitdb": {"url": None, "path": "core/gitdb", '__metarepo__': False, 'language': 'go', 'team': 'a'}
+        }
+        self.assertEqual(self.context.where([]), {'gameta', 'genisys', 'genisys-testing', 'gitdb'})
+        self.assertEqual(self.context.where(['language == python']), {'genisys', 'genisys-testing'})
+        self.assertEqual(self.context.where(['language == python', 'team in (a, c)']), {'genisys'})
+        self.assertEqual(self.context.where(['team != a']), {'genisys-testing'})
+        with self.assertRaises(ValueError):
+            self.context.where(['team'])
+
+    def test_gameta_context_index_built_lazily(self):
+        with self.runner.isolated_filesystem() as f:
+            self.context.project_dir = f
+            self.context.repositories = {
+                "gameta": {"url": None, "path": ".", '__metarepo__': True, 'language': 'python'},
+                "genisys": {"url": None, "path": "core/genisys", '__metarepo__': False, 'language': 'go'}
+            }
+            self.assertEqual(self.context.indexes, {})
+            self.assertEqual(self.context.where(['language == python']), {'gameta'})
+            self.assertEqual(
+                self.context.indexes, {'language': {'"python"': frozenset(['gameta']), '"go"': frozenset(['genisys'])}}
+            )
+            self.assertIs(self.context.index('language'), self.context.indexes['language'])
+
+            # Indexes are rebuilt once the repositories have been exported
+            self.context.repositories['genisys']['language'] = 'python'
+            self.context.export()
+            self.assertEqual(self.context.indexes, {})
+            self.assertEqual(self.context.where(['language == python']), {'gameta', 'genisys'})
+
     def test_gameta_load_empty_meta_file(self):
         with self.runner.isolated_filesystem() as f:
             with open(join(f, '.meta'), 'w'):
@@ -502,6 +659,54 @@ class TestGametaContext(TestCase):
                 }
             )
 
+    def test_gameta_context_validate_dependencies(self):
+        self.context.repositories = {
+            'a': {'url': None, 'path': 'a', '__metarepo__': False, 'depends_on': ['b', 'c']},
+            'b': {'url': None, 'path': 'b', '__metarepo__': False, 'depends_on': ['c']},
+            'c': {'url': None, 'path': 'c', '__metarepo__': False},
+        }
+        self.context.validate_dependencies()
+
+    def test_gameta_context_validate_dependencies_nonexistent_dependency(self):
+        self.context.repositories = {
+            'a': {'url': None, 'path': 'a', '__metarepo__': False, 'depends_on': ['b', 'd']},
+            'b': {'url': None, 'path': 'b', '__metarepo__': False},
+        }
+        with self.assertRaisesRegex(ValueError, r"Repository a depends on repositories \['d'\] that do not exist"):
+            self.context.validate_dependencies()
+
+    def test_gameta_context_validate_dependencies_cycle_detected(self):
+        self.context.repositories = {
+            'a': {'url': None, 'path': 'a', '__metarepo__': False, 'depends_on': ['b']},
+            'b': {'url': None, 'path': 'b', '__metarepo__': False, 'depends_on': ['c']},
+            'c': {'url': None, 'path': 'c', '__metarepo__': False, 'depends_on': ['a']},
+            'd': {'url': None, 'path': 'd', '__metarepo__': False, 'depends_on': ['a']},
+        }
+        with self.assertRaisesRegex(ValueError, 'Dependency cycle detected: a -> b -> c -> a'):
+            self.context.validate_dependencies()
+
+    def test_gameta_load_cyclic_dependencies_meta_file(self):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(
+                    {
+                        'projects': {
+                            'a': {'url': None, 'path': 'a', '__metarepo__': False, 'depends_on': ['b']},
+                            'b': {'url': None, 'path': 'b', '__metarepo__': False, 'depends_on': ['a']},
+                        }
+                    }, m
+                )
+
+            self.context.project_dir = f
+            with self.runner.isolation() as (out, _):
+                self.context.load()
+                output = out.getvalue().decode()
+            self.assertEqual(self.context.repositories, {})
+            self.assertEqual(
+                output,
+                "Malformed repository element, error: ValueError.Dependency cycle detected: a -> b -> a\n"
+            )
+
     def test_gameta_load_malformed_constants_meta_file(self):
         with self.runner.isolated_filesystem() as f:
             with open(join(f, '.meta'), 'w') as m:
@@ -1141,6 +1346,524 @@ class TestGametaContext(TestCase):
             self.assertEqual(self.context.commands, {})
             self.assertEqual(self.context.gitignore_data, [])
 
+    def write_validation_meta_file(self, directory, **overrides):
+        meta = {
+            "projects": {
+                "gameta": {"url": "https://github.com/testing/gameta.git", "path": ".", "__metarepo__": True},
+                "genisys": {
+                    "url": "https://github.com/testing/genisys.git", "path": "core/genisys", "__metarepo__": False
+                }
+            },
+            "commands": {
+                "hello": {
+                    "commands": ["echo hello"], "description": "", "tags": [], "repositories": [],
+                    "verbose": False, "shell": False, "python": False, "raise_errors": False
+                }
+            },
+            "constants": {"HELLO": "world"}
+        }
+        meta["projects"].update(overrides)
+        with open(join(directory, '.meta'), 'w') as m:
+            json.dump(meta, m)
+
+    def test_gameta_context_load_validation_results_cached(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            self.context.project_dir = f
+            self.context.load()
+            self.assertTrue(self.context.is_metarepo)
+            self.assertTrue(exists(join(f, '.gameta', 'validated')))
+
+            with patch.object(self.context.validators['repositories'], 'validate') as repositories, \
+                    patch.object(self.context.validators['commands'], 'validate') as commands, \
+                    patch.object(self.context.validators['constants'], 'validate') as constants:
+                context = GametaContext()
+                context.project_dir = f
+                context.load()
+                repositories.assert_not_called()
+                commands.assert_not_called()
+                constants.assert_not_called()
+            self.assertEqual(context.repositories, self.context.repositories)
+            self.assertEqual(context.commands, self.context.commands)
+            self.assertEqual(context.constants, {'HELLO': 'world'})
+
+    def test_gameta_context_load_working_files_ignored_by_git(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            subprocess.run(['git', 'init', '-q', f], check=True)
+            self.context.project_dir = f
+            self.context.load()
+            self.assertTrue(exists(join(f, '.gameta', 'validated')))
+            with open(join(f, '.gameta', '.gitignore')) as g:
+                self.assertEqual(g.read(), '*\n')
+            status = subprocess.run(
+                ['git', 'status', '--porcelain', '--untracked-files=all'], cwd=f, stdout=subprocess.PIPE, check=True
+            )
+            self.assertEqual(status.stdout.decode().splitlines(), ['?? .meta'])
+
+            with open(join(f, '.gameta', '.gitignore'), 'w') as g:
+                g.write('validated\n')
+            self.context.share(SCRIPTS_DIR, 'print("hello")', '.py')
+            with open(join(f, '.gameta', '.gitignore')) as g:
+                self.assertEqual(g.read(), 'validated\n')
+
+    def test_gameta_context_load_only_changed_elements_validated(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            self.context.project_dir = f
+            self.context.load()
+
+            repository = {
+                "url": "https://github.com/testing/genisys.git", "path": "core/genisys", "__metarepo__": False,
+                "branch": "test"
+            }
+            self.write_validation_meta_file(f, genisys=repository)
+            validator = self.context.validators['repositories']
+            with patch.object(validator, 'validate', wraps=validator.validate) as repositories, \
+                    patch.object(self.context.validators['commands'], 'validate') as commands:
+                context = GametaContext()
+                context.project_dir = f
+                context.load()
+                repositories.assert_called_once_with(repository)
+                commands.assert_not_called()
+            self.assertEqual(context.repositories['genisys']['branch'], 'test')
+
+    def test_gameta_context_load_invalid_elements_not_cached(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f, genisys={"path": "core/genisys", "__metarepo__": False})
+            for _ in range(2):
+                context = GametaContext()
+                context.project_dir = f
+                output = self.runner.invoke(click.command()(lambda: context.load()))
+                self.assertIn("Malformed repository element, error: ValidationError.'url' is a required property",
+                              output.output)
+                self.assertEqual(context.repositories, {})
+                self.assertFalse(context.is_metarepo)
+
+    def test_gameta_context_commands_engines_validated_against_registered_engines(self):
+        command = {
+            'commands': ['git fetch'], 'description': '', 'tags': [], 'repositories': [], 'verbose': False,
+            'shell': False, 'python': False, 'raise_errors': False
+        }
+        validator = GametaContext.validators['commands']
+        for engine in engines:
+            with self.subTest(engine=engine):
+                self.assertTrue(validator.is_valid({**command, 'engine': engine}))
+        self.assertFalse(validator.is_valid({**command, 'engine': 'process-pool'}))
+
+    def test_gameta_context_load_corrupted_validation_cache_ignored(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            makedirs(join(f, '.gameta'))
+            with open(join(f, '.gameta', 'validated'), 'w') as c:
+                c.write('{"schema": ')
+            self.context.project_dir = f
+            self.context.load()
+            self.assertTrue(self.context.is_metarepo)
+            with open(join(f, '.gameta', 'validated')) as c:
+                self.assertIn('elements', json.load(c))
+
+    def test_gameta_context_load_validation_cache_discarded_on_schema_change(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            self.context.project_dir = f
+            self.context.load()
+            with open(join(f, '.gameta', 'validated')) as c:
+                cache = json.load(c)
+            cache['schema'] = 'outdated'
+            with open(join(f, '.gameta', 'validated'), 'w') as c:
+                json.dump(cache, c)
+
+            validator = self.context.validators['repositories']
+            with patch.object(validator, 'validate', wraps=validator.validate) as repositories:
+                context = GametaContext()
+                context.project_dir = f
+                context.load()
+                self.assertEqual(repositories.call_count, 2)
+
+    def test_gameta_context_load_restored_from_snapshot(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            utime(join(f, '.meta'), (time() - 60, time() - 60))
+            self.context.project_dir = f
+            self.context.load()
+            self.assertTrue(exists(join(f, '.gameta', 'snapshot')))
+
+            with patch('gameta.context.Meta.load') as meta, patch('gameta.context.GitIgnore.load') as gitignore:
+                context = GametaContext()
+                context.project_dir = f
+                context.load()
+                meta.assert_not_called()
+                gitignore.assert_not_called()
+            self.assertTrue(context.is_metarepo)
+            self.assertEqual(context.repositories, self.context.repositories)
+            self.assertIs(context.repositories, context.gameta_data['projects'])
+            self.assertEqual(context.commands, self.context.commands)
+            self.assertEqual(context.constants, {'HELLO': 'world'})
+            self.assertEqual(context.tags, self.context.tags)
+
+    def test_gameta_context_load_snapshot_discarded_on_modification(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            utime(join(f, '.meta'), (time() - 60, time() - 60))
+            self.context.project_dir = f
+            self.context.load()
+
+            self.context.repositories['genisys']['branch'] = 'test'
+            self.context.export()
+            with open(join(f, '.gitignore'), 'w') as g:
+                g.write('.gameta\n')
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertEqual(context.repositories['genisys']['branch'], 'test')
+            self.assertEqual(context.gitignore_data, ['.gameta\n'])
+
+    def test_gameta_context_load_snapshot_discarded_on_schema_change(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            utime(join(f, '.meta'), (time() - 60, time() - 60))
+            self.context.project_dir = f
+            self.context.load()
+            self.assertTrue(exists(join(f, '.gameta', 'snapshot')))
+
+            context = GametaContext()
+            context.project_dir = f
+            context.__schema__ = json.loads(json.dumps(context.__schema__))
+            context.__schema__['definitions']['commands']['properties']['engine']['enum'].append('custom')
+            with patch('gameta.context.Meta.load') as meta:
+                context.load()
+                meta.assert_called_once_with()
+
+    def test_gameta_context_load_recently_modified_files_not_snapshotted(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            self.context.project_dir = f
+            self.context.load()
+            self.assertTrue(self.context.is_metarepo)
+            self.assertFalse(exists(join(f, '.gameta', 'snapshot')))
+
+    def test_gameta_context_load_files_with_errors_not_snapshotted(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            with open(join(f, '.meta')) as m:
+                meta = json.load(m)
+            meta['commands']['hello']['unknown'] = True
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(meta, m)
+            utime(join(f, '.meta'), (time() - 60, time() - 60))
+            self.context.project_dir = f
+            self.context.load()
+            self.assertTrue(self.context.is_metarepo)
+            self.assertEqual(self.context.commands, {})
+            self.assertFalse(exists(join(f, '.gameta', 'snapshot')))
+
+    def test_gameta_context_load_corrupted_snapshot_ignored(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            utime(join(f, '.meta'), (time() - 60, time() - 60))
+            makedirs(join(f, '.gameta'))
+            with open(join(f, '.gameta', 'snapshot'), 'wb') as s:
+                s.write(b'\x00corrupted')
+            self.context.project_dir = f
+            self.context.load()
+            self.assertTrue(self.context.is_metarepo)
+            self.assertEqual(self.context.constants, {'HELLO': 'world'})
+
+    def test_gameta_context_database_export_only_changed_repositories_written(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            self.context.project_dir = f
+            self.context.load()
+            database = Database(self.context)
+            database.export()
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertIsInstance(context.files['meta'], Database)
+            context.add_tags('genisys', ['core'])
+            statements = []
+            connect = context.files['meta'].connect
+
+            def traced(create=False):
+                connection = connect(create)
+                connection.set_trace_callback(statements.append)
+                return connection
+
+            with patch.object(context.files['meta'], 'connect', traced):
+                context.export()
+            self.assertEqual(
+                len([statement for statement in statements if statement.startswith('INSERT OR REPLACE')]), 1
+            )
+            with closing(sqlite3.connect(join(f, DATABASE_FILE))) as connection:
+                details, = connection.execute("SELECT details FROM repositories WHERE name = 'genisys'").fetchone()
+                self.assertTrue('core' in json.loads(details)['tags'])
+
+    def test_gameta_context_database_rows_loaded_lazily(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(
+                f,
+                genisys={
+                    "url": "https://github.com/testing/genisys.git", "path": "core/genisys", "__metarepo__": False,
+                    "tags": ["core"], "depends_on": ["gameta"]
+                }
+            )
+            self.context.project_dir = f
+            self.context.load()
+            Database(self.context).export()
+
+            context = GametaContext()
+            context.project_dir = f
+            with patch('gameta.context.Database.fetch') as fetch:
+                context.load()
+                self.assertEqual(context.names(), {'gameta', 'genisys'})
+                self.assertEqual(context.select(['core | !core']), {'gameta', 'genisys'})
+                self.assertEqual(context.where(['__metarepo__ == true']), {'gameta'})
+                context.constants['HI'] = 'there'
+                fetch.assert_not_called()
+            context.export()
+            with closing(sqlite3.connect(join(f, DATABASE_FILE))) as connection:
+                self.assertEqual(
+                    connection.execute("SELECT data FROM sections WHERE name = 'constants'").fetchone(),
+                    ('{"HELLO": "world", "HI": "there"}',)
+                )
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            context.repositories['hello'] = {
+                "url": None, "path": "hello", "__metarepo__": False, "tags": ["hi"], "depends_on": ["genisys"]
+            }
+            context.export()
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertEqual(context.tags['hi'], {'hello'})
+            self.assertEqual(context.where(['depends_on == ["genisys"]']), {'hello'})
+            self.assertEqual(list(context.repositories), ['gameta', 'genisys', 'hello'])
+
+    def test_gameta_context_database_of_earlier_versions_reindexed(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(
+                f,
+                genisys={
+                    "url": "https://github.com/testing/genisys.git", "path": "core/genisys", "__metarepo__": False,
+                    "tags": ["core"]
+                }
+            )
+            self.context.project_dir = f
+            self.context.load()
+            Database(self.context).export()
+            with closing(sqlite3.connect(join(f, DATABASE_FILE))) as connection:
+                connection.executescript('DROP TABLE tags; DROP TABLE parameters; PRAGMA user_version = 0;')
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertEqual(context.pending, set())
+            self.assertEqual(context.tags['core'], {'genisys'})
+            context.constants['HI'] = 'there'
+            context.export()
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertEqual(context.pending, {DATABASE_FILE})
+            self.assertEqual(context.tags['core'], {'genisys'})
+
+    def test_gameta_context_database_export_repository_order_preserved(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            self.context.project_dir = f
+            self.context.load()
+            Database(self.context).export()
+
+            for order in [['genisys', 'gameta'], ['genisys', 'hello', 'gameta']]:
+                with self.subTest(order=order):
+                    context = GametaContext()
+                    context.project_dir = f
+                    context.load()
+                    details = {"url": None, "path": "hello", "__metarepo__": False}
+                    context.repositories = {
+                        repo: context.repositories.get(repo, details) for repo in order
+                    }
+                    context.export()
+
+                    context = GametaContext()
+                    context.project_dir = f
+                    context.load()
+                    self.assertEqual(list(context.repositories), order)
+
+            context.repositories['hi'] = {"url": None, "path": "hi", "__metarepo__": False}
+            del context.repositories['hello']
+            context.export()
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertEqual(list(context.repositories), ['genisys', 'gameta', 'hi'])
+            with closing(sqlite3.connect(join(f, DATABASE_FILE))) as connection:
+                self.assertEqual(
+                    connection.execute("SELECT COUNT(*) FROM repositories WHERE name = 'hello'").fetchone(), (0,)
+                )
+
+    def test_gameta_context_database_restored_from_snapshot_exported(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            self.context.project_dir = f
+            self.context.load()
+            Database(self.context).export()
+            # Databases of earlier versions are loaded in full, so that they can be snapshotted
+            with closing(sqlite3.connect(join(f, DATABASE_FILE))) as connection:
+                connection.execute('PRAGMA user_version = 0')
+            utime(join(f, DATABASE_FILE), (time() - 60, time() - 60))
+            self.context.load()
+            self.assertTrue(exists(join(f, '.gameta', 'snapshot')))
+
+            context = GametaContext()
+            context.project_dir = f
+            with patch('gameta.context.Database.load') as load:
+                context.load()
+                load.assert_not_called()
+            context.repositories['genisys']['branch'] = 'test'
+            context.export()
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertEqual(context.repositories['genisys']['branch'], 'test')
+            self.assertEqual(context.constants, {'HELLO': 'world'})
+
+    def write_sharded_meta_file(self, directory, **shards):
+        self.write_validation_meta_file(directory)
+        with open(join(directory, '.meta')) as m:
+            meta = json.load(m)
+        meta['include'] = ['meta.d/*.json']
+        with open(join(directory, '.meta'), 'w') as m:
+            json.dump(meta, m)
+        makedirs(join(directory, 'meta.d'), exist_ok=True)
+        for name, projects in shards.items():
+            with open(join(directory, 'meta.d', f'{name}.json'), 'w') as s:
+                json.dump({'projects': projects}, s)
+        for file in [join(directory, '.meta')] + [join(directory, 'meta.d', f'{name}.json') for name in shards]:
+            utime(file, (time() - 60, time() - 60))
+
+    def shard_repositories(self, team, *names, **details):
+        return {
+            name: {"url": f"https://github.com/testing/{name}.git", "path": name, "__metarepo__": False,
+                   "tags": [team], **details}
+            for name in names
+        }
+
+    def test_gameta_context_load_shards_merged(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_sharded_meta_file(
+                f, a=self.shard_repositories('a', 'a1', 'a2'), b=self.shard_repositories('b', 'b1', depends_on=['a1'])
+            )
+            self.context.project_dir = f
+            self.context.load()
+            self.assertTrue(self.context.is_metarepo)
+            self.assertEqual(list(self.context.repositories), ['gameta', 'genisys', 'a1', 'a2', 'b1'])
+            self.assertEqual(
+                self.context.owners,
+                {'a1': join('meta.d', 'a.json'), 'a2': join('meta.d', 'a.json'), 'b1': join('meta.d', 'b.json')}
+            )
+            self.assertEqual(self.context.tags['a'], {'a1', 'a2'})
+            self.assertEqual(self.context.pending, set())
+            self.assertTrue(exists(join(f, '.gameta', 'shards')))
+
+    def test_gameta_context_load_unchanged_shards_not_loaded(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_sharded_meta_file(
+                f, a=self.shard_repositories('a', 'a1', 'a2'), b=self.shard_repositories('b', 'b1', depends_on=['a1'])
+            )
+            self.context.project_dir = f
+            self.context.load()
+
+            context = GametaContext()
+            context.project_dir = f
+            with patch('gameta.context.Shard.load') as load:
+                context.load()
+                load.assert_not_called()
+            self.assertEqual(context.pending, {join('meta.d', 'a.json'), join('meta.d', 'b.json')})
+            self.assertEqual(context.tags, self.context.tags)
+            self.assertEqual(context.names(), {'gameta', 'genisys', 'a1', 'a2', 'b1'})
+            self.assertEqual(context.select(['b']), {'b1'})
+
+            self.assertEqual(context.repository('a1')['path'], 'a1')
+            self.assertEqual(context.pending, {join('meta.d', 'b.json')})
+            self.assertEqual(context.repositories, self.context.repositories)
+            self.assertEqual(list(context.repositories), ['gameta', 'genisys', 'a1', 'a2', 'b1'])
+            self.assertEqual(context.pending, set())
+
+    def test_gameta_context_load_modified_shard_reloaded(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_sharded_meta_file(f, a=self.shard_repositories('a', 'a1'), b=self.shard_repositories('b', 'b1'))
+            self.context.project_dir = f
+            self.context.load()
+
+            with open(join(f, 'meta.d', 'b.json'), 'w') as s:
+                json.dump({'projects': self.shard_repositories('c', 'b1', 'b2')}, s)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertEqual(context.pending, {join('meta.d', 'a.json')})
+            self.assertEqual(context.tags['c'], {'b1', 'b2'})
+            self.assertNotIn('b', context.tags)
+
+    def test_gameta_context_load_shard_repository_defined_twice(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_sharded_meta_file(f, a=self.shard_repositories('a', 'a1'), b=self.shard_repositories('b', 'a1'))
+            self.context.project_dir = f
+            output = self.runner.invoke(click.command()(lambda: self.context.load()))
+            self.assertEqual(
+                output.output,
+                f"Malformed repository element, error: ValueError.Repository a1 in shard {join('meta.d', 'b.json')} "
+                f"is already defined in {join('meta.d', 'a.json')}\n"
+            )
+            self.assertFalse(self.context.is_metarepo)
+            self.assertEqual(self.context.repositories, {})
+
+    def test_gameta_context_load_shard_malformed(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_sharded_meta_file(f, a={"a1": {"path": "a1", "__metarepo__": False}})
+            self.context.project_dir = f
+            output = self.runner.invoke(click.command()(lambda: self.context.load()))
+            self.assertEqual(
+                output.output,
+                f"Malformed repository element, error: ValueError.Repository a1 in shard {join('meta.d', 'a.json')} "
+                f"is malformed: 'url' is a required property\n"
+            )
+            self.assertFalse(self.context.is_metarepo)
+
+    def test_gameta_context_export_shards(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_sharded_meta_file(f, a=self.shard_repositories('a', 'a1'), b=self.shard_repositories('b', 'b1'))
+            self.context.project_dir = f
+            self.context.load()
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+
+            context.add_tags('a1', ['new'])
+            context.repositories['hi'] = {"url": None, "path": "hi", "__metarepo__": False}
+            context.export()
+            with open(join(f, '.meta')) as m:
+                meta = json.load(m)
+            self.assertEqual(list(meta['projects']), ['gameta', 'genisys', 'hi'])
+            self.assertEqual(meta['include'], ['meta.d/*.json'])
+            with open(join(f, 'meta.d', 'a.json')) as s:
+                self.assertEqual(s.read(), json.dumps(
+                    {'projects': self.shard_repositories('a', 'a1', tags=['a', 'new'])}, indent=2
+                ))
+            self.assertLess(getmtime(join(f, 'meta.d', 'b.json')), time() - 30)
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertEqual(context.tags['new'], {'a1'})
+            self.assertEqual(context.owners['a1'], join('meta.d', 'a.json'))
+            self.assertNotIn('hi', context.owners)
+
     def test_gameta_context_export_meta_file_non_existent(self):
         with self.runner.isolated_filesystem() as f:
             self.context.project_dir = f
@@ -1320,6 +2043,288 @@ class TestGametaContext(TestCase):
                     }
                 )
 
+    def test_gameta_context_export_unchanged_files_not_written(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            with open(join(f, '.gitignore'), 'w') as g:
+                g.write('core/genisys/\n')
+            for file in ['.meta', '.gitignore']:
+                utime(join(f, file), (time() - 60, time() - 60))
+            self.context.project_dir = f
+            self.context.load()
+            mtimes = {file: getmtime(join(f, file)) for file in ['.meta', '.gitignore']}
+
+            self.context.export()
+            self.assertEqual({file: getmtime(join(f, file)) for file in ['.meta', '.gitignore']}, mtimes)
+
+            self.context.add_tags('genisys', ['core'])
+            self.context.export()
+            self.assertNotEqual(getmtime(join(f, '.meta')), mtimes['.meta'])
+            self.assertEqual(getmtime(join(f, '.gitignore')), mtimes['.gitignore'])
+            with open(join(f, '.meta')) as m:
+                self.assertEqual(json.load(m)['projects']['genisys']['tags'], ['core'])
+
+    def test_gameta_context_export_identical_content_not_written(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            self.context.project_dir = f
+            self.context.load()
+            self.context.export()
+            utime(join(f, '.meta'), (time() - 60, time() - 60))
+            mtime = getmtime(join(f, '.meta'))
+
+            self.context.repositories['genisys']['branch'] = 'test'
+            del self.context.repositories['genisys']['branch']
+            self.context.export()
+            self.assertEqual(getmtime(join(f, '.meta')), mtime)
+
+    def test_gameta_context_export_failure_retried(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            self.context.project_dir = f
+            self.context.load()
+            self.context.add_gitignore('core/genisys')
+            with patch('gameta.context.write_file', side_effect=OSError('Disk full')):
+                output = self.runner.invoke(click.command()(lambda: self.context.export()))
+            self.assertEqual(output.output, "Could not export data to .gitignore file: OSError.Disk full\n")
+            self.assertFalse(exists(join(f, '.gitignore')))
+
+            self.context.export()
+            with open(join(f, '.gitignore')) as g:
+                self.assertEqual(g.read(), 'core/genisys/\n')
+
+    def read_journal(self, directory):
+        with open(join(directory, '.meta.journal')) as j:
+            return [json.loads(line) for line in j]
+
+    def test_gameta_context_export_changes_journaled(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            open(join(f, '.meta.journal'), 'w').close()
+            with open(join(f, '.meta')) as m:
+                meta = m.read()
+            self.context.project_dir = f
+            self.context.load()
+
+            self.context.add_tags('genisys', ['core'])
+            del self.context.commands['hello']
+            self.context.constants['HI'] = 'there'
+            self.context.export()
+            with open(join(f, '.meta')) as m:
+                self.assertEqual(m.read(), meta)
+            self.assertEqual(
+                self.read_journal(f),
+                [
+                    {"op": "delete", "section": "commands", "name": "hello"},
+                    {
+                        "op": "set", "section": "projects", "name": "genisys",
+                        "value": {
+                            "url": "https://github.com/testing/genisys.git", "path": "core/genisys",
+                            "__metarepo__": False, "tags": ["core"]
+                        }
+                    },
+                    {"op": "set", "section": "constants", "name": "HI", "value": "there"}
+                ]
+            )
+
+            self.context.export()
+            self.assertEqual(len(self.read_journal(f)), 3)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertEqual(context.repositories, self.context.repositories)
+            self.assertEqual(context.commands, {})
+            self.assertEqual(context.constants, {'HELLO': 'world', 'HI': 'there'})
+            self.assertEqual(context.tags['core'], {'genisys'})
+
+    def test_gameta_context_journal_compacted_past_threshold(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            open(join(f, '.meta.journal'), 'w').close()
+            self.context.project_dir = f
+            self.context.load()
+
+            self.context.constants['HI'] = 'there'
+            with patch('gameta.context.JOURNAL_COMPACTION_SIZE', 0):
+                self.context.export()
+                self.assertEqual(len(self.read_journal(f)), 1)
+                self.context.constants['LONG'] = 'a' * 1024
+                self.context.export()
+            self.assertEqual(self.read_journal(f), [])
+            with open(join(f, '.meta')) as m:
+                self.assertEqual(json.load(m)['constants'], {'HELLO': 'world', 'HI': 'there', 'LONG': 'a' * 1024})
+
+            self.context.constants['HI'] = 'again'
+            self.context.export()
+            self.assertEqual(
+                self.read_journal(f), [{"op": "set", "section": "constants", "name": "HI", "value": "again"}]
+            )
+
+    def test_gameta_context_journal_reordered_elements_compacted(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            open(join(f, '.meta.journal'), 'w').close()
+            self.context.project_dir = f
+            self.context.load()
+
+            self.context.repositories = dict(reversed(list(self.context.repositories.items())))
+            self.context.export()
+            self.assertEqual(self.read_journal(f), [])
+            with open(join(f, '.meta')) as m:
+                self.assertEqual(list(json.load(m)['projects']), ['genisys', 'gameta'])
+
+    def test_gameta_context_journal_malformed_entries_skipped(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            with open(join(f, '.meta.journal'), 'w') as j:
+                j.write(
+                    '{"op":"set","section":"constants","name":"HI","value":"there"}\n'
+                    '{"op":"rename","section":"constants","name":"HI"}\n'
+                    '{"op":"delete","section":"constants","name":"HELLO"}\n'
+                    '{"op":"set","sect'
+                )
+            self.context.project_dir = f
+            output = self.runner.invoke(click.command()(lambda: self.context.load()))
+            self.assertEqual(
+                output.output,
+                "Skipped malformed entry of .meta.journal file: Entry 2: ValueError.Malformed entry "
+                "{'op': 'rename', 'section': 'constants', 'name': 'HI'}\n"
+            )
+            self.assertEqual(self.context.constants, {'HI': 'there'})
+            self.assertTrue(self.context.is_metarepo)
+
+            self.context.constants['HELLO'] = 'world'
+            self.context.export()
+            self.assertEqual(self.read_journal(f), [])
+            with open(join(f, '.meta')) as m:
+                self.assertEqual(json.load(m)['constants'], {'HI': 'there', 'HELLO': 'world'})
+
+    def test_gameta_context_journal_incomplete_entry_discarded(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            with open(join(f, '.meta.journal'), 'w') as j:
+                j.write('{"op":"set","section":"constants","name":"HI","value":"there"}\n{"op":"set","sect')
+            self.context.project_dir = f
+            self.context.load()
+            self.assertEqual(self.context.constants, {'HELLO': 'world', 'HI': 'there'})
+
+            self.context.constants['BYE'] = 'world'
+            self.context.export()
+            self.assertEqual(
+                self.read_journal(f),
+                [
+                    {"op": "set", "section": "constants", "name": "HI", "value": "there"},
+                    {"op": "set", "section": "constants", "name": "BYE", "value": "world"}
+                ]
+            )
+
+    def test_gameta_context_journal_invalidates_snapshot(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            open(join(f, '.meta.journal'), 'w').close()
+            for file in ['.meta', '.meta.journal']:
+                utime(join(f, file), (time() - 60, time() - 60))
+            self.context.project_dir = f
+            self.context.load()
+            self.assertTrue(exists(join(f, '.gameta', 'snapshot')))
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            context.add_tags('genisys', ['core'])
+            context.export()
+            self.assertEqual(len(self.read_journal(f)), 1)
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertEqual(context.tags['core'], {'genisys'})
+
+    def test_gameta_context_journal_not_used_with_shards(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_sharded_meta_file(f, a=self.shard_repositories('a', 'a1'))
+            with open(join(f, '.meta.journal'), 'w') as j:
+                j.write('{"op":"set","section":"constants","name":"HI","value":"there"}\n')
+            self.context.project_dir = f
+            self.context.load()
+            self.assertEqual(self.context.constants, {'HELLO': 'world', 'HI': 'there'})
+
+            self.context.add_tags('a1', ['new'])
+            self.context.export()
+            self.assertEqual(self.read_journal(f), [])
+            with open(join(f, '.meta')) as m:
+                self.assertEqual(json.load(m)['constants'], {'HELLO': 'world', 'HI': 'there'})
+            with open(join(f, 'meta.d', 'a.json')) as s:
+                self.assertEqual(json.load(s)['projects']['a1']['tags'], ['a', 'new'])
+
+    def test_gameta_context_journal_locked_across_instances(self):
+        with self.runner.isolated_filesystem() as f:
+            open(join(f, '.meta.journal'), 'w').close()
+            first, second = Journal(join(f, '.meta.journal')), Journal(join(f, '.meta.journal'))
+            entry = {"op": "set", "section": "constants", "name": "HI", "value": "there"}
+
+            with first.lock():
+                thread = threading.Thread(target=second.append, args=([dict(entry, value='again')],))
+                thread.start()
+                thread.join(0.2)
+                self.assertTrue(thread.is_alive())
+                self.assertEqual(self.read_journal(f), [])
+                first.append([entry])
+            thread.join()
+            self.assertEqual(self.read_journal(f), [entry, dict(entry, value='again')])
+
+            with second.lock():
+                thread = threading.Thread(target=first.reset)
+                thread.start()
+                thread.join(0.2)
+                self.assertEqual(len(self.read_journal(f)), 2)
+            thread.join()
+            self.assertEqual(self.read_journal(f), [])
+
+    def test_gameta_context_journal_compaction_keeps_changes_of_other_processes(self):
+        with self.runner.isolated_filesystem() as f:
+            self.write_validation_meta_file(f)
+            open(join(f, '.meta.journal'), 'w').close()
+            self.context.project_dir = f
+            self.context.load()
+            other = GametaContext()
+            other.project_dir = f
+            other.load()
+
+            other.constants['HI'] = 'there'
+            other.export()
+            self.context.repositories = dict(reversed(list(self.context.repositories.items())))
+            self.context.constants['BYE'] = 'world'
+            self.context.export()
+            self.assertEqual(self.read_journal(f), [])
+            with open(join(f, '.meta')) as m:
+                meta = json.load(m)
+            self.assertEqual(list(meta['projects']), ['genisys', 'gameta'])
+            self.assertEqual(meta['constants'], {'HELLO': 'world', 'BYE': 'world', 'HI': 'there'})
+
+    def test_gameta_context_write_file_atomically(self):
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'real'))
+            with open(join(f, 'real', 'meta.json'), 'w') as m:
+                m.write('{}')
+            chmod(join(f, 'real', 'meta.json'), 0o640)
+            symlink(join('real', 'meta.json'), join(f, '.meta'))
+
+            self.assertTrue(write_file(join(f, '.meta'), '{"projects": {}}'))
+            self.assertFalse(write_file(join(f, '.meta'), '{"projects": {}}'))
+            self.assertTrue(islink(join(f, '.meta')))
+            with open(join(f, 'real', 'meta.json')) as m:
+                self.assertEqual(m.read(), '{"projects": {}}')
+            self.assertEqual(stat(join(f, 'real', 'meta.json')).st_mode & 0o777, 0o640)
+            self.assertEqual(listdir(join(f, 'real')), ['meta.json'])
+
+            with patch('gameta.context.os.replace', side_effect=OSError('Interrupted')):
+                with self.assertRaises(OSError):
+                    write_file(join(f, '.meta'), '{}')
+            with open(join(f, 'real', 'meta.json')) as m:
+                self.assertEqual(m.read(), '{"projects": {}}')
+            self.assertEqual(listdir(join(f, 'real')), ['meta.json'])
+
     def test_gameta_context_apply_command_to_all_repos(self):
         with self.runner.isolated_filesystem() as f:
             makedirs(join(f, 'core', 'genisys'))
@@ -1365,7 +2370,7 @@ class TestGametaContext(TestCase):
                     ['gameta', 'genisys', 'genisys-testing'],
                     self.context.apply(['git fetch --all --tags --prune', 'git pull'])
             ):
-                self.assertEqual(getcwd(), cwd)
+                self.assertEqual(repo_command[2], cwd)
                 self.assertEqual(repo, repo_command[0])
                 self.assertEqual(repo_command[1], ['git', 'fetch', '--all', '--tags', '--prune', '&&', 'git', 'pull'])
 
@@ -1414,7 +2419,7 @@ class TestGametaContext(TestCase):
                     ['gameta', 'genisys', 'genisys-testing'],
                     self.context.apply(['git fetch --all --tags --prune', 'git pull'], ['genisys', 'gameta'])
             ):
-                self.assertEqual(getcwd(), cwd)
+                self.assertEqual(repo_command[2], cwd)
                 self.assertEqual(repo, repo_command[0])
                 self.assertEqual(repo_command[1], ['git', 'fetch', '--all', '--tags', '--prune', '&&', 'git', 'pull'])
 
@@ -1464,7 +2469,7 @@ class TestGametaContext(TestCase):
                     ['gameta', 'genisys', 'genisys-testing'],
                     self.context.apply(['git fetch --all --tags --prune', 'git pull'], shell=True)
             ):
-                self.assertEqual(getcwd(), cwd)
+                self.assertEqual(repo_command[2], cwd)
                 self.assertEqual(repo, repo_command[0])
                 self.assertEqual(
                     repo_command[1],
@@ -1522,7 +2527,7 @@ class TestGametaContext(TestCase):
                     ['gameta', 'genisys', 'genisys-testing'],
                     self.context.apply(['git clone {url} {path}'])
             ):
-                self.assertEqual(getcwd(), cwd)
+                self.assertEqual(repo_command[2], cwd)
                 self.assertEqual(repo, repo_command[0])
                 self.assertEqual(repo_command[1], test_output)
 
@@ -1580,7 +2585,7 @@ class TestGametaContext(TestCase):
                     ['gameta', 'genisys', 'genisys-testing'],
                     self.context.apply(['git checkout {BRANCH}'])
             ):
-                self.assertEqual(getcwd(), cwd)
+                self.assertEqual(repo_command[2], cwd)
                 self.assertEqual(repo, repo_command[0])
                 self.assertEqual(repo_command[1], test_output)
 
@@ -1639,7 +2644,7 @@ class TestGametaContext(TestCase):
                     ['gameta', 'genisys', 'genisys-testing'],
                     self.context.apply(['git checkout {$BRANCH}'])
             ):
-                self.assertEqual(getcwd(), cwd)
+                self.assertEqual(repo_command[2], cwd)
                 self.assertEqual(repo, repo_command[0])
                 self.assertEqual(repo_command[1], test_output)
 
@@ -1712,7 +2717,7 @@ class TestGametaContext(TestCase):
                         ['git clone {url} {path}', 'git checkout {BRANCH}', 'git push {$ORIGIN} {BRANCH}']
                     )
             ):
-                self.assertEqual(getcwd(), cwd)
+                self.assertEqual(repo_command[2], cwd)
                 self.assertEqual(repo, repo_command[0])
                 self.assertEqual(repo_command[1], test_output)
 
@@ -1775,7 +2780,7 @@ class TestGametaContext(TestCase):
                         python=True
                     )
             ):
-                self.assertEqual(getcwd(), cwd)
+                self.assertEqual(repo_command[2], cwd)
                 self.assertEqual(repo, repo_command[0])
                 self.assertEqual(
                     repo_command[1],
@@ -2093,3 +3098,182 @@ class TestGametaContext(TestCase):
                 })
             }
         )
+
+    def test_gameta_context_share_repositories_repositories_loaded_from_shared_file(self):
+        with self.runner.isolated_filesystem() as f:
+            self.context.project_dir = f
+            self.context.repositories = {
+                "genisys": {
+                    "url": "https://github.com/testing/genisys.git",
+                    "path": "core/genisys",
+                    "tags": ["core", "templating"],
+                    '__metarepo__': False,
+                    'depends_on': None
+                }
+            }
+            loader = self.context.share_repositories()
+            self.assertEqual(listdir(join(f, '.gameta', 'repos')), [basename(loader.split('"')[-2])])
+            self.assertNotIn("'", loader)
+            self.assertEqual(eval(loader), self.context.repositories)
+
+            # Unchanged repositories are shared through the same file
+            self.assertEqual(self.context.share_repositories(), loader)
+            self.context.repositories['genisys']['path'] = 'genisys'
+            self.assertNotEqual(self.context.share_repositories(), loader)
+            self.assertEqual(len(listdir(join(f, '.gameta', 'repos'))), 2)
+            self.assertEqual(eval(self.context.share_repositories())['genisys']['path'], 'genisys')
+
+    def test_gameta_context_share_repositories_stale_files_removed(self):
+        with self.runner.isolated_filesystem() as f:
+            self.context.project_dir = f
+            self.context.repositories = {'genisys': {'url': None, 'path': '.', '__metarepo__': True}}
+            makedirs(join(f, '.gameta', 'repos'))
+            for name, age in [('stale.json', 2 * 24 * 60 * 60), ('recent.json', 60)]:
+                with open(join(f, '.gameta', 'repos', name), 'w') as s:
+                    s.write('{}')
+                utime(join(f, '.gameta', 'repos', name), (time() - age, time() - age))
+            loader = self.context.share_repositories()
+            self.assertCountEqual(
+                listdir(join(f, '.gameta', 'repos')), ['recent.json', basename(loader.split('"')[-2])]
+            )
+
+    def test_gameta_context_share_repositories_embedded_without_project_directory(self):
+        self.context.repositories = {'genisys': {'url': None, 'path': '.', '__metarepo__': True, 'tags': []}}
+        self.assertEqual(eval(self.context.share_repositories()), self.context.repositories)
+
+    def test_gameta_context_generate_parameters_repository_overrides_applied_to_shared_repositories(self):
+        with self.runner.isolated_filesystem() as f:
+            self.context.project_dir = f
+            self.context.repositories = {
+                "genisys": {
+                    "url": "https://github.com/testing/genisys.git",
+                    "path": "core/genisys",
+                    '__metarepo__': False,
+                    'branch': '{$BRANCH}'
+                },
+                "genisys-testing": {
+                    "url": "https://github.com/testing/genisys-testing.git",
+                    "path": "core/genisys-testing",
+                    '__metarepo__': False
+                }
+            }
+            self.context.env_vars = {'$BRANCH': 'test'}
+            shared = self.context.share_repositories()
+
+            parameters = self.context.generate_parameters(
+                'genisys', self.context.repositories['genisys'], python=True, repositories=shared
+            )
+            self.assertNotEqual(parameters['__repos__'], shared)
+            self.assertEqual(
+                eval(parameters['__repos__']),
+                {
+                    "genisys": {
+                        "url": "https://github.com/testing/genisys.git",
+                        "path": "core/genisys",
+                        '__metarepo__': False,
+                        'branch': 'test'
+                    },
+                    "genisys-testing": {
+                        "url": "https://github.com/testing/genisys-testing.git",
+                        "path": "core/genisys-testing",
+                        '__metarepo__': False
+                    }
+                }
+            )
+            # Repositories without overrides only reference the shared repositories
+            self.assertEqual(
+                self.context.generate_parameters(
+                    'genisys-testing', self.context.repositories['genisys-testing'], python=True, repositories=shared
+                )['__repos__'],
+                shared
+            )
+
+    def test_gameta_context_generate_parameters_layered_over_shared_environment_variables_and_constants(self):
+        self.context.repositories = {
+            "genisys": {
+                "url": "https://github.com/testing/genisys.git",
+                "path": "core/genisys",
+                '__metarepo__': False,
+                'HELLO': 'details',
+                'I': 'details',
+                'branch': '{$BRANCH}'
+            }
+        }
+        self.context.constants = {'HELLO': 'constants', 'I': 'constants'}
+        self.context.env_vars = {'$BRANCH': 'test', 'HELLO': 'environment'}
+
+        parameters = self.context.generate_parameters('genisys', self.context.repositories['genisys'])
+        self.assertEqual(parameters['HELLO'], 'environment')
+        self.assertEqual(parameters['I'], 'constants')
+        self.assertEqual(parameters['branch'], 'test')
+        # The environment variables and constants are shared rather than copied for each repository
+        self.assertIs(parameters.maps[0], self.context.env_vars)
+        self.assertIs(parameters.maps[1], self.context.constants)
+        self.assertEqual(self.context.repositories['genisys']['branch'], '{$BRANCH}')
+
+    def test_gameta_context_namespace_excludes_environment_variables_and_shared_repositories(self):
+        self.context.repositories = {
+            "genisys": {
+                "url": "https://github.com/testing/genisys.git",
+                "path": "core/genisys",
+                '__metarepo__': False,
+                'HELLO': 'details',
+                'I': 'details',
+                'branch': '{$BRANCH}'
+            }
+        }
+        self.context.constants = {'HELLO': 'constants', 'I': 'constants'}
+        self.context.env_vars = {'$BRANCH': 'test', 'HELLO': 'environment'}
+
+        parameters = self.context.generate_parameters(
+            'genisys', self.context.repositories['genisys'], python=True, repositories='{}'
+        )
+        self.assertEqual(
+            self.context.namespace(parameters),
+            {
+                "url": "https://github.com/testing/genisys.git",
+                "path": "core/genisys",
+                '__metarepo__': False,
+                'HELLO': 'constants',
+                'I': 'constants',
+                'branch': 'test'
+            }
+        )
+
+    def test_gameta_context_generate_parameters_environment_variables_substituted_once(self):
+        self.context.repositories = {
+            "genisys": {"url": "{$URL}", "path": "core/{$BRANCH}", '__metarepo__': False, 'branch': '{$BRANCH}'}
+        }
+        self.context.env_vars = {'$BRANCH': 'test', '$URL': 'https://github.com/testing/genisys.git'}
+
+        parameters = self.context.generate_parameters('genisys', self.context.repositories['genisys'])
+        self.assertEqual(parameters['branch'], 'test')
+        details = self.context.expanded['genisys']
+        # Fields are only substituted when they are looked up
+        self.assertEqual(details.expanded, {'branch': 'test'})
+        self.assertEqual(
+            dict(parameters),
+            {
+                "url": "https://github.com/testing/genisys.git", "path": "core/test", '__metarepo__': False,
+                'branch': 'test', '$BRANCH': 'test', '$URL': 'https://github.com/testing/genisys.git'
+            }
+        )
+        self.assertIs(
+            self.context.generate_parameters('genisys', self.context.repositories['genisys']).maps[-1], details
+        )
+
+    def test_gameta_context_generate_parameters_memoized_details_cleared_on_export(self):
+        with self.runner.isolated_filesystem() as f:
+            self.context.project_dir = f
+            self.context.repositories = {
+                "genisys": {"url": None, "path": ".", '__metarepo__': True, 'branch': 'master'}
+            }
+            self.context.env_vars = {}
+            parameters = self.context.generate_parameters('genisys', self.context.repositories['genisys'])
+            self.assertEqual(parameters['branch'], 'master')
+
+            self.context.repositories['genisys']['branch'] = 'test'
+            self.context.export()
+            self.assertEqual(
+                self.context.generate_parameters('genisys', self.context.repositories['genisys'])['branch'], 'test'
+            )
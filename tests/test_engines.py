@@ -0,0 +1,678 @@
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+from os import makedirs, listdir, remove
+from os.path import join
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from gameta.context import SHELL
+from gameta.events import EventWriter
+from gameta.engines import (
+    Job, Usage, Result, Scheduler, ThreadEngine, AsyncioEngine, Shell, ShellPoolEngine, PythonPoolEngine
+)
+
+
+IGNORE_SIGTERM = 'import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); '
+WAIT_FOR_A = 'import os, time\nwhile not os.path.exists("a"):\n    time.sleep(0.01)'
+
+
+class TestScheduler(TestCase):
+    def test_scheduler_jobs_without_dependencies_ready_in_plan_order(self):
+        scheduler = Scheduler([Job('a', [], '.'), Job('b', [], '.'), Job('c', [], '.')])
+        self.assertEqual([j.repo for j in scheduler.ready()], ['a', 'b', 'c'])
+        self.assertEqual(scheduler.ready(), [])
+
+    def test_scheduler_jobs_released_once_dependencies_succeed(self):
+        scheduler = Scheduler(
+            [Job('a', [], '.', ['b', 'c']), Job('b', [], '.', ['c']), Job('c', [], '.'), Job('d', [], '.', ['x'])]
+        )
+        self.assertEqual([j.repo for j in scheduler.ready()], ['c', 'd'])
+        self.assertEqual(scheduler.complete(Result('c', [], Result.SUCCEEDED, 0)), [])
+        self.assertEqual([j.repo for j in scheduler.ready()], ['b'])
+        scheduler.complete(Result('d', [], Result.SUCCEEDED, 0))
+        scheduler.complete(Result('b', [], Result.SUCCEEDED, 0))
+        self.assertEqual([j.repo for j in scheduler.ready()], ['a'])
+        scheduler.complete(Result('a', [], Result.SUCCEEDED, 0))
+        self.assertTrue(scheduler.finished)
+
+    def test_scheduler_only_downstream_jobs_skipped_on_failure(self):
+        scheduler = Scheduler(
+            [Job('a', [], '.', ['b']), Job('b', [], '.', ['c']), Job('c', [], '.'), Job('d', [], '.')]
+        )
+        self.assertEqual([j.repo for j in scheduler.ready()], ['c', 'd'])
+        skipped = scheduler.complete(Result('c', [], Result.FAILED, 1))
+        self.assertEqual([(r.repo, r.status) for r in skipped], [('a', Result.SKIPPED), ('b', Result.SKIPPED)])
+        self.assertEqual(scheduler.ready(), [])
+        self.assertFalse(scheduler.finished)
+        scheduler.complete(Result('d', [], Result.SUCCEEDED, 0))
+        self.assertTrue(scheduler.finished)
+
+    def test_scheduler_halt_skips_jobs_that_are_not_running(self):
+        scheduler = Scheduler([Job('a', [], '.'), Job('b', [], '.'), Job('c', [], '.', ['a'])])
+        scheduler.ready()
+        skipped = scheduler.halt(['a'])
+        self.assertEqual([r.repo for r in skipped], ['b', 'c'])
+        self.assertEqual(scheduler.ready(), [])
+        scheduler.complete(Result('a', [], Result.SUCCEEDED, 0))
+        self.assertEqual(scheduler.ready(), [])
+        self.assertTrue(scheduler.finished)
+
+
+class TestUsage(TestCase):
+    def test_usage_wait_collects_resource_usage(self):
+        # The process has to exceed the test process it inherits its peak from
+        size: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 + 64 * 1024 * 1024
+        process = subprocess.Popen(
+            [sys.executable, '-c', f'x = bytearray({size}); x[::4096] = b"x" * len(x[::4096]); exit(2)']
+        )
+        return_code, usage = Usage.wait(process, time.monotonic())
+        self.assertEqual(return_code, 2)
+        self.assertEqual(process.returncode, 2)
+        self.assertEqual(process.wait(), 2)
+        self.assertGreater(usage.wall_time, 0)
+        self.assertGreater(usage.user_time + usage.system_time, 0)
+        self.assertGreater(usage.max_rss, size // 1024)
+
+    def test_usage_wait_max_rss_inherited_from_parent_not_reported(self):
+        ballast = bytearray(128 * 1024 * 1024)
+        ballast[::4096] = b'x' * len(ballast[::4096])
+        process = subprocess.Popen([sys.executable, '-c', 'sum(range(1000000))'])
+        return_code, usage = Usage.wait(process, time.monotonic())
+        del ballast
+        self.assertEqual(return_code, 0)
+        self.assertGreater(usage.user_time + usage.system_time, 0)
+        self.assertIsNone(usage.max_rss)
+
+    def test_usage_wait_process_terminated_by_signal(self):
+        process = subprocess.Popen([sys.executable, '-c', 'import os, signal; os.kill(os.getpid(), signal.SIGTERM)'])
+        return_code, usage = Usage.wait(process, time.monotonic())
+        self.assertEqual(return_code, -15)
+
+    def test_usage_wait_process_already_waited_for(self):
+        process = subprocess.Popen([sys.executable, '-c', 'exit(1)'])
+        process.wait()
+        return_code, usage = Usage.wait(process, time.monotonic())
+        self.assertEqual(return_code, 1)
+        self.assertIsNone(usage.user_time)
+        self.assertIsNone(usage.max_rss)
+
+    def test_result_to_dict(self):
+        self.assertEqual(
+            Result('a', ['ls'], Result.SUCCEEDED, 0, usage=Usage(1.5, 1.0, 0.5, 2048)).to_dict(),
+            {
+                'repo': 'a', 'command': ['ls'], 'status': 'succeeded', 'return_code': 0,
+                'wall_time': 1.5, 'user_time': 1.0, 'system_time': 0.5, 'max_rss': 2048
+            }
+        )
+        self.assertEqual(
+            Result('a', ['ls'], Result.SKIPPED).to_dict(),
+            {
+                'repo': 'a', 'command': ['ls'], 'status': 'skipped', 'return_code': None,
+                'wall_time': None, 'user_time': None, 'system_time': None, 'max_rss': None
+            }
+        )
+
+
+class TestThreadEngine(TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None
+        self.runner = CliRunner()
+
+    def test_thread_engine_jobs_executed_in_repository_directories(self):
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'a'))
+            makedirs(join(f, 'b'))
+            results = ThreadEngine(jobs=2).run(
+                [
+                    Job('a', ['mkdir', 'test_dir'], join(f, 'a')),
+                    Job('b', ['mkdir', 'test_dir'], join(f, 'b'))
+                ]
+            )
+            self.assertEqual([r.repo for r in results], ['a', 'b'])
+            self.assertEqual([r.status for r in results], [Result.SUCCEEDED, Result.SUCCEEDED])
+            self.assertCountEqual(listdir(join(f, 'a')), ['test_dir'])
+            self.assertCountEqual(listdir(join(f, 'b')), ['test_dir'])
+
+    def test_thread_engine_remaining_jobs_skipped_when_errors_are_raised(self):
+        with self.runner.isolated_filesystem() as f:
+            results = ThreadEngine(jobs=1, raise_errors=True).run(
+                [
+                    Job('a', [sys.executable, '-c', 'exit(3)'], f),
+                    Job('b', [sys.executable, '-c', 'exit(0)'], f)
+                ]
+            )
+            self.assertEqual([r.status for r in results], [Result.FAILED, Result.SKIPPED])
+            self.assertEqual(results[0].return_code, 3)
+            self.assertEqual(results[0].error.cmd, [sys.executable, '-c', 'exit(3)'])
+
+    def test_thread_engine_jobs_executed_in_dependency_order(self):
+        with self.runner.isolated_filesystem() as f:
+            record = [sys.executable, '-c', 'import sys; open("order", "a").write(sys.argv[1] + "\\n")']
+            for jobs in [1, 3]:
+                results = ThreadEngine(jobs=jobs).run(
+                    [
+                        Job('a', record + ['a'], f, ['b', 'c']),
+                        Job('b', record + ['b'], f, ['c']),
+                        Job('c', record + ['c'], f),
+                    ]
+                )
+                self.assertEqual([r.status for r in results], [Result.SUCCEEDED] * 3)
+                with open(join(f, 'order')) as o:
+                    self.assertEqual(o.read(), 'c\nb\na\n')
+                remove(join(f, 'order'))
+
+    def test_thread_engine_downstream_jobs_skipped_on_failure(self):
+        with self.runner.isolated_filesystem() as f:
+            results = ThreadEngine(jobs=2).run(
+                [
+                    Job('a', [sys.executable, '-c', 'exit(0)'], f, ['b']),
+                    Job('b', [sys.executable, '-c', 'exit(1)'], f),
+                    Job('c', [sys.executable, '-c', 'exit(0)'], f),
+                ]
+            )
+            self.assertEqual([r.status for r in results], [Result.SKIPPED, Result.FAILED, Result.SUCCEEDED])
+
+    def test_thread_engine_errors_not_raised(self):
+        with self.runner.isolated_filesystem() as f:
+            results = ThreadEngine(jobs=2).run(
+                [
+                    Job('a', [sys.executable, '-c', 'exit(3)'], f),
+                    Job('b', [sys.executable, '-c', 'exit(0)'], f)
+                ]
+            )
+            self.assertEqual([r.status for r in results], [Result.FAILED, Result.SUCCEEDED])
+
+    def test_thread_engine_running_jobs_cancelled_when_errors_are_raised(self):
+        with self.runner.isolated_filesystem() as f:
+            engine = ThreadEngine(jobs=3, raise_errors=True)
+            engine.grace_period = 0.5
+            start = time.time()
+            results = engine.run(
+                [
+                    Job('a', [sys.executable, '-c', 'import time; time.sleep(30)'], f),
+                    Job('b', [sys.executable, '-c', IGNORE_SIGTERM + 'time.sleep(30)'], f),
+                    Job('c', [sys.executable, '-c', 'import time; time.sleep(0.5); exit(3)'], f),
+                    Job('d', [sys.executable, '-c', 'exit(0)'], f, ['c'])
+                ]
+            )
+            self.assertLess(time.time() - start, 10)
+            self.assertEqual(
+                [r.status for r in results], [Result.CANCELLED, Result.CANCELLED, Result.FAILED, Result.SKIPPED]
+            )
+            self.assertEqual(results[2].return_code, 3)
+            self.assertTrue(results[0].return_code < 0)
+            self.assertTrue(results[1].return_code < 0)
+
+    def test_thread_engine_cancelled_jobs_failed_unless_signalled(self):
+        with self.runner.isolated_filesystem() as f:
+            engine = ThreadEngine(jobs=3, raise_errors=True)
+            engine.cancelled.update(['a', 'b', 'c'])
+            engine.signalled.add('c')
+            results = [
+                engine.finish(Job('a', ['missing'], f), 127),
+                engine.finish(Job('b', ['sleep'], f), -15),
+                engine.finish(Job('c', ['sleep'], f), 143)
+            ]
+            self.assertEqual([r.status for r in results], [Result.FAILED, Result.CANCELLED, Result.CANCELLED])
+            self.assertEqual(results[0].error.returncode, 127)
+
+    def test_thread_engine_resource_usage_recorded(self):
+        with self.runner.isolated_filesystem() as f:
+            for verbose in [False, True]:
+                with self.runner.isolation():
+                    results = ThreadEngine(jobs=2, verbose=verbose).run(
+                        [
+                            Job('a', [sys.executable, '-c', 'print(sum(range(1000000)))'], f),
+                            Job('b', [sys.executable, '-c', 'exit(0)'], f),
+                        ]
+                    )
+                for result in results:
+                    self.assertGreater(result.usage.wall_time, 0)
+                    self.assertGreater(result.usage.user_time + result.usage.system_time, 0)
+                    # Small interpreters do not exceed the peak they inherited from the test process
+                    self.assertIsNone(result.usage.max_rss)
+
+    def test_thread_engine_events_written(self):
+        with self.runner.isolated_filesystem() as f:
+            stream = io.BytesIO()
+            with self.runner.isolation() as (out, _):
+                results = ThreadEngine(jobs=2, events=EventWriter(stream)).run(
+                    [
+                        Job('a', [sys.executable, '-c', 'print("hello\\nworld")'], f),
+                        Job('b', [sys.executable, '-c', 'exit(3)'], f),
+                        Job('c', [sys.executable, '-c', 'exit(0)'], f, ['b'])
+                    ]
+                )
+                self.assertEqual(out.getvalue(), b'')
+            self.assertEqual([r.status for r in results], [Result.SUCCEEDED, Result.FAILED, Result.SKIPPED])
+            events = [json.loads(line) for line in stream.getvalue().splitlines()]
+            self.assertEqual(
+                [(e['event'], e['repo']) for e in events if e['repo'] == 'a'],
+                [('start', 'a'), ('output', 'a'), ('output', 'a'), ('finish', 'a')]
+            )
+            self.assertEqual([e['data'] for e in events if e['event'] == 'output'], ['hello', 'world'])
+            finish = [e for e in events if e['event'] == 'finish' and e['repo'] == 'b'][0]
+            self.assertEqual(finish['status'], Result.FAILED)
+            self.assertEqual(finish['return_code'], 3)
+            self.assertGreater(finish['wall_time'], 0)
+            self.assertFalse(any(e['repo'] == 'c' for e in events))
+
+    def test_thread_engine_output_logged(self):
+        with self.runner.isolated_filesystem() as f:
+            for verbose in [False, True]:
+                with self.runner.isolation() as (out, _):
+                    results = ThreadEngine(jobs=2, verbose=verbose, log_dir=f, tail_size=16).run(
+                        [
+                            Job('a', [sys.executable, '-c', 'print("hello\\nworld")'], f),
+                            Job('b', [sys.executable, '-c', 'print("x\\n" * 100000 + "failed"); exit(3)'], f)
+                        ]
+                    )
+                    output = out.getvalue().decode()
+                self.assertEqual(('[a] hello' in output), verbose)
+                self.assertEqual([r.log for r in results], [join(f, 'a.log'), join(f, 'b.log')])
+                self.assertEqual([r.tail for r in results], [None, 'x\nx\nx\nx\nfailed'])
+                with open(join(f, 'a.log')) as a:
+                    self.assertEqual(a.read(), 'hello\nworld\n')
+                with open(join(f, 'b.log')) as b:
+                    self.assertEqual(b.read(), 'x\n' * 100000 + 'failed\n')
+
+
+class TestAsyncioEngine(TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None
+        self.runner = CliRunner()
+
+    def test_asyncio_engine_jobs_executed_in_repository_directories(self):
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'a'))
+            makedirs(join(f, 'b'))
+            results = AsyncioEngine(jobs=2).run(
+                [
+                    Job('a', ['mkdir', 'test_dir'], join(f, 'a')),
+                    Job('b', ['mkdir', 'test_dir'], join(f, 'b'))
+                ]
+            )
+            self.assertEqual([r.status for r in results], [Result.SUCCEEDED, Result.SUCCEEDED])
+            self.assertCountEqual(listdir(join(f, 'a')), ['test_dir'])
+            self.assertCountEqual(listdir(join(f, 'b')), ['test_dir'])
+
+    def test_asyncio_engine_missing_commands_failed(self):
+        with self.runner.isolated_filesystem() as f:
+            with self.runner.isolation():
+                results = AsyncioEngine(jobs=2).run(
+                    [
+                        Job('a', ['nonexistentcmd'], f),
+                        Job('b', [sys.executable, '-c', 'exit(0)'], f, ['a']),
+                        Job('c', [sys.executable, '-c', 'exit(0)'], f)
+                    ]
+                )
+            self.assertEqual(
+                [(r.status, r.return_code) for r in results],
+                [(Result.FAILED, 127), (Result.SKIPPED, None), (Result.SUCCEEDED, 0)]
+            )
+
+    def test_asyncio_engine_running_jobs_stopped_when_execution_is_interrupted(self):
+        with self.runner.isolated_filesystem() as f:
+            engine = AsyncioEngine(jobs=2)
+            engine.grace_period = 0.5
+            finish = engine.finish
+
+            def interrupted(job, *args):
+                if job.repo == 'b':
+                    raise RuntimeError('interrupted')
+                return finish(job, *args)
+
+            start = time.time()
+            with patch.object(engine, 'finish', interrupted), self.runner.isolation():
+                with self.assertRaises(RuntimeError):
+                    engine.run(
+                        [
+                            Job('a', [sys.executable, '-c', IGNORE_SIGTERM + 'open("a", "w"); time.sleep(30)'], f),
+                            # Interrupts execution once a ignores SIGTERM
+                            Job('b', [sys.executable, '-c', WAIT_FOR_A], f)
+                        ]
+                    )
+            self.assertLess(time.time() - start, 10)
+            self.assertEqual(engine.processes['a'].returncode, -9)
+            self.assertEqual(engine.tasks, set())
+
+    def test_asyncio_engine_output_streamed_with_repository_prefix(self):
+        with self.runner.isolated_filesystem() as f:
+            engine = AsyncioEngine(jobs=2, verbose=True)
+            with self.runner.isolation() as (out, _):
+                results = engine.run(
+                    [
+                        Job('a', [sys.executable, '-c', 'print("hello\\nworld")'], f),
+                        Job('b', [sys.executable, '-c', 'print("x" * 100000, end="")'], f)
+                    ]
+                )
+                output = out.getvalue().decode()
+            self.assertEqual([r.status for r in results], [Result.SUCCEEDED, Result.SUCCEEDED])
+            self.assertTrue('[a] hello\n[a] world\n' in output)
+            self.assertTrue(f'[b] {"x" * 100000}\n' in output)
+
+    def test_asyncio_engine_downstream_jobs_skipped_on_failure(self):
+        with self.runner.isolated_filesystem() as f:
+            results = AsyncioEngine(jobs=2).run(
+                [
+                    Job('a', [sys.executable, '-c', 'exit(0)'], f, ['b']),
+                    Job('b', [sys.executable, '-c', 'exit(1)'], f),
+                    Job('c', [sys.executable, '-c', 'exit(0)'], f, ['d']),
+                    Job('d', [sys.executable, '-c', 'exit(0)'], f),
+                ]
+            )
+            self.assertEqual(
+                [r.status for r in results], [Result.SKIPPED, Result.FAILED, Result.SUCCEEDED, Result.SUCCEEDED]
+            )
+
+    def test_asyncio_engine_remaining_jobs_skipped_when_errors_are_raised(self):
+        with self.runner.isolated_filesystem() as f:
+            results = AsyncioEngine(jobs=1, raise_errors=True).run(
+                [
+                    Job('a', [sys.executable, '-c', 'exit(3)'], f),
+                    Job('b', [sys.executable, '-c', 'exit(0)'], f)
+                ]
+            )
+            self.assertEqual([r.status for r in results], [Result.FAILED, Result.SKIPPED])
+            self.assertEqual(results[0].return_code, 3)
+
+    def test_asyncio_engine_running_jobs_cancelled_when_errors_are_raised(self):
+        with self.runner.isolated_filesystem() as f:
+            engine = AsyncioEngine(jobs=3, raise_errors=True)
+            engine.grace_period = 0.5
+            start = time.time()
+            results = engine.run(
+                [
+                    Job('a', [sys.executable, '-c', 'import time; time.sleep(30)'], f),
+                    Job('b', [sys.executable, '-c', IGNORE_SIGTERM + 'time.sleep(30)'], f),
+                    Job('c', [sys.executable, '-c', 'import time; time.sleep(0.5); exit(3)'], f),
+                    Job('d', [sys.executable, '-c', 'exit(0)'], f, ['c'])
+                ]
+            )
+            self.assertLess(time.time() - start, 10)
+            self.assertEqual(
+                [r.status for r in results], [Result.CANCELLED, Result.CANCELLED, Result.FAILED, Result.SKIPPED]
+            )
+            self.assertEqual(results[2].return_code, 3)
+            self.assertTrue(results[0].return_code < 0)
+            self.assertTrue(results[1].return_code < 0)
+
+    def test_asyncio_engine_wall_time_recorded(self):
+        with self.runner.isolated_filesystem() as f:
+            results = AsyncioEngine(jobs=2).run([Job('a', [sys.executable, '-c', 'exit(0)'], f)])
+            self.assertGreater(results[0].usage.wall_time, 0)
+            self.assertIsNone(results[0].usage.user_time)
+
+    def test_asyncio_engine_output_logged(self):
+        with self.runner.isolated_filesystem() as f:
+            with self.runner.isolation() as (out, _):
+                results = AsyncioEngine(jobs=2, log_dir=f, tail_size=16).run(
+                    [
+                        Job('a', [sys.executable, '-c', 'print("hello\\nworld")'], f),
+                        Job('b', [sys.executable, '-c', 'print("x\\n" * 100000 + "failed"); exit(3)'], f)
+                    ]
+                )
+                self.assertFalse('[a] hello' in out.getvalue().decode().splitlines())
+            self.assertEqual([r.tail for r in results], [None, 'x\nx\nx\nx\nfailed'])
+            with open(join(f, 'a.log')) as a:
+                self.assertEqual(a.read(), 'hello\nworld\n')
+            with open(join(f, 'b.log')) as b:
+                self.assertEqual(b.read(), 'x\n' * 100000 + 'failed\n')
+
+
+class TestShellPoolEngine(TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None
+        self.runner = CliRunner()
+
+    def test_shell_output_and_return_code_framed(self):
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'a b'))
+            shell = Shell(SHELL)
+            try:
+                lines = []
+                self.assertEqual(shell.execute('pwd; printf "no newline"', join(f, 'a b'), lines.append), 0)
+                self.assertEqual(lines, [join(f, 'a b'), 'no newline'])
+                lines = []
+                self.assertEqual(shell.execute('echo hello; echo; (exit 2)', f, lines.append), 2)
+                self.assertEqual(lines, ['hello', ''])
+                self.assertTrue(shell.alive)
+            finally:
+                shell.close()
+
+    def test_shell_scripts_executed_in_subshells(self):
+        with self.runner.isolated_filesystem() as f:
+            shell = Shell(SHELL)
+            try:
+                lines = []
+                script = 'export GAMETA_TEST=leaked; cd /; set -e; false; echo no'
+                self.assertEqual(shell.execute(script, f, lines.append), 1)
+                self.assertEqual(shell.execute('echo bye; exit 4', f, lines.append), 4)
+                self.assertEqual(lines, ['bye'])
+                self.assertTrue(shell.alive)
+                lines = []
+                self.assertEqual(shell.execute('echo "${GAMETA_TEST:-unset}"; pwd', f, lines.append), 0)
+                self.assertEqual(lines, ['unset', f])
+            finally:
+                shell.close()
+
+    def test_shell_terminated_by_script(self):
+        with self.runner.isolated_filesystem() as f:
+            shell = Shell(SHELL)
+            self.assertEqual(shell.execute('echo bye; kill -9 $$', f, lambda line: None), -9)
+            self.assertFalse(shell.alive)
+            shell.close()
+
+    def test_shell_pool_engine_script_unwraps_shell_commands(self):
+        self.assertEqual(ShellPoolEngine.script([SHELL, '-c', 'git fetch && git pull']), 'git fetch && git pull')
+        self.assertEqual(ShellPoolEngine.script(['mkdir', 'test dir']), "mkdir 'test dir'")
+
+    def test_shell_pool_engine_jobs_executed_in_repository_directories(self):
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'a'))
+            makedirs(join(f, 'b'))
+            engine = ShellPoolEngine(jobs=2)
+            results = engine.run(
+                [
+                    Job('a', [SHELL, '-c', 'mkdir test_dir'], join(f, 'a')),
+                    Job('b', ['mkdir', 'test_dir'], join(f, 'b')),
+                    Job('c', ['mkdir', 'test_dir'], join(f, 'c'))
+                ]
+            )
+            self.assertEqual([r.status for r in results], [Result.SUCCEEDED, Result.SUCCEEDED, Result.FAILED])
+            self.assertCountEqual(listdir(join(f, 'a')), ['test_dir'])
+            self.assertCountEqual(listdir(join(f, 'b')), ['test_dir'])
+            self.assertCountEqual(listdir(f), ['a', 'b'])
+            self.assertEqual(engine.shells, [])
+
+    def test_shell_pool_engine_shells_reused_and_replaced(self):
+        with self.runner.isolated_filesystem() as f:
+            with self.runner.isolation() as (out, _):
+                results = ShellPoolEngine(jobs=1, verbose=True).run(
+                    [
+                        Job('a', [SHELL, '-c', 'echo $$ > a'], f),
+                        Job('b', [SHELL, '-c', 'echo $$ > b'], f),
+                        Job('c', [SHELL, '-c', 'exit 3'], f),
+                        Job('d', [SHELL, '-c', 'echo $$ > d; kill -9 $$'], f),
+                        Job('e', [SHELL, '-c', 'echo $$ > e'], f),
+                    ]
+                )
+            self.assertEqual(
+                [r.status for r in results],
+                [Result.SUCCEEDED, Result.SUCCEEDED, Result.FAILED, Result.FAILED, Result.SUCCEEDED]
+            )
+            self.assertEqual([r.return_code for r in results[2:4]], [3, -9])
+            pids = {}
+            for repo in ['a', 'b', 'd', 'e']:
+                with open(join(f, repo)) as p:
+                    pids[repo] = p.read()
+            # Exiting only exits the subshell of the script, killing the shell replaces it
+            self.assertEqual(pids['a'], pids['b'])
+            self.assertEqual(pids['a'], pids['d'])
+            self.assertNotEqual(pids['a'], pids['e'])
+
+    def test_shell_pool_engine_non_posix_shells_rejected(self):
+        with patch('gameta.engines.SHELL', '/usr/bin/fish'):
+            with self.assertRaises(ValueError):
+                ShellPoolEngine(jobs=1)
+
+    def test_shell_pool_engine_output_logged(self):
+        with self.runner.isolated_filesystem() as f:
+            with self.runner.isolation() as (out, _):
+                results = ShellPoolEngine(jobs=1, log_dir=f, tail_size=1024).run(
+                    [
+                        Job('a', [SHELL, '-c', 'echo hello; echo world'], f),
+                        Job('b', [SHELL, '-c', 'echo failed; exit 3'], f)
+                    ]
+                )
+                self.assertFalse('hello' in out.getvalue().decode().splitlines())
+            self.assertEqual([r.tail for r in results], [None, 'failed'])
+            with open(join(f, 'a.log')) as a:
+                self.assertEqual(a.read(), 'hello\nworld\n')
+
+    def test_shell_pool_engine_remaining_jobs_skipped_when_errors_are_raised(self):
+        with self.runner.isolated_filesystem() as f:
+            results = ShellPoolEngine(jobs=1, raise_errors=True).run(
+                [
+                    Job('a', [SHELL, '-c', 'false'], f),
+                    Job('b', [SHELL, '-c', 'true'], f)
+                ]
+            )
+            self.assertEqual([r.status for r in results], [Result.FAILED, Result.SKIPPED])
+            self.assertEqual(results[0].return_code, 1)
+
+    def test_shell_pool_engine_running_jobs_cancelled_when_errors_are_raised(self):
+        with self.runner.isolated_filesystem() as f:
+            engine = ShellPoolEngine(jobs=3, raise_errors=True)
+            engine.grace_period = 0.5
+            start = time.time()
+            results = engine.run(
+                [
+                    Job('a', [sys.executable, '-c', 'import time; time.sleep(30)'], f),
+                    Job('b', [sys.executable, '-c', IGNORE_SIGTERM + 'time.sleep(30)'], f),
+                    Job('c', [sys.executable, '-c', 'import time; time.sleep(0.5); exit(3)'], f),
+                    Job('d', [sys.executable, '-c', 'exit(0)'], f, ['c'])
+                ]
+            )
+            self.assertLess(time.time() - start, 10)
+            self.assertEqual(
+                [r.status for r in results], [Result.CANCELLED, Result.CANCELLED, Result.FAILED, Result.SKIPPED]
+            )
+            self.assertEqual(results[2].return_code, 3)
+            self.assertTrue(results[0].return_code < 0)
+            self.assertTrue(results[1].return_code < 0)
+
+    def test_shell_pool_engine_jobs_detached_from_shells_returned_to_pool(self):
+        with self.runner.isolated_filesystem() as f:
+            engine = ShellPoolEngine(jobs=1)
+            finish = engine.finish
+            attached = []
+
+            def record(job, *args):
+                attached.append((job.repo in engine.processes, len(engine.shells)))
+                return finish(job, *args)
+
+            with patch.object(engine, 'finish', side_effect=record):
+                results = engine.run([Job('a', [SHELL, '-c', 'true'], f), Job('b', [SHELL, '-c', 'true'], f)])
+            self.assertEqual([r.status for r in results], [Result.SUCCEEDED, Result.SUCCEEDED])
+            self.assertEqual(attached, [(False, 1), (False, 1)])
+
+
+class TestPythonPoolEngine(TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None
+        self.runner = CliRunner()
+
+    def test_python_pool_engine_scripts_executed_on_reused_interpreters(self):
+        with self.runner.isolated_filesystem() as f:
+            for repo in ['a', 'b', 'c']:
+                makedirs(join(f, repo))
+            script = 'import os\nwith open("pid", "w") as p:\n    p.write(str(os.getpid()) + name)'
+            with self.runner.isolation():
+                results = PythonPoolEngine(jobs=1).run(
+                    [
+                        Job(repo, [SHELL, '-c', 'exit 1'], join(f, repo), script=[script], parameters={'name': repo})
+                        for repo in ['a', 'b', 'c']
+                    ]
+                )
+            self.assertEqual([r.status for r in results], [Result.SUCCEEDED] * 3)
+            pids = set()
+            for repo in ['a', 'b', 'c']:
+                with open(join(f, repo, 'pid')) as p:
+                    pid = p.read()
+                self.assertTrue(pid.endswith(repo))
+                pids.add(pid[:-1])
+            self.assertEqual(len(pids), 1)
+            self.assertGreaterEqual(results[0].usage.user_time, 0)
+
+    def test_python_pool_engine_max_rss_reported_per_job(self):
+        # The worker inherits the peak of the test process that started its forkserver
+        size: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 + 64 * 1024 * 1024
+        with self.runner.isolated_filesystem() as f:
+            with self.runner.isolation():
+                results = PythonPoolEngine(jobs=1).run(
+                    [
+                        Job('a', [], f, script=[f'x = bytearray({size}); x[::4096] = b"x" * len(x[::4096])']),
+                        Job('b', [], f, ['a'], script=['sum(range(1000))'])
+                    ]
+                )
+            self.assertEqual([r.status for r in results], [Result.SUCCEEDED, Result.SUCCEEDED])
+            self.assertGreater(results[0].usage.max_rss, size // 1024)
+            # The peak reached by a is not attributed to b, which reused its worker
+            self.assertIsNone(results[1].usage.max_rss)
+
+    def test_python_pool_engine_commands_executed_without_scripts(self):
+        with self.runner.isolated_filesystem() as f:
+            with self.runner.isolation() as (out, _):
+                results = PythonPoolEngine(jobs=2, verbose=True).run(
+                    [
+                        Job('a', [sys.executable, '-c', 'print("subprocess")'], f),
+                        Job('b', [sys.executable, '-c', 'exit(1)'], f, script=['print("worker")'])
+                    ]
+                )
+                output = out.getvalue().decode().splitlines()
+            self.assertEqual([r.status for r in results], [Result.SUCCEEDED, Result.SUCCEEDED])
+            self.assertTrue('[a] subprocess' in output)
+            self.assertTrue('[b] worker' in output)
+
+    def test_python_pool_engine_output_logged(self):
+        with self.runner.isolated_filesystem() as f:
+            with self.runner.isolation():
+                results = PythonPoolEngine(jobs=2, log_dir=f).run(
+                    [
+                        Job('a', [], f, script=['print("hello")']),
+                        Job('b', [], f, script=['print("failed")', 'import sys; sys.exit(3)'])
+                    ]
+                )
+            self.assertEqual([(r.status, r.return_code) for r in results], [(Result.SUCCEEDED, 0), (Result.FAILED, 3)])
+            self.assertEqual(results[1].tail, 'failed')
+            with open(join(f, 'a.log')) as a:
+                self.assertEqual(a.read(), 'hello\n')
+
+    def test_python_pool_engine_running_jobs_cancelled_when_errors_are_raised(self):
+        with self.runner.isolated_filesystem() as f:
+            engine = PythonPoolEngine(jobs=3, raise_errors=True)
+            engine.grace_period = 0.5
+            start = time.time()
+            with self.runner.isolation():
+                results = engine.run(
+                    [
+                        Job('a', [], f, script=['import time; time.sleep(30)']),
+                        Job('b', [], f, script=[IGNORE_SIGTERM + 'time.sleep(30)']),
+                        Job('c', [], f, script=['import time; time.sleep(0.5); exit(3)']),
+                        Job('d', [], f, ['c'], script=['exit(0)'])
+                    ]
+                )
+            self.assertLess(time.time() - start, 10)
+            self.assertEqual(
+                [r.status for r in results], [Result.CANCELLED, Result.CANCELLED, Result.FAILED, Result.SKIPPED]
+            )
+            self.assertEqual(results[2].return_code, 3)
+            self.assertTrue(results[0].return_code < 0)
+            self.assertTrue(results[1].return_code < 0)
@@ -0,0 +1,42 @@
+import io
+import json
+from unittest import TestCase
+
+from gameta.events import EventWriter
+
+
+class TestEventWriter(TestCase):
+    def test_event_writer_events_buffered(self):
+        stream = io.BytesIO()
+        writer = EventWriter(stream, buffer_size=1024, flush_interval=60)
+        writer.write('start', 'a', command=['ls'])
+        writer.write('output', 'a', data='hello')
+        self.assertEqual(stream.getvalue(), b'')
+        writer.flush()
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([e['event'] for e in events], ['start', 'output'])
+        self.assertEqual(events[0]['repo'], 'a')
+        self.assertEqual(events[0]['command'], ['ls'])
+        self.assertEqual(events[1]['data'], 'hello')
+        self.assertTrue(all(isinstance(e['time'], float) for e in events))
+
+    def test_event_writer_flushed_when_buffer_is_full(self):
+        stream = io.BytesIO()
+        writer = EventWriter(stream, buffer_size=100, flush_interval=60)
+        writer.write('output', 'a', data='x' * 10)
+        self.assertEqual(stream.getvalue(), b'')
+        writer.write('output', 'a', data='x' * 100)
+        self.assertEqual(len(stream.getvalue().splitlines()), 2)
+        self.assertEqual(writer.buffer, [])
+        self.assertEqual(writer.size, 0)
+
+    def test_event_writer_flushed_on_request_or_interval(self):
+        stream = io.BytesIO()
+        writer = EventWriter(stream, buffer_size=1024, flush_interval=60)
+        writer.write('finish', 'a', flush=True, return_code=0)
+        self.assertEqual(json.loads(stream.getvalue())['return_code'], 0)
+
+        stream = io.BytesIO()
+        writer = EventWriter(stream, buffer_size=1024, flush_interval=0)
+        writer.write('output', 'a', data='hello')
+        self.assertEqual(json.loads(stream.getvalue())['data'], 'hello')
@@ -604,7 +604,7 @@ class TestParamsDelete(TestCase):
             self.assertEqual(
                 result.output,
                 f"Error: Parameter {params['parameter']} is a reserved parameter "
-                f"['url', 'path', 'tags', '__metarepo__']\n"
+                f"['url', 'path', 'tags', '__metarepo__', 'depends_on']\n"
             )
             with open(join(f, '.meta'), 'r') as m:
                 self.assertEqual(
@@ -0,0 +1,171 @@
+import os
+import subprocess
+import sys
+from os.path import join
+from threading import Lock
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from gameta.pump import SPLICE, LineDecoder, OutputLog, OutputPump
+
+
+class TestLineDecoder(TestCase):
+    def test_line_decoder_partial_lines_held_back(self):
+        decoder = LineDecoder()
+        self.assertEqual(decoder.decode(b'hello\nwor'), ['hello'])
+        self.assertEqual(decoder.decode(b'ld  \r\n\n'), ['world', ''])
+        self.assertEqual(decoder.decode(b'end'), [])
+        self.assertEqual(decoder.decode(b'', final=True), ['end'])
+        self.assertEqual(decoder.decode(b'', final=True), [])
+
+    def test_line_decoder_multibyte_characters_split_across_chunks(self):
+        decoder = LineDecoder()
+        encoded = 'héllo wörld\n'.encode()
+        lines = []
+        for i in range(len(encoded)):
+            lines.extend(decoder.decode(encoded[i:i + 1]))
+        self.assertEqual(lines, ['héllo wörld'])
+
+    def test_line_decoder_invalid_bytes_replaced(self):
+        self.assertEqual(LineDecoder().decode(b'\xff\xfe\n'), ['��'])
+
+    def test_line_decoder_long_lines_released(self):
+        decoder = LineDecoder(max_line=10)
+        self.assertEqual(decoder.decode(b'x' * 8), [])
+        self.assertEqual(decoder.decode(b'x' * 8), ['x' * 16])
+        self.assertEqual(decoder.decode(b'y\n'), ['y'])
+
+
+class TestOutputLog(TestCase):
+    def setUp(self) -> None:
+        self.runner = CliRunner()
+
+    def test_output_log_output_written_to_file(self):
+        with self.runner.isolated_filesystem() as f:
+            log = OutputLog(join(f, 'a.log'))
+            log.write(b'hello\n')
+            log.write(b'world\n')
+            log.close()
+            with open(join(f, 'a.log'), 'rb') as l:
+                self.assertEqual(l.read(), b'hello\nworld\n')
+            self.assertEqual(log.tail(), 'hello\nworld')
+
+    def test_output_log_tail_bounded(self):
+        with self.runner.isolated_filesystem() as f:
+            log = OutputLog(join(f, 'a.log'), tail_size=16)
+            for i in range(10000):
+                log.write(f'line {i}\n'.encode())
+                self.assertLessEqual(len(log.buffer), 16)
+            log.write(b'x' * 100)
+            self.assertEqual(len(log.buffer), 16)
+            log.write(b'\nend\n')
+            log.close()
+            # Lines that have been cut off are dropped
+            self.assertEqual(log.tail(), 'end')
+            with open(join(f, 'a.log'), 'rb') as l:
+                self.assertEqual(len(l.read()), sum(len(f'line {i}\n') for i in range(10000)) + 105)
+
+    def test_output_log_output_forwarded_from_pipe(self):
+        with self.runner.isolated_filesystem() as f:
+            for splice in [False, True]:
+                log = OutputLog(join(f, 'a.log'), tail_size=16)
+                log.splice = splice and SPLICE
+                r, w = os.pipe()
+                os.write(w, b''.join(f'line {i}\n'.encode() for i in range(1000)))
+                os.close(w)
+                moved = 0
+                while True:
+                    count = log.forward(r, 4096)
+                    if not count:
+                        break
+                    moved += count
+                os.close(r)
+                log.close()
+
+                self.assertEqual(log.forwarded, splice and SPLICE)
+                with open(join(f, 'a.log'), 'rb') as l:
+                    self.assertEqual(l.read(), b''.join(f'line {i}\n'.encode() for i in range(1000)))
+                self.assertEqual(moved, os.path.getsize(join(f, 'a.log')))
+                self.assertEqual(log.tail(), 'line 999')
+
+    def test_output_log_no_tail(self):
+        with self.runner.isolated_filesystem() as f:
+            log = OutputLog(join(f, 'a.log'), tail_size=0)
+            log.write(b'hello\n')
+            log.close()
+            self.assertEqual(log.tail(), '')
+
+
+class TestOutputPump(TestCase):
+    def setUp(self) -> None:
+        self.batches = []
+        self.lock = Lock()
+
+    def writer(self, batch):
+        with self.lock:
+            self.batches.append(batch)
+
+    def test_output_pump_multiple_pipes(self):
+        pump = OutputPump(self.writer)
+        processes = [
+            subprocess.Popen(
+                [sys.executable, '-c', f'for i in range(10000): print("{repo}", i)'], stdout=subprocess.PIPE
+            ) for repo in ['a', 'b']
+        ]
+        done = [pump.add(repo, p.stdout) for repo, p in zip(['a', 'b'], processes)]
+        for event, process in zip(done, processes):
+            self.assertTrue(event.wait(30))
+            process.wait()
+            process.stdout.close()
+        pump.close()
+
+        self.assertFalse(pump.thread.is_alive())
+        # Output is written in batches rather than line by line
+        self.assertLess(len(self.batches), 20000)
+        lines = [line for batch in self.batches for line in batch]
+        for repo in ['a', 'b']:
+            self.assertEqual([line for r, line in lines if r == repo], [f'{repo} {i}' for i in range(10000)])
+
+    def test_output_pump_output_logged(self):
+        with CliRunner().isolated_filesystem() as f:
+            pump = OutputPump(self.writer)
+            logs = [OutputLog(join(f, f'{repo}.log')) for repo in ['a', 'b']]
+            processes = [
+                subprocess.Popen([sys.executable, '-c', f'print("{repo}\\n" * 1000, end="")'], stdout=subprocess.PIPE)
+                for repo in ['a', 'b']
+            ]
+            done = [
+                pump.add(repo, p.stdout, log, echo=repo == 'a')
+                for repo, p, log in zip(['a', 'b'], processes, logs)
+            ]
+            for event, process, log in zip(done, processes, logs):
+                self.assertTrue(event.wait(30))
+                process.wait()
+                process.stdout.close()
+                log.close()
+            pump.close()
+
+            for repo in ['a', 'b']:
+                with open(join(f, f'{repo}.log')) as l:
+                    self.assertEqual(l.read(), f'{repo}\n' * 1000)
+            self.assertEqual([line for batch in self.batches for line in batch], [('a', 'a')] * 1000)
+
+    def test_output_pump_writer_errors_raised_on_close(self):
+        def writer(_):
+            raise BrokenPipeError('closed')
+
+        pump = OutputPump(writer)
+        process = subprocess.Popen([sys.executable, '-c', 'print("x\\n" * 100000)'], stdout=subprocess.PIPE)
+        # Output is drained despite the error so that the process is not blocked
+        self.assertTrue(pump.add('a', process.stdout).wait(30))
+        self.assertEqual(process.wait(), 0)
+        process.stdout.close()
+        with self.assertRaises(BrokenPipeError):
+            pump.close()
+
+    def test_output_pump_closed_without_pipes(self):
+        pump = OutputPump(self.writer)
+        pump.close()
+        self.assertFalse(pump.thread.is_alive())
+        self.assertEqual(self.batches, [])
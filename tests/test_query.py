@@ -0,0 +1,116 @@
+from unittest import TestCase
+
+from gameta.query import TagQuery, ParameterQuery
+
+
+class TestTagQuery(TestCase):
+    def setUp(self) -> None:
+        self.index = {
+            'backend': frozenset(['a', 'b', 'c']),
+            'legacy': frozenset(['b']),
+            'infra': frozenset(['x']),
+            'c++': frozenset(['c', 'y'])
+        }
+        self.repositories = frozenset(['a', 'b', 'c', 'x', 'y', 'z'])
+
+    def select(self, expression):
+        return TagQuery(expression).select(self.index, self.repositories)
+
+    def test_tag_query_single_tag(self):
+        self.assertEqual(self.select('backend'), {'a', 'b', 'c'})
+        self.assertEqual(self.select(' c++ '), {'c', 'y'})
+        self.assertEqual(TagQuery('backend').tags, {'backend'})
+        self.assertFalse(TagQuery('backend').negated)
+
+    def test_tag_query_nonexistent_tag(self):
+        self.assertEqual(self.select('frontend'), frozenset())
+        self.assertEqual(self.select('!frontend'), self.repositories)
+
+    def test_tag_query_operator_precedence(self):
+        self.assertEqual(self.select('backend & !legacy | infra'), {'a', 'c', 'x'})
+        self.assertEqual(self.select('infra | backend & !legacy'), {'a', 'c', 'x'})
+        self.assertEqual(self.select('backend&!legacy|infra'), {'a', 'c', 'x'})
+        self.assertEqual(TagQuery('backend & !legacy | infra').tags, {'backend', 'legacy', 'infra'})
+        self.assertTrue(TagQuery('backend & !legacy | infra').negated)
+
+    def test_tag_query_parentheses(self):
+        self.assertEqual(self.select('backend & !(legacy | c++)'), {'a'})
+        self.assertEqual(self.select('!(backend | infra)'), {'y', 'z'})
+        self.assertEqual(self.select('!!infra'), {'x'})
+
+    def test_tag_query_intersection_without_repositories(self):
+        self.assertEqual(self.select('infra & backend & c++'), frozenset())
+
+    def test_tag_query_quoted_tags(self):
+        index = {**self.index, 'r&d': frozenset(['r']), 'data science': frozenset(['d']), 'say "hi"': frozenset(['h'])}
+        self.assertEqual(TagQuery('"r&d" | "data science"').select(index, self.repositories), {'r', 'd'})
+        self.assertEqual(TagQuery('!"c++"&backend').select(index, self.repositories), {'a', 'b'})
+        self.assertEqual(TagQuery('"say \\"hi\\""').select(index, self.repositories), {'h'})
+        self.assertEqual(TagQuery('"r&d" | "data science"').tags, {'r&d', 'data science'})
+
+    def test_tag_query_existing_tags_with_operators_selected_unquoted(self):
+        index = {**self.index, 'r&d': frozenset(['r']), 'a|b': frozenset(['u']), '(old)': frozenset(['o'])}
+        for tag in ['r&d', 'a|b', '(old)']:
+            with self.subTest(tag=tag):
+                query = TagQuery(tag, index)
+                self.assertEqual(query.select(index, self.repositories), index[tag])
+                self.assertEqual(query.tags, {tag})
+        self.assertEqual(TagQuery('c++|infra', index).select(index, self.repositories), {'c', 'x', 'y'})
+        # Without the existing tags, the operators are parsed
+        self.assertEqual(TagQuery('r&d').tags, {'r', 'd'})
+
+    def test_tag_query_malformed(self):
+        for expression, message in [
+            ('', "Unexpected end of tag query ''"),
+            ('backend &', "Unexpected end of tag query 'backend &'"),
+            ('| backend', "Unexpected '|' in tag query '| backend'"),
+            ('backend legacy', "Unexpected 'legacy' in tag query 'backend legacy'"),
+            ('(backend | legacy', "Missing ')' in tag query '(backend | legacy'"),
+            ('backend)', "Unexpected ')' in tag query 'backend)'"),
+            ('"backend', "Unterminated quote in tag query '\"backend'"),
+            ('"back\\end"', "Malformed quoted tag \"back\\end\" in tag query '\"back\\\\end\"'")
+        ]:
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError) as e:
+                    TagQuery(expression)
+                self.assertEqual(str(e.exception), message)
+
+
+class TestParameterQuery(TestCase):
+    def setUp(self) -> None:
+        self.index = {
+            ParameterQuery.key('python'): frozenset(['a', 'b']),
+            ParameterQuery.key('go'): frozenset(['c']),
+            ParameterQuery.key(1): frozenset(['d']),
+            ParameterQuery.key(True): frozenset(['e'])
+        }
+
+    def select(self, expression):
+        return ParameterQuery(expression).select(self.index)
+
+    def test_parameter_query_equality(self):
+        self.assertEqual(self.select('language == python'), {'a', 'b'})
+        self.assertEqual(self.select('language=="python"'), {'a', 'b'})
+        self.assertEqual(self.select("language == 'go'"), {'c'})
+        self.assertEqual(self.select('language == rust'), frozenset())
+        self.assertEqual(ParameterQuery('language == python').parameter, 'language')
+
+    def test_parameter_query_values_parsed_as_json(self):
+        self.assertEqual(self.select('language == 1'), {'d'})
+        self.assertEqual(self.select('language == true'), {'e'})
+        self.assertEqual(self.select('language == "1"'), frozenset())
+
+    def test_parameter_query_inequality(self):
+        self.assertEqual(self.select('language != python'), {'c', 'd', 'e'})
+
+    def test_parameter_query_membership(self):
+        self.assertEqual(self.select('language in (python, go)'), {'a', 'b', 'c'})
+        self.assertEqual(self.select('language in ("go", 1)'), {'c', 'd'})
+        self.assertEqual(self.select('language in ()'), frozenset())
+        self.assertEqual(self.select('language not in (python, go)'), {'d', 'e'})
+
+    def test_parameter_query_malformed(self):
+        for expression in ['', 'language', 'language == ', 'language in python', 'language = python']:
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    ParameterQuery(expression)
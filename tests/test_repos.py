@@ -700,6 +700,52 @@ class TestReposDelete(TestCase):
                     }
                 )
 
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_repos_delete_repository_removed_from_dependencies(self, mock_ensure_object):
+        params = {
+            'name': 'GitPython'
+        }
+        with self.runner.isolated_filesystem() as f:
+            with zipfile.ZipFile(join(dirname(__file__), 'data', 'git.zip'), 'r') as template:
+                template.extractall(f)
+            with open(join(dirname(__file__), 'data', '.meta'), 'r') as m1:
+                output = json.load(m1)
+                with open(join(f, '.meta'), 'w+') as m2:
+                    output['projects']['GitPython'] = {
+                        "url": 'https://github.com/gitpython-developers/GitPython.git',
+                        'path': 'GitPython',
+                        'tags': ['a', 'b', 'c'],
+                        "__metarepo__": False
+                    }
+                    output['projects']['gameta']['depends_on'] = ['GitPython']
+                    json.dump(output, m2)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.delete, ['--name', params['name'], '-c'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.output,
+                f"Deleting repository {params['name']} from .meta file\n"
+                f"Repository {params['name']} successfully deleted\n"
+            )
+            with open(join(f, '.meta'), 'r') as m:
+                self.assertEqual(
+                    json.load(m),
+                    {
+                        "projects": {
+                            "gameta": {
+                                "path": ".",
+                                "tags": ["metarepo"],
+                                "url": "git@github.com:genius-systems/gameta.git",
+                                '__metarepo__': True,
+                                'depends_on': []
+                            }
+                        }
+                    }
+                )
+
     @patch('gameta.cli.click.Context.ensure_object')
     def test_repos_delete_repository_does_not_exist(self, mock_ensure_object):
         params = {
@@ -835,6 +881,51 @@ class TestRepoLs(TestCase):
             )
 
 
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_repos_ls_repositories_matching_parameter_predicates(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with zipfile.ZipFile(join(dirname(__file__), 'data', 'git.zip'), 'r') as template:
+                template.extractall(f)
+            with open(join(dirname(__file__), 'data', '.meta'), 'r') as m1:
+                output = json.load(m1)
+                with open(join(f, '.meta'), 'w+') as m2:
+                    output['projects']['GitPython'] = {
+                        "url": 'https://github.com/gitpython-developers/GitPython.git',
+                        'path': 'GitPython',
+                        'language': 'python',
+                        'team': 'a',
+                        "__metarepo__": False
+                    }
+                    output['projects']['genisys'] = {
+                        "url": 'https://github.com/test/genisys.git',
+                        "path": "core/genisys",
+                        'language': 'python',
+                        'team': 'b',
+                        "__metarepo__": False
+                    }
+                    json.dump(output, m2)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            for predicates, repositories in [
+                (['language == python'], ['GitPython', 'genisys']),
+                (['language == python', 'team not in (a, c)'], ['genisys']),
+                (['language == go'], [])
+            ]:
+                with self.subTest(predicates=predicates):
+                    result = self.runner.invoke(self.ls, [arg for p in predicates for arg in ['-w', p]])
+                    self.assertEqual(result.exit_code, 0)
+                    self.assertEqual(
+                        result.output,
+                        f"Listing repositories managed in metarepo {f}\n" + ''.join(f"{r}\n" for r in repositories)
+                    )
+
+            result = self.runner.invoke(self.ls, ['-w', 'language'])
+            self.assertEqual(result.exit_code, 1)
+            self.assertTrue(result.output.startswith("Error: Malformed predicate 'language'"))
+
+
 class TestRepoUpdate(TestCase):
     def setUp(self) -> None:
         self.maxDiff = None
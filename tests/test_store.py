@@ -0,0 +1,404 @@
+import json
+from os import listdir, makedirs
+from os.path import join, exists
+from unittest import TestCase
+from unittest.mock import patch
+
+import click
+from click.testing import CliRunner
+
+from gameta.context import GametaContext, DATABASE_FILE, JOURNAL_FILE
+from gameta.repos import ls
+from gameta.store import import_meta, export_meta, enable_journal, compact_journal
+
+
+META = {
+    "projects": {
+        "gameta": {
+            "url": "https://github.com/testing/gameta.git",
+            "path": ".",
+            "tags": ["metarepo"],
+            "__metarepo__": True
+        },
+        "genisys": {
+            "url": "https://github.com/testing/genisys.git",
+            "path": "core/genisys",
+            "tags": ["core", "templating"],
+            "__metarepo__": False,
+            "test_dict": {"a": [1, 2.5, None]}
+        }
+    },
+    "commands": {
+        "hello": {
+            "commands": ["echo {HELLO}"], "description": "Says hello", "tags": [], "repositories": [],
+            "verbose": False, "shell": False, "python": False, "raise_errors": False
+        }
+    },
+    "constants": {"HELLO": "wörld"}
+}
+
+
+class TestStoreImport(TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None
+        self.runner = CliRunner()
+        self.import_meta = import_meta
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_import_meta_file(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(META, m, indent=2)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+
+            result = self.runner.invoke(self.import_meta)
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.output,
+                "Importing .meta file into .meta.db database\n"
+                "Successfully imported 2 repositories into .meta.db database\n"
+            )
+            self.assertNotIn(f'{DATABASE_FILE}.', ' '.join(listdir(f)))
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertEqual(context.files['meta'].file_name, DATABASE_FILE)
+            # Repositories are selected from the indexes of the database before their rows are loaded
+            self.assertEqual(context.pending, {DATABASE_FILE})
+            self.assertEqual(context.tags['core'], {'genisys'})
+            self.assertEqual(context.where(['path == core/genisys']), {'genisys'})
+            self.assertEqual(context.pending, {DATABASE_FILE})
+            self.assertEqual(list(context.repositories), ['gameta', 'genisys'])
+            self.assertEqual(context.gameta_data, META)
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_import_replaces_database(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(META, m, indent=2)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            self.runner.invoke(self.import_meta)
+
+            context.load()
+            context.repositories['genisys']['branch'] = 'test'
+            context.export()
+            result = self.runner.invoke(self.import_meta)
+            self.assertEqual(result.exit_code, 0)
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            context.include()
+            self.assertEqual(context.gameta_data, META)
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_import_sharded_meta_file(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            meta = json.loads(json.dumps(META))
+            shard = {"projects": {"team": meta['projects'].pop('genisys')}}
+            meta['include'] = ['meta.d/*.json']
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(meta, m, indent=2)
+            makedirs(join(f, 'meta.d'))
+            with open(join(f, 'meta.d', 'team1.json'), 'w') as s:
+                json.dump(shard, s, indent=2)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+
+            result = self.runner.invoke(self.import_meta)
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.output,
+                "Importing .meta file into .meta.db database\n"
+                "Successfully imported 2 repositories into .meta.db database\n"
+            )
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            self.assertTrue(context.is_metarepo)
+            self.assertNotIn('include', context.gameta_data)
+            self.assertEqual(list(context.shards), [DATABASE_FILE])
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(ls)
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.output,
+                f"Listing repositories managed in metarepo {f}\n"
+                "gameta\n"
+                "team\n"
+            )
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_import_malformed_meta_file(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            meta = json.loads(json.dumps(META))
+            meta['commands']['hello']['unknown'] = True
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(meta, m)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+
+            result = self.runner.invoke(self.import_meta)
+            self.assertEqual(result.exit_code, 1)
+            self.assertTrue(
+                result.output.endswith(
+                    "Error: .meta file could not be imported, correct the errors above first\n"
+                )
+            )
+            self.assertFalse(exists(join(f, DATABASE_FILE)))
+
+
+class TestStoreExport(TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None
+        self.runner = CliRunner()
+        self.import_meta = import_meta
+        self.export_meta = export_meta
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_export_lossless(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(META, m, indent=2)
+            with open(join(f, '.meta')) as m:
+                original = m.read()
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            self.runner.invoke(self.import_meta)
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.export_meta)
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.output,
+                "Exporting .meta.db database to .meta file\n"
+                "Successfully exported 2 repositories to .meta file\n"
+            )
+            with open(join(f, '.meta')) as m:
+                self.assertEqual(m.read(), original)
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_export_changes_made_to_database(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(META, m, indent=2)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            self.runner.invoke(self.import_meta)
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            context.add_tags('gameta', ['core'])
+            del context.repositories['genisys']
+            context.repositories['genisys'] = {"url": None, "path": "core/genisys", "__metarepo__": False}
+            context.export()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.export_meta)
+            self.assertEqual(result.exit_code, 0)
+            with open(join(f, '.meta')) as m:
+                self.assertEqual(
+                    json.load(m)['projects'],
+                    {
+                        "gameta": {
+                            "url": "https://github.com/testing/gameta.git",
+                            "path": ".",
+                            "tags": ["core", "metarepo"],
+                            "__metarepo__": True
+                        },
+                        "genisys": {"url": None, "path": "core/genisys", "__metarepo__": False}
+                    }
+                )
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_export_without_database(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(META, m, indent=2)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+
+            result = self.runner.invoke(self.export_meta)
+            self.assertEqual(result.exit_code, 1)
+            self.assertEqual(
+                result.output,
+                "Exporting .meta.db database to .meta file\n"
+                "Error: .meta.db database does not exist, import it with 'gameta store import'\n"
+            )
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_export_resets_journal(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(META, m, indent=2)
+            with open(join(f, JOURNAL_FILE), 'w') as j:
+                j.write('{"op":"delete","section":"projects","name":"genisys"}\n')
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            self.runner.invoke(self.import_meta)
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            result = self.runner.invoke(self.export_meta)
+            self.assertEqual(result.exit_code, 0)
+            with open(join(f, JOURNAL_FILE)) as j:
+                self.assertEqual(j.read(), '')
+            with open(join(f, '.meta')) as m:
+                self.assertEqual(list(json.load(m)['projects']), ['gameta'])
+
+
+class TestStoreJournal(TestCase):
+    def setUp(self) -> None:
+        self.maxDiff = None
+        self.runner = CliRunner()
+        self.enable_journal = enable_journal
+        self.compact_journal = compact_journal
+        self.import_meta = import_meta
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_journal_enabled(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(META, m, indent=2)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+
+            result = self.runner.invoke(self.enable_journal)
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.output,
+                "Enabling .meta.journal journal of .meta file\n"
+                "Successfully enabled .meta.journal journal\n"
+            )
+            self.assertTrue(exists(join(f, JOURNAL_FILE)))
+
+            result = self.runner.invoke(self.enable_journal)
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.output,
+                "Enabling .meta.journal journal of .meta file\n"
+                ".meta.journal journal is already enabled, ignoring\n"
+            )
+
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            context.add_tags('gameta', ['core'])
+            context.export()
+            with open(join(f, JOURNAL_FILE)) as j:
+                self.assertEqual(len(j.readlines()), 1)
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_journal_database(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(META, m, indent=2)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+            self.runner.invoke(self.import_meta)
+            context.load()
+
+            result = self.runner.invoke(self.enable_journal)
+            self.assertEqual(result.exit_code, 1)
+            self.assertEqual(
+                result.output,
+                "Enabling .meta.journal journal of .meta file\n"
+                "Error: .meta file is stored in .meta.db database, which only writes the repositories that changed\n"
+            )
+            self.assertFalse(exists(join(f, JOURNAL_FILE)))
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_compact_journal(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(META, m, indent=2)
+            with open(join(f, JOURNAL_FILE), 'w') as j:
+                j.write(
+                    '{"op":"set","section":"constants","name":"HI","value":"there"}\n'
+                    '{"op":"delete","section":"projects","name":"genisys"}\n'
+                )
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+
+            result = self.runner.invoke(self.compact_journal)
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                result.output,
+                "Compacting .meta.journal journal into .meta file\n"
+                "Successfully compacted .meta.journal journal into .meta file\n"
+            )
+            with open(join(f, JOURNAL_FILE)) as j:
+                self.assertEqual(j.read(), '')
+            with open(join(f, '.meta')) as m:
+                meta = json.load(m)
+            self.assertEqual(list(meta['projects']), ['gameta'])
+            self.assertEqual(meta['constants'], {"HELLO": "wörld", "HI": "there"})
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_compact_journal_not_enabled(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(META, m, indent=2)
+            context = GametaContext()
+            context.project_dir = f
+            context.load()
+            mock_ensure_object.return_value = context
+
+            result = self.runner.invoke(self.compact_journal)
+            self.assertEqual(result.exit_code, 1)
+            self.assertEqual(
+                result.output,
+                "Compacting .meta.journal journal into .meta file\n"
+                "Error: .meta.journal journal is not enabled, enable it with 'gameta store journal'\n"
+            )
+
+    @patch('gameta.cli.click.Context.ensure_object')
+    def test_store_compact_journal_with_errors(self, mock_ensure_object):
+        with self.runner.isolated_filesystem() as f:
+            with open(join(f, '.meta'), 'w') as m:
+                json.dump(META, m, indent=2)
+            with open(join(f, JOURNAL_FILE), 'w') as j:
+                j.write('[]\n')
+            context = GametaContext()
+            context.project_dir = f
+            self.runner.invoke(click.command()(lambda: context.load()))
+            mock_ensure_object.return_value = context
+
+            result = self.runner.invoke(self.compact_journal)
+            self.assertEqual(result.exit_code, 1)
+            self.assertEqual(
+                result.output,
+                "Compacting .meta.journal journal into .meta file\n"
+                "Error: .meta.journal journal could not be compacted, correct the errors above first or delete it\n"
+            )
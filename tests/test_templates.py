@@ -0,0 +1,53 @@
+from unittest import TestCase
+
+from gameta.templates import Template
+
+
+class ParameterRecorder(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accessed = []
+
+    def __getitem__(self, item):
+        self.accessed.append(item)
+        return super().__getitem__(item)
+
+
+class TestTemplate(TestCase):
+    def test_template_fields_parsed(self):
+        template = Template('git clone {url} {path} && echo {$HOME} {repo.name} {tags[0]} {{literal}} {path}')
+        self.assertEqual(template.fields, {'url', 'path', '$HOME', 'repo', 'tags'})
+        self.assertIsNone(template.static)
+
+    def test_template_nested_format_specification_fields_parsed(self):
+        self.assertEqual(Template('{name:>{width}}').fields, {'name', 'width'})
+
+    def test_template_rendered_as_with_str_format(self):
+        template = Template('{url!r} {path:>6} {tags[1]} {{x}} {tags}')
+        parameters = {'url': 'https://github.com/test/gameta.git', 'path': 'a', 'tags': ['b', 'c']}
+        self.assertEqual(template.render(parameters), template.source.format(**parameters))
+
+    def test_template_only_referenced_parameters_looked_up(self):
+        parameters = ParameterRecorder({'path': 'core/genisys', 'url': None, 'HELLO': 'world'})
+        self.assertEqual(Template('cd {path} && echo {HELLO}').render(parameters), 'cd core/genisys && echo world')
+        self.assertCountEqual(parameters.accessed, ['path', 'HELLO'])
+
+    def test_template_without_placeholders_not_rendered(self):
+        template = Template('git fetch --all && echo {{done}}')
+        self.assertEqual(template.fields, frozenset())
+        self.assertEqual(template.static, 'git fetch --all && echo {done}')
+        parameters = ParameterRecorder({'path': 'a'})
+        self.assertEqual(template.render(parameters), 'git fetch --all && echo {done}')
+        self.assertEqual(parameters.accessed, [])
+
+    def test_template_missing_parameter(self):
+        with self.assertRaises(KeyError):
+            Template('git checkout {BRANCH}').render({'path': 'a'})
+
+    def test_template_positional_placeholder(self):
+        with self.assertRaises(IndexError):
+            Template('echo {}').render({'path': 'a'})
+
+    def test_template_malformed(self):
+        with self.assertRaises(ValueError):
+            Template('echo {path')
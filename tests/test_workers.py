@@ -0,0 +1,82 @@
+import os
+import signal
+from os import makedirs
+from os.path import join
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from gameta.workers import PythonWorker
+
+
+class TestPythonWorker(TestCase):
+    def setUp(self) -> None:
+        self.runner = CliRunner()
+
+    def run_scripts(self, worker, scripts, cwd, parameters=None):
+        read, write = os.pipe()
+        with open(read, 'rb') as output:
+            try:
+                worker.submit(scripts, cwd, parameters or {}, write)
+            finally:
+                os.close(write)
+            lines = output.read().decode().splitlines()
+        return worker.wait()[0], lines
+
+    def test_python_worker_scripts_executed_with_parameters(self):
+        with self.runner.isolated_filesystem() as f:
+            makedirs(join(f, 'a'))
+            worker = PythonWorker()
+            try:
+                self.assertEqual(
+                    self.run_scripts(
+                        worker,
+                        ['import os, sys; print(os.getcwd(), __name__, sys.argv)', 'print(repo, depends_on)'],
+                        join(f, 'a'),
+                        {'repo': 'a', 'depends_on': ['b']}
+                    ),
+                    (0, [f"{join(f, 'a')} __main__ ['-c']", "a ['b']"])
+                )
+                # Globals of previous scripts are not retained
+                self.assertEqual(
+                    self.run_scripts(worker, ['print("repo" in globals())'], f), (0, ['False'])
+                )
+                self.assertTrue(worker.alive)
+            finally:
+                worker.close()
+
+    def test_python_worker_return_codes(self):
+        with self.runner.isolated_filesystem() as f:
+            worker = PythonWorker()
+            try:
+                self.assertEqual(self.run_scripts(worker, ['import sys; sys.exit(3)', 'print(1)'], f), (3, []))
+                self.assertEqual(self.run_scripts(worker, ['import sys; sys.exit()'], f), (0, []))
+                self.assertEqual(self.run_scripts(worker, ['import sys; sys.exit("failed")'], f), (1, ['failed']))
+                return_code, lines = self.run_scripts(worker, ['print(1)', 'raise ValueError("boom")'], f)
+                self.assertEqual(return_code, 1)
+                self.assertEqual(lines[0], '1')
+                self.assertEqual(lines[1], 'Traceback (most recent call last):')
+                self.assertEqual(lines[-1], 'ValueError: boom')
+                self.assertTrue(worker.alive)
+            finally:
+                worker.close()
+
+    def test_python_worker_subprocess_output_captured(self):
+        with self.runner.isolated_filesystem() as f:
+            worker = PythonWorker()
+            try:
+                self.assertEqual(
+                    self.run_scripts(worker, ['import os; os.system("echo hello; echo world >&2")'], f),
+                    (0, ['hello', 'world'])
+                )
+            finally:
+                worker.close()
+
+    def test_python_worker_terminated(self):
+        with self.runner.isolated_filesystem() as f:
+            worker = PythonWorker(isolated=True)
+            worker.submit(['import time; time.sleep(30)'], f, {})
+            os.killpg(worker.process.pid, signal.SIGTERM)
+            self.assertEqual(worker.wait(), (-signal.SIGTERM, None, None, None))
+            self.assertFalse(worker.alive)
+            worker.close()